@@ -0,0 +1,9 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# 测试中渲染的文字精灵写到临时目录，不写入用户的缓存目录；必须在导入 reelrush 之前设置
+if 'REELRUSH_SPRITE_CACHE' not in os.environ:
+    os.environ['REELRUSH_SPRITE_CACHE'] = tempfile.mkdtemp(prefix='reelrush-sprites-')
+    atexit.register(shutil.rmtree, os.environ['REELRUSH_SPRITE_CACHE'], True)
@@ -1,4 +1,5 @@
 from .editor import VideoEditor
+from .curves import Curve
 from .effects import (
     TransitionEffect,
     FreezeFrame,
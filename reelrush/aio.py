@@ -0,0 +1,167 @@
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from typing import Optional
+import numpy as np
+from .editor import VideoEditor
+from .effects_processor import VideoProcessingParams, build_editor
+from .progress import RenderCancelled, RenderProgress, RenderProgressLogger, RenderResult
+
+log = logging.getLogger()
+
+# 事件流结束的标记
+_DONE = object()
+
+
+class RenderJob:
+    """A render running in a worker thread, driven from an asyncio event loop.
+
+    Iterate the job to receive RenderProgress events, and await it for the
+    RenderResult::
+
+        job = save_async(editor, 'out.mp4')
+        async for progress in job:
+            print(f"{progress.fraction:.0%}, {progress.eta}s left")
+        result = await job
+
+    Cancelling the job, or the task awaiting it, stops the render at the
+    next frame. The encoder is closed and partial output files are removed
+    (completed checkpoint chunks are kept so the render can be resumed).
+    """
+
+    def __init__(self, output_path, render, total_frames, executor=None, progress_interval=0.5):
+        """Start the render; must be called from a running event loop.
+
+        Args:
+            output_path (str): Path the render writes
+            render: Function (logger) -> None doing the blocking render
+            total_frames (int): Number of frames of the output
+            executor: concurrent.futures executor to run in, the loop's default when None
+            progress_interval (float): Minimum seconds between two progress events
+        """
+        self.output_path = output_path
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self._cancel = threading.Event()
+        self._logger = RenderProgressLogger(total_frames, self._publish, self._cancel, progress_interval)
+        # 在调用方的上下文中渲染（例如 reelrush.quality.quality 设置的质量）
+        context = contextvars.copy_context()
+        self._future = self._loop.run_in_executor(executor, context.run, self._run, render)
+
+    def _publish(self, progress: RenderProgress):
+        """Called from the render thread."""
+        self._loop.call_soon_threadsafe(self._events.put_nowait, progress)
+
+    def _run(self, render) -> RenderResult:
+        logger = self._logger
+        try:
+            render(logger)
+            logger.report(force=True)
+            return RenderResult(self.output_path, True, frames=logger.frames_done, elapsed=logger.progress().elapsed)
+        except RenderCancelled:
+            log.info(f"Render of {self.output_path} cancelled")
+            return RenderResult(self.output_path, False, cancelled=True,
+                                frames=logger.frames_done, elapsed=logger.progress().elapsed)
+        except Exception as e:
+            log.exception(f"Render of {self.output_path} failed")
+            return RenderResult(self.output_path, False, error=str(e) or type(e).__name__,
+                                frames=logger.frames_done, elapsed=logger.progress().elapsed)
+        finally:
+            self._loop.call_soon_threadsafe(self._events.put_nowait, _DONE)
+
+    def cancel(self):
+        """Ask the render to stop; await the job to wait for the cleanup."""
+        self._cancel.set()
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def __aiter__(self):
+        return self._iter_events()
+
+    async def _iter_events(self):
+        while True:
+            event = await self._events.get()
+            if event is _DONE:
+                return
+            yield event
+
+    async def result(self) -> RenderResult:
+        """Wait for the render to finish and return its result."""
+        try:
+            return await asyncio.shield(self._future)
+        except asyncio.CancelledError:
+            # 等待方被取消时也停止渲染，并等到编码器和临时文件清理完毕
+            self.cancel()
+            await asyncio.wait([self._future])
+            raise
+
+    def __await__(self):
+        return self.result().__await__()
+
+
+def save_async(editor: VideoEditor, output_path: str, codec: str = 'libx264', fps: Optional[int] = None,
+               checkpoint_dir: Optional[str] = None, chunk_duration: float = 10.0,
+               executor=None, progress_interval: float = 0.5) -> RenderJob:
+    """Asynchronous VideoEditor.save.
+
+    Args:
+        editor: VideoEditor with every effect added
+        output_path (str): Path to save the output video
+        codec (str): Video codec to use
+        fps (int): Output frame rate, the clip's by default
+        checkpoint_dir (str): Directory for resumable chunked rendering, see VideoEditor.save
+        chunk_duration (float): Length of each chunk in seconds when checkpointing
+        executor: concurrent.futures executor to run in, the loop's default when None
+        progress_interval (float): Minimum seconds between two progress events
+
+    Returns:
+        RenderJob, to iterate for progress and await for the RenderResult
+    """
+    fps = fps or editor.clip.fps
+    total_frames = len(np.arange(0, editor.clip.duration, 1.0 / fps))
+
+    def render(logger):
+        editor.save(output_path, codec=codec, fps=fps, checkpoint_dir=checkpoint_dir,
+                    chunk_duration=chunk_duration, logger=logger)
+
+    return RenderJob(output_path, render, total_frames, executor, progress_interval)
+
+
+def process_video_effects_async(params: VideoProcessingParams, output_path: str, fps: int = 30,
+                                checkpoint_dir: Optional[str] = None, chunk_duration: float = 10.0,
+                                executor=None, progress_interval: float = 0.5) -> RenderJob:
+    """Asynchronous process_video_effects.
+
+    The editor is built in the worker thread as well, so opening the input
+    does not block the event loop either. Invalid parameters give a failed
+    RenderResult.
+
+    Args:
+        params: 视频处理参数
+        output_path: 输出文件路径
+        fps: 输出视频帧率
+        checkpoint_dir: 分段渲染的检查点目录
+        chunk_duration: 每个分段的时长（秒）
+        executor: concurrent.futures executor to run in, the loop's default when None
+        progress_interval (float): Minimum seconds between two progress events
+
+    Returns:
+        RenderJob, to iterate for progress and await for the RenderResult
+    """
+    def render(logger):
+        if not params.validate():
+            raise ValueError("Invalid video processing parameters")
+        editor = build_editor(params)
+        try:
+            # 总帧数要等编辑器建好才知道
+            logger.total_frames = len(np.arange(0, editor.clip.duration, 1.0 / fps))
+            logger.started = time.monotonic()
+            editor.save(output_path, fps=fps, checkpoint_dir=checkpoint_dir,
+                        chunk_duration=chunk_duration, logger=logger)
+        finally:
+            editor.base_clip.close()
+
+    return RenderJob(output_path, render, 0, executor, progress_interval)
@@ -0,0 +1,419 @@
+import logging
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from moviepy import AudioFileClip
+from moviepy.audio.AudioClip import AudioClip
+from moviepy.audio.io.ffmpeg_audiowriter import FFMPEG_AudioWriter
+from moviepy.config import FFMPEG_BINARY
+from .timewarp import hold_shape
+
+log = logging.getLogger()
+
+SAMPLE_RATE = 44100
+BLOCK_SIZE = 4096      # 每块的采样数，必须是 FRAME_SIZE // 2 的倍数
+FRAME_SIZE = 1024      # 时间伸缩的分析窗长（采样）
+TOLERANCE = 256        # 时间伸缩时每帧对齐位置的搜索范围（采样）
+SEARCH_STEP = 4        # 对齐粗搜索的抽取间隔
+ENVELOPE_HOP = 256     # 闪避包络的帧移（采样），必须整除 BLOCK_SIZE
+CACHED_BLOCKS = 8      # 保留最近渲染的块数
+
+# 可以直接复制 AAC 音轨的输出容器
+AAC_CONTAINERS = ('.mp4', '.m4v', '.mov', '.mkv')
+
+
+class _SourceWindow:
+    """Sample ranges of an AudioClip, read through a window of about a second."""
+
+    def __init__(self, audio, rate, chunk=SAMPLE_RATE):
+        self.audio = audio
+        self.rate = rate
+        self.chunk = chunk
+        self.nchannels = audio.nchannels
+        self.length = int(audio.duration * rate)
+        self._start = 0
+        self._samples = np.zeros((0, self.nchannels))
+
+    def read(self, start, stop):
+        """Samples [start, stop) as a (n, nchannels) float array, zeros outside the clip."""
+        out = np.zeros((stop - start, self.nchannels))
+        a, b = max(start, 0), min(stop, self.length)
+        if a >= b:
+            return out
+        if a < self._start or b > self._start + len(self._samples):
+            # 读取位置基本单调，窗口向前留一点余量给对齐搜索
+            first = max(a - self.chunk // 8, 0)
+            last = min(max(b, first + self.chunk), self.length)
+            samples = self.audio.get_frame(np.arange(first, last) / self.rate)
+            self._start, self._samples = first, np.asarray(samples, dtype=np.float64).reshape(last - first, -1)
+        out[a - start:b - start] = self._samples[a - self._start:b - self._start]
+        return out
+
+
+class TimeStretch:
+    """Pitch-preserving playback of source audio through a TimeWarp (WSOLA).
+
+    The output is built from Hann-windowed frames of frame_size samples,
+    half a frame apart. Each frame is read around the source position the
+    warp maps its centre to, moved by up to tolerance samples to where it
+    best continues the previous frame (waveform similarity overlap-add), so
+    slowed spans keep their pitch. At normal speed consecutive frames are
+    contiguous and the output equals the source.
+    """
+
+    def __init__(self, source, timewarp, rate=SAMPLE_RATE, frame_size=FRAME_SIZE, tolerance=TOLERANCE):
+        """Create the stretcher.
+
+        Args:
+            source (_SourceWindow): Source samples
+            timewarp (TimeWarp): Output time -> source time map
+            rate (int): Sample rate
+            frame_size (int): Frame length in samples (even)
+            tolerance (int): Largest shift of a frame from its nominal position, in samples
+        """
+        self.source = source
+        self.timewarp = timewarp
+        self.rate = rate
+        self.frame_size = frame_size
+        self.hop = frame_size // 2
+        self.tolerance = tolerance
+        # 周期 Hann 窗在 50% 重叠时逐点相加为 1
+        self.window = np.hanning(frame_size + 1)[:-1, None]
+        self.reset()
+
+    def reset(self):
+        """Forget the previous frame (the next render starts afresh)."""
+        self._next = None       # 下一次顺序渲染的起始采样
+        self._tail = None       # 已叠加到 _next 之后的部分
+        self._previous = None   # 上一帧的源起始位置
+
+    def _align(self, position):
+        """Source start of the next frame, nominally at position."""
+        if self._previous is None:
+            return position
+        follow = self._previous + self.hop
+        if abs(position - follow) <= 1:
+            return follow
+        n, d = self.frame_size, self.tolerance
+        template = self.source.read(follow, follow + n).sum(axis=1)
+        region = self.source.read(position - d, position + d + n).sum(axis=1)
+        if not template.any() or not region.any():
+            return position
+        # 先在抽取后的信号上粗搜索，再在粗搜索结果附近逐采样细化
+        step = SEARCH_STEP
+        best = int(np.argmax(np.correlate(region[::step], template[::step], 'valid'))) * step
+        lo, hi = max(best - step, 0), min(best + step, 2 * d)
+        return position - d + lo + int(np.argmax(np.correlate(region[lo:hi + n], template, 'valid')))
+
+    def render(self, start, count):
+        """Output samples [start, start + count); start and count are multiples of the hop."""
+        hop, n = self.hop, self.frame_size
+        first = start // hop
+        if self._next != start:
+            # 非顺序读取：从覆盖 start 的前一帧重新开始
+            self.reset()
+            first -= 1
+        frames = np.arange(first, (start + count) // hop)
+        acc = np.zeros(((len(frames) + 1) * hop, self.source.nchannels))
+        offset = frames[0] * hop
+        if self._tail is not None:
+            acc[:hop] = self._tail
+        # 帧中心的输出时间一次映射到源时间；时间映射在结尾处截断，超出结尾的帧按原速外推
+        times = (frames * hop + n // 2) / self.rate
+        end = self.timewarp.duration
+        centres = (self.timewarp(np.minimum(times, end)) + np.maximum(times - end, 0)) * self.rate - n // 2
+        for frame, centre in zip(frames, centres):
+            position = self._align(int(round(centre)))
+            i = frame * hop - offset
+            acc[i:i + n] += self.source.read(position, position + n) * self.window
+            self._previous = position
+        out = acc[start - offset:start - offset + count]
+        self._tail = acc[start - offset + count:].copy()
+        self._next = start + count
+        return out
+
+
+def _moving_average(series, n):
+    """Means of the windows of n values ending at each index from n - 1 on."""
+    total = np.cumsum(np.concatenate([[0.0], series]))
+    return (total[n:] - total[:-n]) / n
+
+
+class MusicBed:
+    """Music mixed under the edit, ducked while the main track is loud.
+
+    The sidechain is vectorized per block: the RMS level of the main track
+    is measured every ENVELOPE_HOP samples, hops above threshold_db target
+    the ducked gain, and the minimum of two moving averages of that target
+    (over attack and over release) gives a gain that falls within attack
+    and recovers over release. The gain is interpolated between hops.
+    """
+
+    def __init__(self, path, start_time=0, volume=0.5, loop=True, fade=1.0, duck_db=-12.0,
+                 threshold_db=-35.0, attack=0.05, release=0.5, rate=SAMPLE_RATE):
+        """Open the music.
+
+        Args:
+            path (str): Audio (or video) file of the music
+            start_time (float): Output time the music starts at
+            volume (float): Gain of the music (0 to 1)
+            loop (bool): Repeat the music until the end of the edit
+            fade (float): Fade in and out duration in seconds
+            duck_db (float): Gain change in dB while the main track is loud (0 disables ducking)
+            threshold_db (float): RMS level of the main track above which the music is ducked
+            attack (float): Seconds for the ducking to take effect
+            release (float): Seconds for the music to come back
+            rate (int): Sample rate
+        """
+        self.path = path
+        self.start_time = start_time
+        self.volume = volume
+        self.loop = loop
+        self.fade = fade
+        self.duck_db = duck_db
+        self.threshold_db = threshold_db
+        self.rate = rate
+        self.attack_hops = max(int(round(attack * rate / ENVELOPE_HOP)), 1)
+        self.release_hops = max(int(round(release * rate / ENVELOPE_HOP)), self.attack_hops)
+        self.source = _SourceWindow(AudioFileClip(path, fps=rate), rate)
+        self.reset()
+
+    @property
+    def nchannels(self):
+        return self.source.nchannels
+
+    def reset(self):
+        """Restart the sidechain envelope (the next block is not the continuation of the last one)."""
+        self._history = np.ones(self.release_hops - 1)
+        self._last = 1.0
+
+    def duck_gain(self, main):
+        """Per-sample music gain for a block of the main track (continuing the previous block)."""
+        hops = len(main) // ENVELOPE_HOP
+        if self.duck_db == 0:
+            return np.ones(len(main))
+        frames = main[:hops * ENVELOPE_HOP].reshape(hops, ENVELOPE_HOP, -1)
+        level = 10 * np.log10(np.maximum(np.mean(frames ** 2, axis=(1, 2)), 1e-20))
+        target = np.where(level > self.threshold_db, 10 ** (self.duck_db / 20), 1.0)
+        series = np.concatenate([self._history, target])
+        gain = np.minimum(_moving_average(series, self.attack_hops)[-hops:],
+                          _moving_average(series, self.release_hops)[-hops:])
+        self._history = series[len(series) - (self.release_hops - 1):]
+        # 帧间线性插值，避免增益阶跃产生咔嗒声
+        previous = np.concatenate([[self._last], gain[:-1]])
+        ramp = np.arange(1, ENVELOPE_HOP + 1) / ENVELOPE_HOP
+        self._last = gain[-1]
+        return (previous[:, None] + (gain - previous)[:, None] * ramp).ravel()
+
+    def _read(self, start, stop):
+        """Music samples [start, stop) relative to the start of the music."""
+        length = self.source.length
+        if not self.loop or length == 0:
+            return self.source.read(start, stop)
+        parts = []
+        while start < stop:
+            if start < 0:
+                end = min(stop, 0)
+                parts.append(np.zeros((end - start, self.nchannels)))
+            else:
+                offset = start % length
+                end = min(stop, start + length - offset)
+                parts.append(self.source.read(offset, offset + end - start))
+            start = end
+        return np.concatenate(parts)
+
+    def render(self, start, main, end_time):
+        """Ducked music for the block of the main track starting at output sample start.
+
+        Args:
+            start (int): First output sample of the block
+            main: Main track samples of the block
+            end_time (float): Output duration, where the music fades out
+        """
+        count = len(main)
+        first = start - int(round(self.start_time * self.rate))
+        music = self._read(first, first + count)
+        t = (start + np.arange(count)) / self.rate
+        if self.fade > 0:
+            gain = np.clip(np.minimum(t - self.start_time, end_time - t) / self.fade, 0, 1)
+        else:
+            gain = ((t >= self.start_time) & (t < end_time)).astype(np.float64)
+        gain *= self.volume * self.duck_gain(main)
+        if music.shape[1] != main.shape[1]:
+            music = music.mean(axis=1, keepdims=True)
+        return music * gain[:, None]
+
+
+class AudioTrack:
+    """Audio of an edit, rendered in fixed-size blocks.
+
+    The source audio follows the edit's TimeWarp through a TimeStretch,
+    is faded out and back in around freeze frames, and is mixed with an
+    optional MusicBed. Blocks are rendered in order (the stretch and the
+    sidechain carry state from one block to the next) and the last few
+    are cached for clip().
+    """
+
+    def __init__(self, audio, timewarp, rate=SAMPLE_RATE, block_size=BLOCK_SIZE, freeze_fade=0.15):
+        """Create the track.
+
+        Args:
+            audio: Source AudioClip (in source time), or None
+            timewarp (TimeWarp): Output time -> source time map of the edit
+            rate (int): Sample rate
+            block_size (int): Samples per block
+            freeze_fade (float): Seconds of fade out before and fade in after each freeze
+        """
+        self.timewarp = timewarp
+        self.rate = rate
+        self.block_size = block_size
+        self.freeze_fade = freeze_fade
+        self.source = _SourceWindow(audio, rate) if audio is not None else None
+        self.stretch = TimeStretch(self.source, timewarp, rate) if audio is not None else None
+        self.music = None
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def nchannels(self):
+        if self.source is not None:
+            return self.source.nchannels
+        return self.music.nchannels if self.music is not None else 2
+
+    @property
+    def duration(self):
+        return self.timewarp.duration
+
+    @property
+    def samples(self):
+        return int(self.duration * self.rate)
+
+    def set_music(self, music):
+        """Mix music (a MusicBed, or None) under the source audio."""
+        self.music = music
+        self.reset()
+
+    def reset(self):
+        """Drop rendered blocks; call after the warp changed."""
+        with self._lock:
+            self._blocks = OrderedDict()
+            self._next = None
+            self._holds = [(o0, o1) for o0, o1, s0, s1, shape in self.timewarp.segments if shape is hold_shape]
+
+    def _freeze_gain(self, t):
+        gain = np.ones_like(t)
+        f = self.freeze_fade
+        for o0, o1 in self._holds:
+            gain = np.minimum(gain, np.interp(t, [o0 - f, o0, o1, o1 + f], [1, 0, 0, 1]))
+        return gain
+
+    def _render(self, index):
+        start = index * self.block_size
+        if index != self._next:
+            if self.stretch is not None:
+                self.stretch.reset()
+            if self.music is not None:
+                self.music.reset()
+        self._next = index + 1
+
+        gain = self._freeze_gain((start + np.arange(self.block_size)) / self.rate)
+        if self.source is None:
+            block = np.zeros((self.block_size, self.nchannels))
+        elif not gain.any():
+            # 整块处于冻结帧中：不做时间伸缩，下一块重新开始
+            block = np.zeros((self.block_size, self.nchannels))
+            self.stretch.reset()
+        else:
+            block = self.stretch.render(start, self.block_size) * gain[:, None]
+        if self.music is not None:
+            block = block + self.music.render(start, block, self.duration)
+        return np.clip(block, -1, 1)
+
+    def block(self, index):
+        """Samples of block index, shape (block_size, nchannels)."""
+        with self._lock:
+            block = self._blocks.get(index)
+            if block is None:
+                block = self._blocks[index] = self._render(index)
+                if len(self._blocks) > CACHED_BLOCKS:
+                    self._blocks.popitem(last=False)
+            return block
+
+    def blocks(self):
+        """Iterate over the blocks of the whole track, the last one trimmed."""
+        total = self.samples
+        for index in range(-(-total // self.block_size)):
+            yield self.block(index)[:total - index * self.block_size]
+
+    def get_frame(self, t):
+        """Samples at output time(s) t, as AudioClip frame functions return them."""
+        scalar = np.isscalar(t)
+        n = np.round(np.atleast_1d(np.asarray(t, dtype=np.float64)) * self.rate).astype(np.int64)
+        out = np.zeros((len(n), self.nchannels))
+        valid = (n >= 0) & (n < self.samples)
+        if valid.any():
+            indexes = n[valid] // self.block_size
+            values = np.empty((len(indexes), self.nchannels))
+            for index in np.unique(indexes):
+                mask = indexes == index
+                values[mask] = self.block(int(index))[n[valid][mask] - index * self.block_size]
+            out[valid] = values
+        if self.nchannels == 1:
+            out = out[:, 0]
+        return out[0] if scalar else out
+
+    def clip(self):
+        """AudioClip playing the track."""
+        clip = AudioClip(duration=self.duration, fps=self.rate)
+        clip.frame_function = self.get_frame
+        clip.nchannels = self.nchannels
+        return clip
+
+    def write(self, path, codec='aac', bitrate=None):
+        """Encode the whole track into an audio file, block by block."""
+        writer = FFMPEG_AudioWriter(path, self.rate, nbytes=2, nchannels=self.nchannels, codec=codec, bitrate=bitrate)
+        try:
+            for block in self.blocks():
+                writer.write_frames((block * 32767).astype(np.int16))
+        finally:
+            writer.close()
+        return path
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def write_async(audio, path, rate=SAMPLE_RATE, codec='aac'):
+    """Encode audio into path on a background thread.
+
+    Args:
+        audio: AudioTrack, or any AudioClip
+        path (str): Audio file to write
+        rate (int): Sample rate for AudioClips
+        codec (str): Audio codec
+
+    Returns:
+        concurrent.futures.Future resolving to path
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(4, thread_name_prefix='reelrush-audio')
+    if isinstance(audio, AudioTrack):
+        return _executor.submit(audio.write, path, codec)
+
+    def write():
+        audio.write_audiofile(path, fps=rate, codec=codec, logger=None)
+        return path
+    return _executor.submit(write)
+
+
+def mux(video_path, audio_path, output_path):
+    """Copy the video stream of video_path and the audio of audio_path into output_path."""
+    subprocess.run([
+        FFMPEG_BINARY, '-y', '-v', 'error', '-i', video_path, '-i', audio_path,
+        '-map', '0:v', '-map', '1:a', '-c', 'copy', '-shortest', output_path
+    ], check=True)
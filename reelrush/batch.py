@@ -0,0 +1,113 @@
+import heapq
+import logging
+import os
+import tempfile
+from typing import List, Tuple
+import numpy as np
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from .effects_processor import VideoProcessingParams, build_editor, source_range_clip
+from .source import SharedSource, merge_ranges
+
+log = logging.getLogger()
+
+
+def plan_source_ranges(params_list: List[VideoProcessingParams], source_duration: float) -> List[Tuple[float, float]]:
+    """Plan the union of source ranges needed by a batch of jobs.
+
+    Args:
+        params_list: Jobs reading the same source
+        source_duration: Duration of the source video
+
+    Returns:
+        Sorted, disjoint list of (start, end) source ranges
+    """
+    ranges = []
+    for params in params_list:
+        for start, end in params.source_ranges or [(0, source_duration)]:
+            ranges.append((max(0, start), min(end, source_duration)))
+    return merge_ranges(ranges)
+
+
+def process_video_effects_batch(jobs: List[Tuple[VideoProcessingParams, str]], fps: int = 30,
+                                codec: str = 'libx264', cache_frames: int = 8) -> dict:
+    """Render many reels cut from one source file with a single decode pass.
+
+    Every job gets its own effect pipeline and encoder, but all of them read
+    frames through one shared decoder. Jobs are advanced frame by frame in
+    order of the source time they need next, so the decoder only moves
+    forward and frames used by several jobs are decoded once.
+
+    Args:
+        jobs: List of (params, output_path); every params must use the same video_path
+        fps: Output frame rate
+        codec: Video codec to use
+        cache_frames: Number of decoded frames shared between jobs
+
+    Returns:
+        dict with decode statistics ('decoded_frames', 'cache_hits', 'unique_duration')
+    """
+    if not jobs:
+        return {'decoded_frames': 0, 'cache_hits': 0, 'unique_duration': 0}
+
+    video_paths = {params.video_path for params, _ in jobs}
+    if len(video_paths) != 1 or None in video_paths:
+        raise ValueError(f"All batch jobs must share one video_path, got {video_paths}")
+
+    source = SharedSource(video_paths.pop(), cache_frames=cache_frames)
+    plan = plan_source_ranges([params for params, _ in jobs], source.duration)
+    unique_duration = sum(end - start for start, end in plan)
+    log.info(f"Batch of {len(jobs)} jobs needs {unique_duration:.2f}s of unique source footage")
+
+    renders = []
+    temp_dir = tempfile.mkdtemp(prefix='reelrush_batch_')
+    try:
+        for i, (params, output_path) in enumerate(jobs):
+            if not params.validate():
+                log.error(f"Skipping invalid batch job {output_path}")
+                continue
+            base = source_range_clip(params, source)
+            editor = build_editor(params, source_clip=base)
+            clip = editor.clip
+
+            # 音频先单独写出，视频编码时再合并
+            audiofile = None
+            if clip.audio is not None:
+                audiofile = os.path.join(temp_dir, f'job_{i}.m4a')
+                clip.audio.write_audiofile(audiofile, codec='aac', logger=None)
+
+            writer = FFMPEG_VideoWriter(output_path, clip.size, fps, codec=codec, audiofile=audiofile)
+            times = np.arange(0, clip.duration, 1.0 / fps)
+            # 源时间 = 片段范围映射(慢动作/冻结帧时间映射(输出时间))
+            source_time = lambda t, base=base, editor=editor: base.source_time(editor.timewarp(t))
+            renders.append({'clip': clip, 'source_time': source_time, 'writer': writer, 'times': times, 'index': 0})
+
+        # 按下一帧所需的源时间排序推进各任务，使解码器只向前移动
+        heap = [(render['source_time'](render['times'][0]), i)
+                for i, render in enumerate(renders) if len(render['times'])]
+        heapq.heapify(heap)
+        while heap:
+            _, i = heapq.heappop(heap)
+            render = renders[i]
+            t = render['times'][render['index']]
+            frame = render['clip'].get_frame(t)
+            if frame.dtype != np.uint8:
+                frame = frame.astype(np.uint8)
+            render['writer'].write_frame(frame)
+
+            render['index'] += 1
+            if render['index'] < len(render['times']):
+                next_t = render['times'][render['index']]
+                heapq.heappush(heap, (render['source_time'](next_t), i))
+    finally:
+        for render in renders:
+            render['writer'].close()
+        for name in os.listdir(temp_dir):
+            os.remove(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
+        source.close()
+
+    return {
+        'decoded_frames': source.decoded_frames,
+        'cache_hits': source.cache_hits,
+        'unique_duration': unique_duration
+    }
@@ -0,0 +1,115 @@
+import threading
+import numpy as np
+
+
+class FramePool:
+    """Reusable frame buffers keyed by shape and dtype.
+
+    Buffers handed out by the pool are "transient": their content is only
+    valid until the effect that produced them renders its next frame. An
+    effect receiving a transient buffer as input may therefore write its
+    result into it instead of allocating a new frame.
+    """
+
+    def __init__(self, max_free=8):
+        """Create an empty pool.
+
+        Args:
+            max_free (int): Maximum number of idle buffers kept per shape/dtype
+        """
+        self.max_free = max_free
+        self.allocations = 0  # 新分配的缓冲区数量
+        self.reuses = 0       # 复用的缓冲区数量
+        self._free = {}
+        self._in_use = set()
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype=np.uint8):
+        """Get a buffer of the given shape and dtype (content is undefined)."""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                buf = free.pop()
+                self.reuses += 1
+            else:
+                buf = np.empty(shape, dtype=dtype)
+                self.allocations += 1
+            self._in_use.add(id(buf))
+        return buf
+
+    def release(self, buf):
+        """Return a buffer to the pool."""
+        key = (buf.shape, buf.dtype.str)
+        with self._lock:
+            self._in_use.discard(id(buf))
+            free = self._free.setdefault(key, [])
+            if len(free) < self.max_free:
+                free.append(buf)
+
+    def writable(self, frame):
+        """Whether frame is a transient pool buffer that may be overwritten."""
+        return id(frame) in self._in_use
+
+    def clear(self):
+        """Drop all idle buffers."""
+        with self._lock:
+            self._free.clear()
+
+
+# 进程内共享的默认缓冲池
+frame_pool = FramePool()
+
+
+class FrameRing:
+    """A small ring of pooled output buffers owned by one effect.
+
+    Consecutive frames are written to different buffers, so a consumer may
+    still look at the previous frame while the next one is being rendered.
+    """
+
+    def __init__(self, size=2, pool=None):
+        """Create the ring.
+
+        Args:
+            size (int): Number of buffers to rotate through
+            pool (FramePool): Pool to take buffers from, defaults to frame_pool
+        """
+        self.size = size
+        self.pool = pool or frame_pool
+        self._buffers = []
+        self._index = -1
+
+    def next(self, shape, dtype=np.uint8):
+        """Get the next output buffer with the given shape and dtype."""
+        if self._buffers and (self._buffers[0].shape != tuple(shape) or self._buffers[0].dtype != dtype):
+            self.close()
+        self._index = (self._index + 1) % self.size
+        if self._index >= len(self._buffers):
+            self._buffers.append(self.pool.acquire(shape, dtype))
+        return self._buffers[self._index]
+
+    def target(self, frame, inplace=False):
+        """Get the buffer an effect should write its result for frame into.
+
+        Args:
+            frame: Input frame of the effect
+            inplace (bool): Whether the effect can read and write the same buffer
+
+        Returns:
+            frame itself if it is a transient pool buffer and inplace is allowed,
+            otherwise the next buffer of this ring
+        """
+        if inplace and self.pool.writable(frame):
+            return frame
+        return self.next(frame.shape, frame.dtype)
+
+    def close(self):
+        """Give all buffers back to the pool."""
+        for buf in self._buffers:
+            self.pool.release(buf)
+        self._buffers = []
+        self._index = -1
+
+    def __del__(self):
+        self.close()
@@ -0,0 +1,480 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field, replace
+from typing import Dict, Optional
+import numpy as np
+from moviepy.audio.AudioClip import AudioArrayClip
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from .audio import SAMPLE_RATE
+from .effects.freeze import FreezeFrame
+from .effects.glitch import MODES as GLITCH_MODES
+from .effects.motion import SlowMotion
+from .effects_processor import (
+    VideoProcessingParams, TextEffectParams, SlowMotionParams, CameraShakeParams, GlitchParams,
+    ParticleExplosionParams, ZoomParams, SlideTransitionParams, FilterParams, FlashCutsParams,
+    ScoreboardParams, MusicParams, build_editor
+)
+from .metrics import admission_decisions
+from .timewarp import TimeWarp
+
+log = logging.getLogger()
+
+# 默认成本配置：在单核 x86 节点上用 1280x720 素材校准得到，部署前应在目标节点上重新 calibrate()
+# 时间单位为"每百万像素每帧的秒数"，内存单位为"整帧 RGB 缓冲区的个数"
+# 音频与分辨率无关，单位为"每秒输出音频的秒数"
+DEFAULT_PROFILE = {
+    'decode': 0.0067,
+    'encode': 0.0351,
+    'effects': {
+        'text': 0.0010,
+        'text:gaussian_blur': 0.0026,
+        'text:box_blur': 0.0018,
+        'text:glass': 0.0051,
+        'text:motion_blur': 0.0055,
+        'camera_shake': 0.0112,
+        'glitch': 0.0011,
+        'glitch:rgb_split': 0.0011,  # 故障模式按强度为 1 时的出现频率平均到每帧
+        'glitch:blocks': 0.0001,
+        'glitch:scanlines': 0.0001,
+        'glitch:quantize': 0.0001,
+        'particle': 0.0017,
+        'zoom': 0.0105,
+        'slide': 0.0062,
+        'flash_cuts': 0.0010,
+        'transition': 0.0012,
+        'scoreboard': 0.0013,
+        'filter:grayscale': 0.0009,
+        'filter:sepia': 0.0012,
+        'filter:warm': 0.0003,
+        'filter:cool': 0.0002,
+        'filter:vintage': 0.0015,
+        'filter:gaussian_blur': 0.0080,
+        'filter:box_blur': 0.0021,
+        'filter:glass': 0.0520,
+        'filter:motion_blur': 0.0737,
+        'filter:lut': 0.0022
+    },
+    'memory_base': 160 * 1024 * 1024,  # 解释器、moviepy 和 ffmpeg 子进程
+    'memory_frames': {
+        'base': 12,  # 解码缓存、读写管道中的帧
+        'text': 3,
+        'camera_shake': 2,
+        'glitch': 2,
+        'glitch:rgb_split': 0,  # 在平移的输出缓冲上原地修改
+        'glitch:blocks': 0,
+        'glitch:scanlines': 0,
+        'glitch:quantize': 0,
+        'particle': 2,
+        'zoom': 3,
+        'slide': 2,
+        'flash_cuts': 2,
+        'transition': 4,
+        'scoreboard': 1,
+        'filter': 3,
+        'filter:glass': 8,
+        'filter:lut': 6
+    },
+    'memory_fixed': {
+        'filter:lut': 64 * 1024 * 1024,  # 每个 LUT 的 256^3 查找表
+        'music': 16 * 1024 * 1024        # 音乐解码窗口和闪避包络
+    },
+    'audio': {
+        'mix': 0.059,      # 渲染并编码原声
+        'stretch': 0.0084,  # 慢动作区间的时间伸缩（WSOLA）
+        'music': 0.0064     # 背景音乐解码、闪避和混音
+    }
+}
+
+
+@dataclass
+class CostEstimate:
+    """Predicted cost of rendering one job."""
+    seconds: float              # 预计渲染时间（秒）
+    peak_memory: int            # 预计内存峰值（字节）
+    output_duration: float      # 时间映射后的输出时长（秒）
+    frames: int                 # 输出帧数
+    size: tuple                 # 输出分辨率 (宽, 高)
+    breakdown: Dict[str, float] = field(default_factory=dict)  # 各部分耗时（秒）
+
+
+class CostModel:
+    """Predict render time and peak memory of a job before rendering it.
+
+    Time is the sum of decode and encode per frame plus, for every effect,
+    its measured per-frame cost times the number of output frames it
+    covers, all scaled by the frame size in megapixels. Audio is costed
+    per output second: the source mix over the whole output, the time
+    stretch over slow motion and the music bed while it plays. Output
+    duration and effect windows are computed through the same TimeWarp
+    the editor uses, so slow motion and freeze frames are accounted for.
+    """
+
+    def __init__(self, profile=None):
+        """Create the model.
+
+        Args:
+            profile (dict): Calibrated costs, defaults to DEFAULT_PROFILE
+        """
+        self.profile = json.loads(json.dumps(profile or DEFAULT_PROFILE))
+        # 旧版本保存的配置缺少的部分使用默认值
+        for key, value in DEFAULT_PROFILE.items():
+            self.profile.setdefault(key, json.loads(json.dumps(value)))
+
+    @classmethod
+    def load(cls, path):
+        """Load a profile saved by save()."""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def save(self, path):
+        """Write the profile as JSON."""
+        with open(path, 'w') as f:
+            json.dump(self.profile, f, indent=2)
+
+    def _effect_cost(self, key):
+        effects = self.profile['effects']
+        if key in effects:
+            return effects[key]
+        # 未校准的变体按同类特效估算
+        return effects.get(key.split(':')[0], 0.0)
+
+    def _memory_frames(self, key):
+        frames = self.profile['memory_frames']
+        return frames.get(key, frames.get(key.split(':')[0], 2))
+
+    @staticmethod
+    def _source_info(params):
+        """(duration, (width, height), fps, has_audio) of the job's input."""
+        if params.video_file_clip is not None:
+            clip = params.video_file_clip
+            return clip.duration, tuple(clip.size), clip.fps, clip.audio is not None
+        infos = ffmpeg_parse_infos(params.video_path)
+        return infos['duration'], tuple(infos['video_size']), infos['video_fps'], infos['audio_found']
+
+    @staticmethod
+    def effect_windows(params: VideoProcessingParams, source_duration: float, has_audio: bool = True):
+        """Output duration and (cost key, output seconds) for every effect of a job.
+
+        Args:
+            params: Job description
+            source_duration (float): Duration of the input video
+            has_audio (bool): Whether the input has an audio track
+
+        Returns:
+            (output_duration, list of (key, seconds), source_seconds, list of (audio key, seconds))
+        """
+        ranges = params.source_ranges or [(0, source_duration)]
+        ranges = [(max(0, start), min(end, source_duration)) for start, end in ranges]
+        source_seconds = sum(end - start for start, end in ranges)
+        windows = []
+        edit_duration = source_seconds
+        if params.play_transition and len(ranges) > 1:
+            overlap = params.play_transition.duration * (len(ranges) - 1)
+            edit_duration -= overlap
+            windows.append(('transition', overlap))
+
+        # 与 build_editor 相同：先按开始时间应用慢动作和冻结帧
+        warp = TimeWarp(edit_duration)
+        remaps = [('slow_motion', e) for e in params.slow_motion_effects or []]
+        remaps += [('freeze', e) for e in params.freeze_frame_effects or []]
+        stretched = []
+        for kind, effect in sorted(remaps, key=lambda x: x[1].start_time):
+            if not effect.validate():
+                continue
+            if kind == 'slow_motion':
+                SlowMotion.warp(warp, effect.start_time, effect.start_time + effect.duration,
+                                effect.speed, effect.abruptness, effect.soonness)
+                stretched.append(effect)
+            else:
+                FreezeFrame.warp(warp, effect.start_time, effect.duration)
+
+        def covered(start, duration):
+            start = min(start, edit_duration)
+            end = min(start + duration, edit_duration)
+            return max(0.0, warp.to_output(end) - warp.to_output(start))
+
+        timed = [
+            (params.text_effects, lambda e: 'text' + (f':{e.blur_background}' if e.blur_background else '')),
+            (params.camera_shake_effects, lambda e: 'camera_shake'),
+            (params.glitch_effects, lambda e: 'glitch'),
+            (params.particle_effects, lambda e: 'particle'),
+            (params.zoom_effects, lambda e: 'zoom'),
+            (params.slide_transitions, lambda e: 'slide'),
+            (params.filter_effects, lambda e: f'filter:{e.filter_name}')
+        ]
+        for effects, key in timed:
+            for effect in effects or []:
+                windows.append((key(effect), covered(effect.start_time, effect.duration)))
+        for effect in params.glitch_effects or []:
+            # 除平移外的模式只在随机出现的帧上渲染，频率与强度成正比
+            for mode in effect.modes or ():
+                if mode != 'shift':
+                    windows.append((f'glitch:{mode}', covered(effect.start_time, effect.duration) * effect.intensity))
+        if params.flash_cuts:
+            cuts = params.flash_cuts
+            windows.append(('flash_cuts', sum(covered(max(0, t - cuts.cut_duration / 2), cuts.cut_duration)
+                                              for t in cuts.timestamps)))
+        board = params.scoreboard
+        if board:
+            duration = board.duration if board.duration is not None else edit_duration - board.start_time
+            windows.append(('scoreboard', covered(board.start_time, duration)))
+
+        audio = []
+        music = params.music
+        if music and music.validate():
+            seconds = warp.duration - warp.to_output(min(music.start_time, edit_duration))
+            if not music.loop:
+                seconds = min(seconds, ffmpeg_parse_infos(music.path)['duration'])
+            audio.append(('music', max(0.0, seconds)))
+        if has_audio:
+            audio += [('stretch', covered(e.start_time, e.duration)) for e in stretched]
+        if has_audio or audio:
+            # 有音轨就要渲染并编码整段输出音频
+            audio.append(('mix', warp.duration))
+        return warp.duration, windows, source_seconds, audio
+
+    def estimate(self, params: VideoProcessingParams, fps: int = 30) -> CostEstimate:
+        """Predict the cost of rendering params at fps."""
+        source_duration, size, source_fps, has_audio = self._source_info(params)
+        output_duration, windows, source_seconds, audio = self.effect_windows(params, source_duration, has_audio)
+        megapixels = size[0] * size[1] / 1e6
+        frames = int(np.ceil(output_duration * fps))
+
+        breakdown = {
+            # 解码器按源帧率读取所用的每一帧
+            'decode': source_seconds * (source_fps or fps) * megapixels * self.profile['decode'],
+            'encode': frames * megapixels * self.profile['encode']
+        }
+        for key, seconds in windows:
+            breakdown[key] = breakdown.get(key, 0.0) + seconds * fps * megapixels * self._effect_cost(key)
+        for key, seconds in audio:
+            breakdown[f'audio:{key}'] = breakdown.get(f'audio:{key}', 0.0) + seconds * self.profile['audio'][key]
+
+        frame_bytes = size[0] * size[1] * 3
+        buffer_frames = self._memory_frames('base') + sum(self._memory_frames(key) for key, _ in windows)
+        fixed = sum(self.profile['memory_fixed'].get(key, 0) for key in {key for key, _ in windows + audio})
+        peak_memory = int(self.profile['memory_base'] + fixed + buffer_frames * frame_bytes)
+
+        return CostEstimate(
+            seconds=float(sum(breakdown.values())),
+            peak_memory=peak_memory,
+            output_duration=output_duration,
+            frames=frames,
+            size=size,
+            breakdown=breakdown
+        )
+
+    @staticmethod
+    def _calibration_jobs(duration, lut_path, data_path):
+        """One job per cost key, each with a single effect covering the whole clip."""
+        jobs = {
+            'text': VideoProcessingParams(text_effects=[TextEffectParams(0, duration, 'Calibration')]),
+            'camera_shake': VideoProcessingParams(camera_shake_effects=[CameraShakeParams(0, duration)]),
+            'glitch': VideoProcessingParams(glitch_effects=[GlitchParams(0, duration)]),
+            'particle': VideoProcessingParams(particle_effects=[ParticleExplosionParams(0, duration)]),
+            'zoom': VideoProcessingParams(zoom_effects=[ZoomParams(0, duration)]),
+            'slide': VideoProcessingParams(slide_transitions=[SlideTransitionParams(0, duration)]),
+            'flash_cuts': VideoProcessingParams(flash_cuts=FlashCutsParams([duration / 2], cut_duration=duration)),
+            'scoreboard': VideoProcessingParams(scoreboard=ScoreboardParams(data_path)),
+        }
+        for mode in GLITCH_MODES[1:]:
+            # 叠加在切片平移上测量，记录的成本扣除平移本身
+            jobs[f'glitch:{mode}'] = VideoProcessingParams(glitch_effects=[GlitchParams(0, duration, modes=['shift', mode])])
+        for blur in ('gaussian_blur', 'box_blur', 'glass', 'motion_blur'):
+            jobs[f'text:{blur}'] = VideoProcessingParams(
+                text_effects=[TextEffectParams(0, duration, 'Calibration', blur_background=blur)])
+        for name in ('grayscale', 'sepia', 'warm', 'cool', 'vintage', 'gaussian_blur',
+                     'box_blur', 'glass', 'motion_blur', 'lut'):
+            jobs[f'filter:{name}'] = VideoProcessingParams(
+                filter_effects=[FilterParams(0, duration, name, lut_path=lut_path if name == 'lut' else None)])
+        return jobs
+
+    @classmethod
+    def calibrate(cls, video_path, duration=2.0, fps=30, codec='libx264', lut_path=None, music_path=None):
+        """Measure per-frame costs on this machine.
+
+        Every effect is rendered alone over the first duration seconds of
+        video_path; its cost is the time and memory above a render without
+        effects. Audio costs are measured by encoding the audio track of
+        the same jobs, if video_path has audio.
+
+        Args:
+            video_path (str): Sample video, ideally at the resolution jobs use
+            duration (float): Seconds rendered per measurement
+            fps (int): Frame rate of the measurements
+            codec (str): Video codec to use for the encode measurement
+            lut_path (str): .cube file for the 'lut' filter, an identity LUT is used when None
+            music_path (str): Music file for the music bed, a generated tone is used when None
+
+        Returns:
+            CostModel with the measured profile
+        """
+        profile = json.loads(json.dumps(DEFAULT_PROFILE))
+        temp_dir = tempfile.mkdtemp(prefix='reelrush_calibrate_')
+        if lut_path is None:
+            lut_path = os.path.join(temp_dir, 'identity.cube')
+            levels = np.linspace(0, 1, 17)
+            b, g, r = np.meshgrid(levels, levels, levels, indexing='ij')
+            with open(lut_path, 'w') as f:
+                f.write('LUT_3D_SIZE 17\n')
+                np.savetxt(f, np.stack([r, g, b], -1).reshape(-1, 3), fmt='%.6f')
+        # 每半秒一个事件，比分牌需要不断重绘
+        data_path = os.path.join(temp_dir, 'scoreboard.csv')
+        with open(data_path, 'w') as f:
+            f.write('time,home,away,home_score,away_score,clock\n')
+            for k, t in enumerate(np.arange(0, duration, 0.5)):
+                f.write(f'{t:.2f},HOME,AWAY,{2 * k},{k},{12 * 60 - t:.1f}\n')
+        if music_path is None:
+            music_path = os.path.join(temp_dir, 'music.m4a')
+            tone = np.sin(2 * np.pi * 440 * np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE)
+            AudioArrayClip(np.stack([tone, tone], 1) * 0.3, fps=SAMPLE_RATE).write_audiofile(
+                music_path, codec='aac', logger=None)
+
+        times = np.arange(0, duration, 1.0 / fps)
+
+        def measure(params):
+            editor = build_editor(replace(params, video_path=video_path, source_ranges=[(0, duration)]))
+            tracemalloc.start()
+            start = time.perf_counter()
+            for t in times:
+                editor.clip.get_frame(t)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            return elapsed, peak, editor.clip.size
+
+        def measure_audio(params, encode=False):
+            """Seconds per output second to render (and encode) the audio of a job."""
+            editor = build_editor(replace(params, video_path=video_path, source_ranges=[(0, duration)]))
+            start = time.perf_counter()
+            if encode:
+                editor.audio.write(os.path.join(temp_dir, 'audio.m4a'))
+            else:
+                for _ in editor.audio.blocks():
+                    pass
+            return (time.perf_counter() - start) / editor.duration
+
+        try:
+            base_time, base_peak, size = measure(VideoProcessingParams())
+            megapixels = size[0] * size[1] / 1e6
+            frame_bytes = size[0] * size[1] * 3
+            per_frame = len(times) * megapixels
+
+            source_fps = ffmpeg_parse_infos(video_path)['video_fps'] or fps
+            profile['decode'] = base_time * fps / source_fps / per_frame
+
+            # 编码：把同一帧反复写入编码器
+            frame = np.random.randint(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+            writer = FFMPEG_VideoWriter(os.path.join(temp_dir, 'encode.mp4'), size, fps, codec=codec)
+            start = time.perf_counter()
+            try:
+                for _ in times:
+                    writer.write_frame(frame)
+            finally:
+                writer.close()
+            profile['encode'] = (time.perf_counter() - start) / per_frame
+
+            for key, params in cls._calibration_jobs(duration, lut_path, data_path).items():
+                try:
+                    elapsed, peak, _ = measure(params)
+                except Exception as e:
+                    log.warning(f"Could not calibrate {key}: {e}")
+                    continue
+                # 故障模式的测量包含切片平移（先于各模式校准）
+                shared = 'glitch' if key.startswith('glitch:') else None
+                included = profile['effects'][shared] if shared else 0.0
+                profile['effects'][key] = max(0.0, (elapsed - base_time) / per_frame - included)
+                extra_frames = max(0.0, peak - base_peak - profile['memory_fixed'].get(key, 0)) / frame_bytes
+                if shared:
+                    profile['memory_frames'][key] = max(0.0, round(extra_frames - profile['memory_frames'][shared], 1))
+                else:
+                    # 缓冲池会复用别的特效释放的帧，至少按一帧输出缓冲计算
+                    profile['memory_frames'][key] = max(1.0, round(extra_frames, 1))
+                log.info(f"Calibrated {key}: {profile['effects'][key] * 1000:.2f} ms/MP/frame, "
+                         f"{profile['memory_frames'][key]} frames")
+
+            if ffmpeg_parse_infos(video_path)['audio_found']:
+                profile['audio']['mix'] = measure_audio(VideoProcessingParams(), encode=True)
+                # 编码远比渲染慢，伸缩和音乐的成本只比较渲染时间，避免被编码的波动淹没
+                base = measure_audio(VideoProcessingParams())
+                slow = VideoProcessingParams(slow_motion_effects=[SlowMotionParams(0, duration, speed=0.5, abruptness=1)])
+                profile['audio']['stretch'] = max(0.0, measure_audio(slow) - base)
+                profile['audio']['music'] = max(0.0, measure_audio(VideoProcessingParams(music=MusicParams(music_path))) - base)
+                log.info("Calibrated audio: " + ', '.join(f"{key} {value * 1000:.1f} ms/s"
+                                                         for key, value in profile['audio'].items()))
+            else:
+                log.warning(f"{video_path} has no audio, keeping the default audio costs")
+        finally:
+            for name in os.listdir(temp_dir):
+                os.remove(os.path.join(temp_dir, name))
+            os.rmdir(temp_dir)
+        return cls(profile)
+
+
+class AdmissionController:
+    """Decide whether a worker should take a job, using CostModel estimates.
+
+    A job is routed elsewhere when it could never fit this worker (memory
+    above the limit, or a predicted render time above max_seconds). It is
+    queued when it would fit but the jobs already running leave too little
+    memory or too few render slots; otherwise it is accepted.
+    """
+
+    ACCEPT = 'accept'
+    QUEUE = 'queue'
+    ROUTE = 'route'
+
+    def __init__(self, memory_limit, max_concurrent=1, max_seconds=None, model=None):
+        """Create the controller.
+
+        Args:
+            memory_limit (int): Bytes of memory available for rendering on this worker
+            max_concurrent (int): Maximum number of jobs rendering at once
+            max_seconds (float): Jobs predicted to take longer are routed elsewhere
+            model (CostModel): Cost model, a default one when None
+        """
+        self.memory_limit = memory_limit
+        self.max_concurrent = max_concurrent
+        self.max_seconds = max_seconds
+        self.model = model or CostModel()
+        self._running = {}
+        self._lock = threading.RLock()
+
+    def decide(self, estimate: CostEstimate) -> str:
+        """Return ACCEPT, QUEUE or ROUTE for a job."""
+        if estimate.peak_memory > self.memory_limit:
+            return self.ROUTE
+        if self.max_seconds is not None and estimate.seconds > self.max_seconds:
+            return self.ROUTE
+        with self._lock:
+            used = sum(e.peak_memory for e in self._running.values())
+            if len(self._running) >= self.max_concurrent or used + estimate.peak_memory > self.memory_limit:
+                return self.QUEUE
+        return self.ACCEPT
+
+    def admit(self, job_id, params: VideoProcessingParams, fps: int = 30):
+        """Estimate a job and reserve its memory if it is accepted.
+
+        Returns:
+            (decision, CostEstimate); call release(job_id) when an accepted job ends
+        """
+        estimate = self.model.estimate(params, fps)
+        with self._lock:
+            decision = self.decide(estimate)
+            if decision == self.ACCEPT:
+                self._running[job_id] = estimate
+        admission_decisions.labels(decision=decision).inc()
+        log.info(f"Job {job_id}: {decision} (predicted {estimate.seconds:.1f}s, "
+                 f"{estimate.peak_memory / 2 ** 20:.0f} MB)")
+        return decision, estimate
+
+    def release(self, job_id):
+        """Free the reservation of a finished job."""
+        with self._lock:
+            self._running.pop(job_id, None)
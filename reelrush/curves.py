@@ -0,0 +1,106 @@
+import numpy as np
+
+# 缓动函数：输入输出都在 0-1 之间
+EASINGS = {
+    'linear': lambda u: u,
+    'ease_in': lambda u: u * u,
+    'ease_out': lambda u: 1 - (1 - u) * (1 - u),
+    'ease_in_out': lambda u: u * u * (3 - 2 * u),
+    'step': lambda u: np.where(u < 1, 0.0, 1.0)
+}
+
+
+class Curve:
+    """Keyframed value of an effect parameter over the effect's duration.
+
+    Keyframe positions are fractions of the effect duration (0 = effect
+    start, 1 = effect end). Each keyframe may name the easing used to reach
+    the next keyframe; otherwise the curve's default easing is used.
+
+    Example:
+        Curve([(0, 0), (0.2, 0.8), (0.8, 0.8), (1, 0)], easing='ease_in_out')
+    """
+
+    def __init__(self, keyframes, easing='linear'):
+        """Create a curve.
+
+        Args:
+            keyframes: List of (position, value) or (position, value, easing)
+            easing (str): Default easing between keyframes, one of EASINGS
+        """
+        if not keyframes:
+            raise ValueError("Curve needs at least one keyframe")
+        keyframes = sorted(keyframes, key=lambda k: k[0])
+        easings = [k[2] if len(k) > 2 else easing for k in keyframes]
+        for name in easings:
+            if name not in EASINGS:
+                raise ValueError(f"Unknown easing: {name}. Available easings: {list(EASINGS.keys())}")
+        self.keyframes = keyframes
+        self.positions = np.array([k[0] for k in keyframes], dtype=np.float64)
+        self.values = np.array([k[1] for k in keyframes], dtype=np.float64)
+        self.easings = easings
+
+    @classmethod
+    def constant(cls, value):
+        """A curve that stays at value."""
+        return cls([(0, value)])
+
+    @classmethod
+    def ramp(cls, start, end, easing='linear'):
+        """A curve going from start to end over the effect duration."""
+        return cls([(0, start), (1, end)], easing=easing)
+
+    def value_range(self):
+        """(min, max) of the keyframe values."""
+        return float(self.values.min()), float(self.values.max())
+
+    def __call__(self, u):
+        """Evaluate the curve at progress u (scalar or array, clipped to 0-1)."""
+        u = np.clip(np.asarray(u, dtype=np.float64), 0, 1)
+        if len(self.values) == 1:
+            return np.full_like(u, self.values[0])
+
+        # 找到每个 u 所在的关键帧区间
+        i = np.clip(np.searchsorted(self.positions, u, side='right') - 1, 0, len(self.positions) - 2)
+        span = self.positions[i + 1] - self.positions[i]
+        local = np.clip((u - self.positions[i]) / np.where(span > 0, span, 1), 0, 1)
+
+        eased = np.empty_like(local)
+        for name in set(self.easings[:-1]):
+            mask = np.isin(i, [j for j, e in enumerate(self.easings[:-1]) if e == name])
+            eased[mask] = EASINGS[name](local[mask])
+        return self.values[i] + (self.values[i + 1] - self.values[i]) * eased
+
+    def table(self, start_time, duration, fps):
+        """Compile the curve into a per-frame lookup table.
+
+        Args:
+            start_time (float): Effect start time on the output timeline
+            duration (float): Effect duration
+            fps (float): Frame rate the table is indexed with
+
+        Returns:
+            CurveTable
+        """
+        n = max(int(round(duration * fps)), 1) + 1
+        return CurveTable(self(np.linspace(0, 1, n)), start_time, fps)
+
+
+class CurveTable:
+    """Per-frame values of a compiled Curve, looked up by output time."""
+
+    def __init__(self, values, start_time, fps):
+        self.values = values
+        self.start_time = start_time
+        self.fps = fps
+
+    def __call__(self, t, start_time=None):
+        """Value at output time t (start_time overrides the table's start)."""
+        start = self.start_time if start_time is None else start_time
+        index = int(round((t - start) * self.fps))
+        return self.values[min(max(index, 0), len(self.values) - 1)]
+
+
+def as_curve(value):
+    """Wrap a plain number in a constant Curve, pass Curves through."""
+    return value if isinstance(value, Curve) else Curve.constant(value)
@@ -3,7 +3,7 @@ import cv2
 import numpy as np
 from reelrush.effects.filter import FilterEffect
 from reelrush.effects.text import DynamicText
-from reelrush.effects.particle import ParticleEffect
+from reelrush.effects.particle import ParticleExplosion
 from reelrush.effects.flash_cut import FlashCut
 from reelrush.effects.shake import CameraShake
 from reelrush.effects.glitch import GlitchEffect
@@ -12,11 +12,49 @@ from reelrush.effects.flash import FlashEffect
 from reelrush.effects.zoom import DynamicZoom
 from reelrush.effects.freeze import FreezeFrame
 from reelrush.effects.slide import SlideTransition
+from reelrush.effects.base import Effect, EffectChain
+from reelrush.effects.scoreboard import GameData, Scoreboard
+from reelrush.timewarp import TimeWarp
+from reelrush.audio import AAC_CONTAINERS, AudioTrack, MusicBed, mux, write_async
+from reelrush.curves import Curve
+from reelrush.metrics import instrument_output, timed_source, track_job
+from reelrush.keyframes import open_video
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+import logging
+import subprocess
 import os
 import json
+import shutil
+import tempfile
+import proglog
+from concurrent.futures import wait
+
+log = logging.getLogger()
+
+# 检查点清单格式变化时递增
+CHECKPOINT_VERSION = 1
+
+
+def _describe(value):
+    """JSON friendly description of an effect parameter."""
+    if isinstance(value, Curve):
+        return {'keyframes': [[float(p), float(v), e] for p, v, e in zip(value.positions, value.values, value.easings)]}
+    if isinstance(value, (tuple, list)):
+        return [_describe(v) for v in value]
+    return value
 
 
 class VideoEditor:
+    """Edit a video by stacking effects on top of it.
+
+    Timestamps passed to the add_* methods are source video times. Slow
+    motion and freeze frames are collected into one TimeWarp applied when
+    reading the source, and every other effect is placed on the output
+    timeline through that warp, so remaps should be added before the
+    effects that follow them.
+    """
+
     def __init__(self, video_path, vide_file_clip=None):
         """Initialize the video editor with a video file.
         
@@ -24,40 +62,79 @@ class VideoEditor:
             video_path (str): Path to the input video file
             video: VideoFileClip object
         """
+        self.video_path = video_path
         if video_path:
-            self.video_path = video_path
-            self.base_clip = VideoFileClip(video_path)
+            self.base_clip = open_video(video_path)
         elif vide_file_clip:
             self.base_clip = vide_file_clip
         else:
             raise ValueError("video_path or vide_file_clip must be provided")
-        self.clip = self.base_clip  # 保持 self.clip 引用，用于存储当前编辑状态
         self.effects = []  # 存储所有特效及其时间信息
-        self.duration = self.base_clip.duration  # 跟踪视频总时长
+        self.source = {'video_path': video_path}  # 输入的描述，和 effects 一起构成完整的编辑描述
+        # 所有慢动作和冻结帧合成一个时间映射（输出时间 -> 源时间），只在读取源视频时应用一次
+        self.timewarp = TimeWarp(self.base_clip.duration)
+        self.clip = self.timewarp.apply(timed_source(self.base_clip))  # 保持 self.clip 引用，用于存储当前编辑状态
+        self.duration = self.timewarp.duration  # 跟踪视频总时长
+        # 音频按块渲染：慢动作保持音高，冻结帧处淡出淡入，可以混入背景音乐
+        self.audio = AudioTrack(self.base_clip.audio, self.timewarp)
+        if self.base_clip.audio is not None:
+            self.clip.audio = self.audio.clip()
+        # 连续添加的特效合并成一条特效链，在同一个片段变换中渲染
+        self.chains = []
+        self._chain_clip = None
     
-    def _update_duration(self, start_time, end_time, new_duration):
-        """更新视频总时长"""
-        original_duration = end_time - start_time
-        duration_change = new_duration - original_duration
-        self.duration += duration_change
-        
-        # 更新后续特效的时间点
-        for effect in self.effects:
-            if effect['time'] > end_time:
-                effect['time'] += duration_change
+    def _record(self, effect_type, time, duration=None, **params):
+        """记录特效（源视频时间），用于描述整个编辑"""
+        self.effects.append({
+            'type': effect_type,
+            'time': _describe(time),
+            'duration': duration,
+            'params': {name: _describe(value) for name, value in params.items()}
+        })
+
+    def describe(self):
+        """JSON friendly description of the edit (input and every effect added so far)."""
+        return {'source': self.source, 'effects': self.effects}
+
+    def _update_duration(self):
+        """时间映射变化后更新视频总时长"""
+        self.duration = self.timewarp.duration
+        self.clip = self.clip.with_duration(self.duration)
+        self.audio.reset()
     
     def _get_adjusted_time(self, timestamp):
-        """根据之前的效果调整时间点"""
-        adjusted_time = timestamp
-        for effect in self.effects:
-            if effect['type'] == 'slow_motion' and effect['time'] < timestamp:
-                # 计算慢动作效果对时间点的影响
-                effect_end = effect['time'] + effect['duration']
-                if timestamp > effect_end:
-                    time_change = effect['duration'] - (effect_end - effect['time'])
-                    adjusted_time += time_change
-        return adjusted_time
+        """把源视频时间点映射到输出时间轴"""
+        return self.timewarp.to_output(timestamp)
+
+    def _get_adjusted_window(self, start_time, duration):
+        """把源视频时间段映射到输出时间轴，返回 (开始时间, 时长)"""
+        start = self._get_adjusted_time(start_time)
+        return start, self._get_adjusted_time(start_time + duration) - start
     
+    def _chain(self, effect):
+        """Append an effect (timed on the output timeline) to the chain at the end of the clip."""
+        if not self.chains or self.clip is not self._chain_clip:
+            # 片段在特效链之后被替换过（例如时长变化或合成了文字），新建一条链
+            self.chains.append(EffectChain())
+            self.clip = self._chain_clip = self.chains[-1].apply(self.clip)
+        self.chains[-1].add(effect)
+
+    def add_effect(self, effect: Effect):
+        """Add an Effect (e.g. a registered third-party effect) timed in source video time.
+
+        Args:
+            effect (Effect): Effect whose start_time and duration are source times
+        """
+        self._record(effect.name, effect.start_time, effect.duration, **effect.params())
+        effect.start_time, effect.duration = self._get_adjusted_window(effect.start_time, effect.duration)
+        self._chain(effect)
+        return effect
+
+    @property
+    def stateful(self):
+        """Whether an effect needs the frames rendered in order (no frame-parallel rendering)."""
+        return any(chain.stateful for chain in self.chains)
+
     def add_freeze_frame(self, start_time, duration=2):
         """Add a freeze frame effect at the specified timestamp.
         
@@ -65,7 +142,9 @@ class VideoEditor:
             timestamp (float): Time in seconds where to freeze
             duration (float): Duration of freeze in seconds
         """
-        self.clip = FreezeFrame.apply(self.clip, start_time, duration)
+        self._record('freeze', start_time, duration)
+        FreezeFrame.warp(self.timewarp, start_time, duration)
+        self._update_duration()
         
         
     def add_camera_shake(self, start_time, duration, intensity=0.5):
@@ -74,23 +153,24 @@ class VideoEditor:
         Args:
             start_time (float): Start time in seconds
             duration (float): Duration of effect in seconds
-            intensity (float): Shake intensity from 0 to 1
+            intensity (float/Curve): Shake intensity from 0 to 1, or a Curve over the effect
         """
-        self.clip = CameraShake.apply(
-            self.clip, 
-            start_time, 
-            duration, 
-            intensity
-        )
+        self._record('camera_shake', start_time, duration, intensity=intensity)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
+        self._chain(CameraShake(start_time, duration, intensity))
     
-    def add_glitch(self, start_time, duration=0.5):
+    def add_glitch(self, start_time, duration=0.5, modes=('shift',), intensity=1.0):
         """Add glitch effect at specified timestamp.
         
         Args:
             start_time (float): Time in seconds to add glitch
             duration (float): Duration of glitch effect
+            modes (list): Corruptions to combine: 'shift', 'rgb_split', 'blocks', 'scanlines', 'quantize'
+            intensity (float): Strength and frequency of the modes other than 'shift' (0 to 1)
         """
-        self.clip = GlitchEffect.apply(self.clip, start_time, duration)
+        self._record('glitch', start_time, duration, modes=list(modes), intensity=intensity)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
+        self._chain(GlitchEffect(start_time, duration, modes=modes, intensity=intensity))
     
     def add_slow_motion(self, start_time, end_time, speed=0.5, abruptness=0, soonness=1):
         """Add slow motion effect to a segment of video.
@@ -100,38 +180,32 @@ class VideoEditor:
             end_time (float): End time in seconds
             speed (float): Playback speed (0.1 to 1.0)
         """
-        new_duration = (end_time - start_time) / speed
-        self._update_duration(start_time, end_time, new_duration)
+        # 记录源视频时间段（不是放慢后的时长），便于按描述重放
+        self._record('slow_motion', start_time, end_time - start_time,
+                     speed=speed, abruptness=abruptness, soonness=soonness)
         
-        self.effects.append({
-            'type': 'slow_motion',
-            'time': start_time,
-            'duration': new_duration,
-            'params': {
-                'speed': speed,
-                'abruptness': abruptness,
-                'soonness': soonness
-            }
-        })
-        
-        self.clip = SlowMotion.apply(
-            self.clip, 
+        SlowMotion.warp(
+            self.timewarp, 
             start_time, 
             end_time, 
             speed,
             abruptness,
             soonness
         )
+        self._update_duration()
 
-    def add_zoom(self, start_time, duration, zoom_factor=1.5):
+    def add_zoom(self, start_time, duration, zoom_factor=1.5, easing='linear'):
         """Add dynamic zoom effect.
         
         Args:
             start_time (float): Start time of zoom
             duration (float): Duration of zoom effect
-            zoom_factor (float): Maximum zoom level
+            zoom_factor (float/Curve): Maximum zoom level, or a Curve giving the zoom level
+            easing (str): Easing of the zoom ramp ('linear', 'ease_in', 'ease_out', 'ease_in_out', 'step')
         """
-        self.clip = DynamicZoom.apply(self.clip, start_time, duration, zoom_factor)
+        self._record('zoom', start_time, duration, zoom_factor=zoom_factor, easing=easing)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
+        self._chain(DynamicZoom(start_time, duration, zoom_factor, easing))
 
     def add_flash(self, timestamp, duration=0.1, intensity=1.0):
         """Add flash effect.
@@ -139,25 +213,231 @@ class VideoEditor:
         Args:
             timestamp (float): Time to add flash
             duration (float): Duration of flash
-            intensity (float): Flash intensity (0 to 1)
+            intensity (float/Curve): Flash intensity (0 to 1), or a Curve of the flash strength
         """
-        self.clip = FlashEffect.apply(self.clip, timestamp, duration, intensity)
+        self._record('flash', timestamp, duration, intensity=intensity)
+        timestamp, duration = self._get_adjusted_window(timestamp, duration)
+        self._chain(FlashEffect(timestamp, duration, intensity))
     
-    def save(self, output_path, codec='libx264', fps=None):
+    def add_music(self, path, start_time=0, volume=0.5, loop=True, fade=1.0, duck_db=-12.0,
+                  threshold_db=-35.0, attack=0.05, release=0.5):
+        """Mix a music bed under the video's audio, ducked while the video's audio is loud.
+
+        Args:
+            path (str): Audio file of the music
+            start_time (float): Time in seconds the music starts at
+            volume (float): Music volume (0 to 1)
+            loop (bool): Repeat the music until the end of the video
+            fade (float): Fade in and out duration in seconds
+            duck_db (float): Music gain change in dB while the video's audio is loud (0 disables ducking)
+            threshold_db (float): RMS level of the video's audio that triggers ducking
+            attack (float): Seconds for the ducking to take effect
+            release (float): Seconds for the music to come back up
+        """
+        self._record('music', start_time, None, path=path, volume=volume, loop=loop, fade=fade, duck_db=duck_db,
+                     threshold_db=threshold_db, attack=attack, release=release)
+        self.audio.set_music(MusicBed(path, self._get_adjusted_time(start_time), volume, loop, fade, duck_db,
+                                      threshold_db, attack, release, self.audio.rate))
+        if self.clip.audio is None:
+            # 原视频没有音轨：直接设置在当前片段上，不打断特效链
+            self.clip.audio = self.audio.clip()
+
+    def render_audio(self, path):
+        """Start encoding the audio of the edit into path on a background thread.
+
+        Returns:
+            concurrent.futures.Future resolving to path, or None if the edit has no audio
+        """
+        if self.clip.audio is None:
+            return None
+        return write_async(self.clip.audio, path)
+
+    def save(self, output_path, codec='libx264', fps=None, checkpoint_dir=None, chunk_duration=10.0, logger='bar'):
         """Save the edited video.
         
         Args:
             output_path (str): Path to save the output video
             codec (str): Video codec to use
             fps (int, optional): Output frame rate
+            checkpoint_dir (str, optional): Directory for resumable chunked rendering.
+                The video is encoded in independent chunks recorded in a manifest;
+                calling save again with the same edit continues after the last
+                completed chunk.
+            chunk_duration (float): Length of each chunk in seconds when checkpointing
+            logger: "bar", None or a proglog logger receiving the frame progress
+                (an exception raised by the logger stops the render)
         """
-        self.clip.write_videofile(
-            output_path,
-            codec=codec,
-            fps=fps if fps else self.clip.fps
-        )
+        fps = fps if fps else self.clip.fps
+        logger = proglog.default_bar_logger(logger)
+        with track_job():
+            if checkpoint_dir is None:
+                self._save_whole(output_path, codec, fps, logger)
+            else:
+                self._save_checkpointed(output_path, codec, fps, checkpoint_dir, chunk_duration, logger)
+
+    def _save_whole(self, output_path, codec, fps, logger):
+        """Render the whole video in one pass with MoviePy."""
+        # 临时音频放在单独的目录，中途失败或取消时连同未写完的输出一起删除
+        temp_dir = tempfile.mkdtemp(prefix='reelrush_save_')
+        extension = os.path.splitext(output_path)[1].lower()
+        audio = None
+        if extension in AAC_CONTAINERS:
+            # 音频在后台线程与视频同时编码，最后直接复制两路流合并
+            audio = self.render_audio(os.path.join(temp_dir, 'audio.m4a'))
+        try:
+            instrument_output(self.clip).write_videofile(
+                os.path.join(temp_dir, 'video' + extension) if audio else output_path,
+                codec=codec,
+                fps=fps,
+                audio=audio is None,
+                temp_audiofile_path=temp_dir,
+                logger=logger
+            )
+            if audio:
+                mux(os.path.join(temp_dir, 'video' + extension), audio.result(), output_path)
+        except BaseException:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            raise
+        finally:
+            if audio:
+                # 等后台音频结束再删除临时目录
+                wait([audio])
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def _save_checkpointed(self, output_path, codec, fps, checkpoint_dir, chunk_duration, logger=None):
+        """Render in chunks listed in checkpoint_dir/manifest.json, then join them."""
+        logger = proglog.default_bar_logger(logger)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        manifest_path = os.path.join(checkpoint_dir, 'manifest.json')
+        frames_per_chunk = max(1, int(round(chunk_duration * fps)))
+        total_frames = len(np.arange(0, self.clip.duration, 1.0 / fps))
+        settings = {
+            'version': CHECKPOINT_VERSION,
+            'output': os.path.abspath(output_path),
+            'codec': codec,
+            'fps': fps,
+            'frames_per_chunk': frames_per_chunk,
+            'total_frames': total_frames,
+            'edit': self.describe()
+        }
+        # 序列化一次再读回，使比较时 tuple/list 等类型一致
+        settings = json.loads(json.dumps(settings))
+
+        completed = []
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest.get('settings') == settings:
+                completed = [chunk for chunk in manifest['chunks']
+                             if os.path.exists(os.path.join(checkpoint_dir, chunk['file']))]
+                log.info(f"Resuming render of {output_path}: {len(completed)} chunks already done")
+            else:
+                log.warning(f"Checkpoint in {checkpoint_dir} belongs to a different edit, starting over")
 
-    def add_filter(self, filter_name, start_time, duration):
+        def write_manifest():
+            tmp_path = manifest_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump({'settings': settings, 'chunks': completed}, f, indent=2)
+            os.replace(tmp_path, manifest_path)
+
+        write_manifest()
+        done = {chunk['index'] for chunk in completed}
+        logger(resumed_frames=sum(chunk['last_frame'] - chunk['first_frame'] for chunk in completed))
+        # 音频不分段，在渲染分段的同时整段编码
+        audio = self.render_audio(os.path.join(checkpoint_dir, 'audio.m4a'))
+        try:
+            for index, first in enumerate(range(0, total_frames, frames_per_chunk)):
+                if index in done:
+                    continue
+                last = min(first + frames_per_chunk, total_frames)
+                name = f'chunk_{index:05d}.mp4'
+                self.write_chunk(os.path.join(checkpoint_dir, name), first, last, fps, codec, logger=logger)
+                completed.append({'index': index, 'first_frame': first, 'last_frame': last, 'file': name})
+                write_manifest()
+                log.info(f"Chunk {index + 1}/{-(-total_frames // frames_per_chunk)} of {output_path} done")
+        except BaseException:
+            if audio:
+                wait([audio])
+                if os.path.exists(os.path.join(checkpoint_dir, 'audio.m4a')):
+                    os.remove(os.path.join(checkpoint_dir, 'audio.m4a'))
+            raise
+
+        chunks = [chunk['file'] for chunk in sorted(completed, key=lambda c: c['index'])]
+        self.join_chunks(output_path, checkpoint_dir, chunks, audio)
+
+        # 输出完成后清理检查点
+        for name in chunks + ['manifest.json']:
+            os.remove(os.path.join(checkpoint_dir, name))
+
+    def write_chunk(self, path, first_frame, last_frame, fps, codec='libx264', size=None, ffmpeg_params=None,
+                    logger=None):
+        """Encode output frames [first_frame, last_frame) into an independent mp4 file.
+
+        The file is written under a temporary name and renamed once complete.
+
+        Args:
+            path (str): Path of the chunk file
+            first_frame (int): Index of the first frame at fps
+            last_frame (int): Index after the last frame
+            fps (int): Output frame rate
+            codec (str): Video codec to use
+            size (tuple): Output (width, height) if frames should be resized
+            ffmpeg_params (list): Extra encoder arguments
+            logger: "bar", None or a proglog logger receiving the frame progress
+        """
+        logger = proglog.default_bar_logger(logger)
+        clip = instrument_output(self.clip)
+        size = tuple(size) if size else tuple(clip.size)
+        resize = size != tuple(clip.size)
+        writer = FFMPEG_VideoWriter(path + '.part', size, fps, codec=codec,
+                                    ffmpeg_params=(ffmpeg_params or []) + ['-f', 'mp4'])
+        try:
+            for i in logger.iter_bar(frame_index=range(first_frame, last_frame)):
+                frame = clip.get_frame(i / fps)
+                if frame.dtype != np.uint8:
+                    frame = frame.astype(np.uint8)
+                if resize:
+                    frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+                writer.write_frame(frame)
+        except BaseException:
+            writer.close()
+            os.remove(path + '.part')
+            raise
+        writer.close()
+        os.replace(path + '.part', path)
+
+    def join_chunks(self, output_path, work_dir, chunks, audio=None):
+        """Join chunk files from work_dir into output_path and add the audio track.
+
+        Args:
+            output_path (str): Path to save the output video
+            work_dir (str): Directory holding the chunks, also used for temporary files
+            chunks (list): Chunk file names in playback order
+            audio (Future): render_audio(...) started while the chunks were rendered;
+                the audio is encoded now when None
+        """
+        # 音频整段编码一次，避免分段 AAC 在接缝处产生间隙
+        if audio is None:
+            audio = self.render_audio(os.path.join(work_dir, 'audio.m4a'))
+        audiofile = audio.result() if audio else None
+
+        list_path = os.path.join(work_dir, 'chunks.txt')
+        with open(list_path, 'w') as f:
+            for name in chunks:
+                f.write(f"file '{name}'\n")
+        cmd = [FFMPEG_BINARY, '-y', '-v', 'error', '-f', 'concat', '-safe', '0', '-i', list_path]
+        if audiofile:
+            cmd += ['-i', audiofile, '-map', '0:v', '-map', '1:a', '-shortest']
+        cmd += ['-c', 'copy', output_path]
+        try:
+            subprocess.run(cmd, check=True)
+        finally:
+            os.remove(list_path)
+            if audiofile:
+                os.remove(audiofile)
+
+    def add_filter(self, filter_name, start_time, duration, lut_path=None):
         """Add filter effect to video.
         
         Args:
@@ -171,32 +451,25 @@ class VideoEditor:
                 - 'box_blur': Uniform blur effect, good for defocus simulation
                 - 'glass': Frosted glass effect, creates mystical or dreamy atmosphere
                 - 'motion_blur': Motion blur effect, emphasizes movement or speed
+                - 'lut': Color grading with a .cube 3D LUT given by lut_path
             start_time (float): Start time of filter effect
             duration (float): Duration of filter effect
+            lut_path (str): Path to the .cube file used by the 'lut' filter
         """
-        # 调整时间点以适应之前的时长变化
-        adjusted_time = self._get_adjusted_time(start_time)
-        
         # 添加效果记录
-        self.effects.append({
-            'type': 'filter',
-            'name': filter_name,
-            'time': adjusted_time,
-            'duration': duration
-        })
+        self._record('filter', start_time, duration, name=filter_name, lut_path=lut_path)
+        
+        # 调整时间点以适应之前的时长变化
+        adjusted_time, duration = self._get_adjusted_window(start_time, duration)
         
         # 应用滤镜效果
-        self.clip = FilterEffect.apply(
-            self.clip,
-            filter_name,
-            adjusted_time,
-            duration
-        )
+        self._chain(FilterEffect(filter_name, adjusted_time, duration, lut_path))
 
     def add_animated_text(self, text, start_time, duration, 
                          position='center', fontsize=70, color='white',
                          animation='fade', stroke_color='black', stroke_width=2,
-                         font_style='default', blur_background=None):
+                         font_style='default', blur_background=None,
+                         blur_padding=20, blur_feather=0):
         """Add animated text overlay.
         
         Args:
@@ -211,12 +484,19 @@ class VideoEditor:
             stroke_width (int): Width of text outline
             font_style (str): Font style to use ('default', 'bold', 'elegant', 'modern', 'impact', 'comic')
             blur_background (str): Type of blur effect for text background (None, 'box_blur', 'gaussian_blur', 'glass', 'motion_blur')
+            blur_padding (int): Pixels of blurred background around the text
+            blur_feather (int): Width in pixels of the soft edge of the blurred area
         """
+        self._record('text', start_time, duration, text=text, position=position, fontsize=fontsize,
+                     color=color, animation=animation, stroke_color=stroke_color, stroke_width=stroke_width,
+                     font_style=font_style, blur_background=blur_background, blur_padding=blur_padding,
+                     blur_feather=blur_feather)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
         self.clip = DynamicText.animated_text(
             self.clip, text, start_time, duration,
             position, fontsize, color, animation,
             stroke_color, stroke_width, font_style,
-            blur_background
+            blur_background, blur_padding, blur_feather
         )
 
     def add_particle_explosion(self, start_time, duration=1.0, num_particles=100, position='center'):
@@ -228,32 +508,52 @@ class VideoEditor:
             num_particles (int): Number of particles
             position (str/tuple): Position of explosion ('center' or (x,y))
         """
-        particles = ParticleEffect(num_particles)
-        
-        def particle_transform(get_frame, t):
-            frame = get_frame(t)
-            
-            if start_time <= t <= start_time + duration:
-                # Get explosion origin
-                height, width = frame.shape[:2]
-                if position == 'center':
-                    origin = (width // 2, height // 2)
-                elif isinstance(position, (tuple, list)) and len(position) == 2:
-                    # 将百分比位置转换为像素坐标
-                    origin = (int(position[0] * width), int(position[1] * height))
-                else:
-                    raise ValueError("Position must be 'center' or a tuple of (x,y) in range 0-1")
-                
-                # Initialize particles if this is the start
-                if abs(t - start_time) < 0.1:
-                    particles.initialize_particles(origin)
-                
-                # Update and render particles
-                particles.update_particles(1/self.clip.fps)
-                return particles.render(frame.copy(), t)
-            return frame
-        
-        self.clip = self.clip.transform(particle_transform)
+        self._record('particle', start_time, duration, num_particles=num_particles, position=position)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
+        self._chain(ParticleExplosion(start_time, duration, num_particles, position))
+
+    def add_scoreboard(self, data, start_time=0, duration=None, lines=Scoreboard.DEFAULT_LINES, bars=(),
+                       position='top_left', fontsize=36, color='white', stroke_color='black', stroke_width=1,
+                       font_style='bold', background=(0, 0, 0), background_opacity=0.6):
+        """Add a scoreboard / stat overlay driven by play-by-play data.
+
+        Args:
+            data (str/GameData): Path of a play-by-play .csv or .json file, or loaded GameData;
+                event times are times of the original video file, even when the input clip was
+                cut from it (a clip with a source_time mapping, e.g. from source ranges)
+            start_time (float): Start time of the overlay
+            duration (float): Duration of the overlay, until the end of the video when None
+            lines (list): Format strings of the text lines, e.g. "{home} {home_score}"
+            bars (list): (label format, field, max value) of each stat bar
+            position (str/tuple): 'top_left', 'top_right', 'bottom_left', 'bottom_right' or (x, y) in pixels
+            fontsize (int): Font size
+            color (str): Text color
+            stroke_color (str): Color of text outline
+            stroke_width (int): Width of text outline
+            font_style (str): Font style to use, see DynamicText.FONT_PRESETS
+            background (tuple): RGB color of the panel
+            background_opacity (float): Opacity of the panel (0 to 1)
+        """
+        if duration is None:
+            duration = self.base_clip.duration - start_time
+        self._record('scoreboard', start_time, duration, data=data if isinstance(data, str) else None,
+                     lines=list(lines), bars=[list(bar) for bar in bars], position=position, fontsize=fontsize,
+                     color=color, stroke_color=stroke_color, stroke_width=stroke_width, font_style=font_style,
+                     background=background, background_opacity=background_opacity)
+        if isinstance(data, str):
+            data = GameData.load(data)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
+        # 数据时间是源视频时间：慢动作时时钟走慢，冻结帧时停止
+        time_map = self.timewarp
+        source_time = getattr(self.base_clip, 'source_time', None)
+        if source_time is not None:
+            # 输入是从原视频剪出的片段，再映射回原视频时间
+            time_map = lambda t: source_time(self.timewarp(t))
+        self._chain(Scoreboard(
+            data, start_time, duration, DynamicText.get_font_path(font_style), lines, bars, position,
+            fontsize, color, stroke_color, stroke_width, background, background_opacity,
+            time_map=time_map
+        ))
 
     def add_flash_cuts(self, timestamps, cut_duration=0.1, flash_intensity=1.0):
         """Add flash cut transitions at specified timestamps.
@@ -261,13 +561,13 @@ class VideoEditor:
         Args:
             timestamps: List of timestamps where to add flash effects
             cut_duration: Duration of flash transition effect
-            flash_intensity: Intensity of flash effect (0 to 1)
+            flash_intensity: Intensity of flash effect (0 to 1), or a Curve over each cut
         """
-        print("\n=== Flash Cuts Debug ===")
-        print(f"Original timestamps: {timestamps}")
+        self._record('flash_cuts', [float(t) for t in timestamps], cut_duration, flash_intensity=flash_intensity)
         
-        # Convert timestamps to float
-        adjusted_timestamps = [float(t) for t in timestamps]
+        # Convert timestamps to float and map them to the output timeline
+        adjusted_timestamps = [self._get_adjusted_time(float(t)) for t in timestamps]
+        log.debug(f"Flash cuts at {timestamps}, on the output timeline at {adjusted_timestamps}")
         
         # Add flash cuts
         self.clip = FlashCut.create(
@@ -285,6 +585,8 @@ class VideoEditor:
             duration (float): Duration of transition effect
             direction (str): Direction of slide ('left', 'right', 'up', 'down')
         """
+        self._record('slide', start_time, duration, direction=direction)
+        start_time, duration = self._get_adjusted_window(start_time, duration)
         self.clip = SlideTransition.apply(
             self.clip,
             start_time,
@@ -6,5 +6,7 @@ from .motion import SlowMotion
 from .flash import FlashEffect
 from .zoom import DynamicZoom
 from .text import DynamicText
-from .particle import ParticleEffect
-from .filter import FilterEffect 
\ No newline at end of file
+from .particle import ParticleEffect, ParticleExplosion
+from .filter import FilterEffect
+from .base import Effect, EffectChain, EFFECTS, register_effect, create_effect
+from .scoreboard import GameData, GlyphAtlas, Scoreboard
@@ -0,0 +1,176 @@
+import numpy as np
+from ..buffers import FrameRing
+from ..memo import FrameMemo
+
+# 已注册的特效类：名称 -> 类
+EFFECTS = {}
+
+
+def register_effect(cls):
+    """Class decorator adding an Effect subclass to EFFECTS under its name."""
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} needs a name to be registered")
+    existing = EFFECTS.get(cls.name)
+    if existing is not None and existing is not cls:
+        raise ValueError(f"Effect name {cls.name!r} is already used by {existing.__name__}")
+    EFFECTS[cls.name] = cls
+    return cls
+
+
+def create_effect(name, *args, **kwargs):
+    """Instantiate the registered effect called name."""
+    if name not in EFFECTS:
+        raise ValueError(f"Unknown effect: {name}. Available effects: {sorted(EFFECTS)}")
+    return EFFECTS[name](*args, **kwargs)
+
+
+class Effect:
+    """Base class of frame effects that declare how they may be scheduled.
+
+    An effect is active on [start_time, start_time + duration] and renders
+    one frame at a time in render_frame. The class attributes below tell
+    EffectChain which optimizations are safe; subclasses (or instances, when
+    it depends on their parameters) override them:
+
+    - TIME_INVARIANT: the output depends only on the input frame and
+      memo_key(t), so a result is reused while the input frame is unchanged
+    - POINTWISE: each output pixel depends only on the same input pixel, so
+      the effect can be rendered on the region() of the frame alone
+    - GEOMETRIC: pixels move (warps, shifts); never restricted to a region
+    - STATEFUL: a frame depends on the previous frames, so frames must be
+      rendered in order (no frame-parallel rendering, no seeking)
+    - INPLACE: render_frame may write its output into its input buffer
+    """
+
+    # 注册名，也用于编辑描述
+    name = None
+
+    TIME_INVARIANT = False
+    POINTWISE = False
+    GEOMETRIC = False
+    STATEFUL = False
+    INPLACE = False
+
+    def __init__(self, start_time, duration):
+        """Create the effect.
+
+        Args:
+            start_time (float): Start time of the effect
+            duration (float): Duration of the effect
+        """
+        self.start_time = start_time
+        self.duration = duration
+
+    def active(self, t):
+        """Whether the effect changes the frame at time t."""
+        return self.start_time <= t <= self.start_time + self.duration
+
+    def prepare(self, fps):
+        """Called once the timing is final, before the first frame (e.g. to compile curves).
+
+        Args:
+            fps (float): Frame rate of the clip the effect is applied to
+        """
+
+    def region(self, width, height):
+        """(x0, y0, x1, y1) box outside of which the effect leaves the frame unchanged, or None."""
+        return None
+
+    def memo_key(self, t):
+        """Hashable value of the per-frame parameters the output depends on (TIME_INVARIANT effects)."""
+        return None
+
+    def params(self):
+        """JSON friendly parameters of the effect, recorded in the editor's description."""
+        return {}
+
+    def render_frame(self, frame, t, out=None):
+        """Render the effect on one frame.
+
+        Args:
+            frame: RGB frame (or the region() of it)
+            t (float): Frame time
+            out: Output buffer of the same shape; frame itself only if INPLACE
+        """
+        raise NotImplementedError
+
+    def transform(self, clip):
+        """Clip with this effect applied."""
+        return EffectChain([self]).apply(clip)
+
+
+class EffectChain:
+    """Effects rendered one after another inside a single clip transform.
+
+    The chain uses the declarations of its effects to skip inactive effects,
+    memoize time-invariant ones, render pointwise effects on their region
+    only, and chain in-place effects through the same buffer.
+    """
+
+    def __init__(self, effects=None):
+        self.effects = []
+        self.fps = None
+        self._rings = {}
+        self._memos = {}
+        for effect in effects or []:
+            self.add(effect)
+
+    def add(self, effect: Effect):
+        """Append an effect (it runs after the effects already in the chain)."""
+        self.effects.append(effect)
+        self._rings[id(effect)] = FrameRing()
+        if effect.TIME_INVARIANT:
+            self._memos[id(effect)] = FrameMemo()
+        if self.fps is not None:
+            effect.prepare(self.fps)
+        return effect
+
+    @property
+    def stateful(self):
+        """Whether frames must be rendered in order."""
+        return any(effect.STATEFUL for effect in self.effects)
+
+    def _render_effect(self, effect, frame, t):
+        ring = self._rings[id(effect)]
+        box = None
+        if effect.POINTWISE and not effect.GEOMETRIC:
+            h, w = frame.shape[:2]
+            box = effect.region(w, h)
+            if box is not None:
+                x0, y0, x1, y1 = max(box[0], 0), max(box[1], 0), min(box[2], w), min(box[3], h)
+                if x0 >= x1 or y0 >= y1:
+                    return frame
+        if box is None:
+            memo = self._memos.get(id(effect))
+            if memo is not None:
+                # 输入帧不变（如冻结帧期间）时直接复用上一次的结果
+                return memo.render(lambda f, out: effect.render_frame(f, t, out), frame, effect.memo_key(t))
+            return effect.render_frame(frame, t, ring.target(frame, effect.INPLACE))
+
+        # 只渲染受影响的区域，区域外直接使用输入帧
+        out = ring.target(frame, effect.INPLACE)
+        if out is not frame:
+            np.copyto(out, frame)
+        source = out if effect.INPLACE else frame
+        result = effect.render_frame(source[y0:y1, x0:x1], t, out[y0:y1, x0:x1])
+        if result is not None and not np.shares_memory(result, out):
+            out[y0:y1, x0:x1] = result
+        return out
+
+    def render(self, frame, t):
+        """Run every effect active at t on frame."""
+        for effect in self.effects:
+            if effect.active(t):
+                frame = self._render_effect(effect, frame, t)
+        return frame
+
+    def apply(self, clip):
+        """Clip with the chain applied; effects added later are applied as well."""
+        self.fps = clip.fps or 30
+        for effect in self.effects:
+            effect.prepare(self.fps)
+
+        def chain_transform(get_frame, t):
+            return self.render(get_frame(t), t)
+
+        return clip.transform(chain_transform)
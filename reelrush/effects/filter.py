@@ -1,84 +1,299 @@
 import cv2
 import numpy as np
+from .base import Effect, register_effect
+from .lut import ColorLut
+from ..quality import current_quality
+from ..tiling import tile_executor
 
-class FilterEffect:
+@register_effect
+class FilterEffect(Effect):
     """Video filter effects"""
+
+    name = 'filter'
+
+    # 输出只取决于输入帧（与时间无关）
+    TIME_INVARIANT = True
     
     FILTERS = {
-        'grayscale': lambda frame: cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB),
-        'sepia': lambda frame: np.clip(cv2.transform(
+        'grayscale': lambda frame, out=None: cv2.cvtColor(
+            cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB, dst=out
+        ),
+        'sepia': lambda frame, out=None: cv2.transform(
             frame, 
             np.array([
                 [0.393, 0.769, 0.189],
                 [0.349, 0.686, 0.168],
                 [0.272, 0.534, 0.131]
-            ])
-        ), 0, 255).astype(np.uint8),
-        'warm': lambda frame: cv2.addWeighted(
-            frame, 
-            1.0,
-            np.full_like(frame, fill_value=(30, 20, 10), dtype=np.uint8),
-            0.3,
-            0
+            ]),
+            dst=out
         ),
-        'cool': lambda frame: cv2.addWeighted(
+        # 与常量色彩帧做 addWeighted 等价于加上一个饱和标量，无需分配整帧常量
+        'warm': lambda frame, out=None: cv2.add(frame, FilterEffect._tint((30, 20, 10), 0.3), dst=out),
+        'cool': lambda frame, out=None: cv2.add(frame, FilterEffect._tint((10, 20, 30), 0.3), dst=out),
+        'vintage': lambda frame, out=None: FilterEffect._vintage_effect(frame, out),
+        'gaussian_blur': lambda frame, out=None: FilterEffect._scaled_blur(frame, 'gaussian_blur', out),
+        'box_blur': lambda frame, out=None: cv2.blur(frame, (20, 20), dst=out),
+        'glass': lambda frame, out=None, **kwargs: FilterEffect._frosted_glass_effect(frame, out=out, **kwargs),
+        'motion_blur': lambda frame, out=None: FilterEffect._scaled_blur(frame, 'motion_blur', out)
+    }
+
+    # 可以降低分辨率计算的模糊及其核大小（像素，按原图分辨率）；方框模糊的耗时与核大小无关，不需要
+    BLUR_SIZES = {'gaussian_blur': 21, 'motion_blur': 15}
+
+    # 用 .cube 3D LUT 调色的滤镜，需要额外指定 lut_path
+    LUT_FILTER = 'lut'
+
+    # 可以直接在输入帧上计算（逐像素）的滤镜
+    INPLACE_FILTERS = {'grayscale', 'sepia', 'warm', 'cool', 'vintage', 'lut'}
+
+    # 每帧随机变化、不能复用结果的滤镜
+    TIME_VARIANT_FILTERS = {'glass'}
+
+    # 每个输出像素依赖的邻域半径（像素），只处理局部区域时需要多裁出这么宽的边
+    HALO = {'gaussian_blur': 10, 'box_blur': 10, 'glass': 13, 'motion_blur': 7}
+
+    # 毛玻璃位移图每块的行数；每块用以位置为种子的生成器，分带计算时与整帧一致
+    GLASS_BLOCK_ROWS = 16
+
+    _constant_frames = {}
+    _grids = {}
+    _kernels = {}
+    _feather_masks = {}
+
+    @staticmethod
+    def _tint(color, weight):
+        """Per-channel scalar added by a weighted constant color layer."""
+        return tuple(round(c * weight) for c in color) + (0,)
+
+    @staticmethod
+    def _constant_frame(shape, color):
+        """Cached constant color frame of the given shape."""
+        key = (shape, color)
+        if key not in FilterEffect._constant_frames:
+            FilterEffect._constant_frames[key] = np.full(shape, fill_value=color, dtype=np.uint8)
+        return FilterEffect._constant_frames[key]
+
+    @staticmethod
+    def _vintage_effect(frame, out=None):
+        """Blend a grayscale copy with a faded warm copy of the frame."""
+        gray = cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB)
+        faded = cv2.addWeighted(
             frame,
-            1.0,
-            np.full_like(frame, fill_value=(10, 20, 30), dtype=np.uint8),
+            0.6,
+            FilterEffect._constant_frame(frame.shape, (30, 20, 10)),
             0.3,
             0
-        ),
-        'vintage': lambda frame: cv2.addWeighted(
-            cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB),
-            0.7,
-            cv2.addWeighted(
-                frame,
-                0.6,
-                np.full_like(frame, fill_value=(30, 20, 10), dtype=np.uint8),
-                0.3,
-                0
-            ),
-            0.3,
-            0
-        ),
-        'gaussian_blur': lambda frame: cv2.GaussianBlur(frame, (21, 21), 0),
-        'box_blur': lambda frame: cv2.blur(frame, (20, 20)),
-        'glass': lambda frame: FilterEffect._frosted_glass_effect(frame),
-        'motion_blur': lambda frame: cv2.filter2D(frame, -1, FilterEffect._motion_blur_kernel())
-    }
+        )
+        return cv2.addWeighted(gray, 0.7, faded, 0.3, 0, dst=out)
     
     @staticmethod
-    def _frosted_glass_effect(frame, strength=10):
-        """Create frosted glass effect."""
+    def _blur(frame, filter_name, size, out=None):
+        """Blur with a kernel of the given size."""
+        if filter_name == 'gaussian_blur':
+            size |= 1  # 高斯核必须是奇数
+            return cv2.GaussianBlur(frame, (size, size), 0, dst=out)
+        return cv2.filter2D(frame, -1, FilterEffect._motion_blur_kernel(size), dst=out)
+
+    @staticmethod
+    def _scaled_blur(frame, filter_name, out=None):
+        """Blur at the resolution given by the current quality settings."""
+        size = FilterEffect.BLUR_SIZES[filter_name]
+        scale = current_quality().blur_scale
         height, width = frame.shape[:2]
+        if scale >= 1 or min(height, width) * scale < 8:
+            return FilterEffect._blur(frame, filter_name, size, out)
+        # 缩小后模糊再放大，核大小随分辨率一起缩小
+        small = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+        small = FilterEffect._blur(small, filter_name, max(3, round(size * scale)))
+        return cv2.resize(small, (width, height), dst=out, interpolation=cv2.INTER_LINEAR)
+
+    @staticmethod
+    def _glass_noise(seed, rows, width, strength):
+        """Rows [r0, r1) of a random displacement map, shape (2, r1 - r0, width).
+
+        Every block of GLASS_BLOCK_ROWS rows is drawn from its own generator
+        seeded by its position, so a band of the map is the same whichever
+        way the frame is split.
+        """
+        r0, r1 = rows
+        size = FilterEffect.GLASS_BLOCK_ROWS
+        first = r0 // size
+        blocks = [np.random.default_rng([seed, k]).integers(-strength, strength, (2, size, width))
+                  for k in range(first, (r1 - 1) // size + 1)]
+        return np.concatenate(blocks, axis=1)[:, r0 - first * size:r1 - first * size]
+
+    @staticmethod
+    def _frosted_glass_effect(frame, strength=10, out=None, seed=None, top=0, frame_height=None):
+        """Create frosted glass effect.
+
+        Args:
+            frame: RGB frame, or a band of rows of one
+            strength (int): Maximum displacement in pixels
+            out: Optional preallocated output buffer
+            seed (int): Seed of the displacement map, drawn from the global generator when None
+            top (int): First row of frame in the whole frame
+            frame_height (int): Height of the whole frame, frame's own height when None
+        """
+        height, width = frame.shape[:2]
+        if seed is None:
+            seed = np.random.randint(2 ** 63)
+        frame_height = frame_height or height
+
+        # 创建随机位移映射；降低质量时在低分辨率上生成后按最近邻放大
+        scale = current_quality().glass_noise_scale
+        if scale < 1:
+            noise_width, noise_height = max(1, round(width * scale)), max(1, round(frame_height * scale))
+            src_rows = np.arange(top, top + height) * noise_height // frame_height
+            src_cols = np.arange(width) * noise_width // width
+            noise = FilterEffect._glass_noise(seed, (src_rows[0], src_rows[-1] + 1), noise_width, strength)
+            noise = noise[:, src_rows - src_rows[0]][:, :, src_cols]
+        else:
+            noise = FilterEffect._glass_noise(seed, (top, top + height), width, strength)
+        dx, dy = noise.astype(np.float32)
         
-        # 创建随机位移映射
-        dx = np.random.randint(-strength, strength, (height, width)).astype(np.float32)
-        dy = np.random.randint(-strength, strength, (height, width)).astype(np.float32)
-        
-        # 创建映射网格
-        x, y = np.meshgrid(np.arange(width), np.arange(height))
+        # 映射网格只依赖帧尺寸，缓存复用
+        if (height, width) not in FilterEffect._grids:
+            x, y = np.meshgrid(np.arange(width, dtype=np.float32), np.arange(height, dtype=np.float32))
+            FilterEffect._grids[(height, width)] = (x, y)
+        x, y = FilterEffect._grids[(height, width)]
         
         # 添加位移
-        map_x = (x + dx).astype(np.float32)
-        map_y = (y + dy).astype(np.float32)
+        map_x = np.add(x, dx, out=dx)
+        map_y = np.add(y, dy, out=dy)
         
         # 应用位移映射并添加模糊
         distorted = cv2.remap(frame, map_x, map_y, cv2.INTER_LINEAR)
-        blurred = cv2.GaussianBlur(distorted, (7, 7), 0)
-        
-        return blurred
+        return cv2.GaussianBlur(distorted, (7, 7), 0, dst=out)
     
     @staticmethod
     def _motion_blur_kernel(size=15):
         """Create motion blur kernel."""
-        kernel = np.zeros((size, size))
-        kernel[int((size-1)/2), :] = np.ones(size)
-        kernel = kernel / size
-        return kernel
+        if size not in FilterEffect._kernels:
+            kernel = np.zeros((size, size))
+            kernel[int((size-1)/2), :] = np.ones(size)
+            FilterEffect._kernels[size] = kernel / size
+        return FilterEffect._kernels[size]
+
+    @staticmethod
+    def get_filter(filter_name, lut_path=None):
+        """Function (frame, out=None) -> frame applying a filter.
+
+        Args:
+            filter_name (str): Name of filter, or 'lut' to grade with a .cube file
+            lut_path (str): Path to the .cube file used by the 'lut' filter
+        """
+        if filter_name == FilterEffect.LUT_FILTER:
+            if not lut_path:
+                raise ValueError("The 'lut' filter needs a lut_path")
+            # 同一进程内的任务共享已加载的 LUT
+            return ColorLut.load(lut_path).render
+        if filter_name not in FilterEffect.FILTERS:
+            available = list(FilterEffect.FILTERS.keys()) + [FilterEffect.LUT_FILTER]
+            raise ValueError(f"Unknown filter: {filter_name}. Available filters: {available}")
+        filter_func = FilterEffect.FILTERS[filter_name]
+        if filter_name in FilterEffect.HALO:
+            # 邻域滤镜在大帧上按带状分块并行计算
+            halo = FilterEffect.HALO[filter_name]
+            if filter_name in FilterEffect.TIME_VARIANT_FILTERS:
+                # 随机种子在分块前取一次，各带的位移图与整帧一次计算时相同
+                return lambda frame, out=None: tile_executor.filter(
+                    filter_func, frame, halo, out, rows=True, seed=np.random.randint(2 ** 63))
+            return lambda frame, out=None: tile_executor.filter(filter_func, frame, halo, out)
+        return filter_func
+
+    @staticmethod
+    def render(frame, filter_name, out=None, lut_path=None):
+        """Apply a filter to a single frame.
+
+        Args:
+            frame: RGB frame
+            filter_name (str): Name of filter to apply
+            out: Optional preallocated output buffer (may be frame itself for
+                filters in INPLACE_FILTERS)
+            lut_path (str): Path to the .cube file used by the 'lut' filter
+        """
+        return FilterEffect.get_filter(filter_name, lut_path)(frame, out)
     
     @staticmethod
-    def apply(clip, filter_name, start_time, duration):
+    def _feather_mask(height, width, feather):
+        """Weights rising linearly from 0 at the box edge to 1 at feather pixels inside."""
+        key = (height, width, feather)
+        if key not in FilterEffect._feather_masks:
+            ys = np.minimum(np.arange(height), np.arange(height)[::-1]) + 0.5
+            xs = np.minimum(np.arange(width), np.arange(width)[::-1]) + 0.5
+            mask = np.minimum.outer(ys, xs) / feather
+            FilterEffect._feather_masks[key] = np.clip(mask, 0, 1).astype(np.float32)[:, :, None]
+        return FilterEffect._feather_masks[key]
+
+    @staticmethod
+    def render_region(frame, filter_name, box, out, feather=0):
+        """Apply a filter only inside box and write the result into out.
+
+        Args:
+            frame: RGB frame to read from
+            filter_name (str): Name of filter to apply
+            box: (x0, y0, x1, y1) region to filter, clipped to the frame
+            out: Output buffer already holding the frame content (may be frame itself)
+            feather (int): Width in pixels of the soft transition at the box edge
+        """
+        h, w = frame.shape[:2]
+        x0, y0 = max(box[0], 0), max(box[1], 0)
+        x1, y1 = min(box[2], w), min(box[3], h)
+        if x0 >= x1 or y0 >= y1:
+            return out
+
+        # 多裁出滤镜核需要的边缘，保证区域内的结果与整帧滤镜一致
+        halo = FilterEffect.HALO.get(filter_name, 0)
+        cx0, cy0 = max(x0 - halo, 0), max(y0 - halo, 0)
+        cx1, cy1 = min(x1 + halo, w), min(y1 + halo, h)
+        filtered = FilterEffect.FILTERS[filter_name](np.ascontiguousarray(frame[cy0:cy1, cx0:cx1]))
+        filtered = filtered[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0]
+
+        original = frame[y0:y1, x0:x1].copy() if feather > 0 else None
+        out[y0:y1, x0:x1] = filtered
+
+        if feather > 0:
+            # 只有边缘的羽化带需要混合，内部直接使用滤镜结果
+            bh, bw = y1 - y0, x1 - x0
+            f = min(feather, (bh + 1) // 2, (bw + 1) // 2)
+            mask = FilterEffect._feather_mask(bh, bw, feather)
+            for rows, cols in ((slice(0, f), slice(0, bw)), (slice(bh - f, bh), slice(0, bw)),
+                               (slice(f, bh - f), slice(0, f)), (slice(f, bh - f), slice(bw - f, bw))):
+                weight = mask[rows, cols]
+                band = out[y0:y1, x0:x1][rows, cols]
+                band[:] = original[rows, cols] + (band.astype(np.float32) - original[rows, cols]) * weight + 0.5
+        return out
+
+    def __init__(self, filter_name, start_time, duration, lut_path=None):
+        """Create a filter effect.
+
+        Args:
+            filter_name (str): Name of filter to apply
+            start_time (float): Start time of filter effect
+            duration (float): Duration of filter effect
+            lut_path (str): Path to the .cube file used by the 'lut' filter
+        """
+        super().__init__(start_time, duration)
+        self.filter_name = filter_name
+        self.lut_path = lut_path
+        self._filter = FilterEffect.get_filter(filter_name, lut_path)
+        # 声明取决于具体的滤镜
+        self.TIME_INVARIANT = filter_name not in FilterEffect.TIME_VARIANT_FILTERS
+        self.POINTWISE = self.INPLACE = filter_name in FilterEffect.INPLACE_FILTERS
+
+    def memo_key(self, t):
+        # 降低质量时模糊的结果会变化
+        return current_quality()
+
+    def params(self):
+        return {'filter_name': self.filter_name, 'lut_path': self.lut_path}
+
+    def render_frame(self, frame, t, out=None):
+        return self._filter(frame, out)
+
+    @staticmethod
+    def apply(clip, filter_name, start_time, duration, lut_path=None):
         """Apply filter effect to video clip.
         
         Args:
@@ -86,18 +301,6 @@ class FilterEffect:
             filter_name (str): Name of filter to apply
             start_time (float): Start time of filter effect
             duration (float): Duration of filter effect
+            lut_path (str): Path to the .cube file used by the 'lut' filter
         """
-        if filter_name not in FilterEffect.FILTERS:
-            raise ValueError(f"Unknown filter: {filter_name}. Available filters: {list(FilterEffect.FILTERS.keys())}")
-            
-        filter_func = FilterEffect.FILTERS[filter_name]
-        
-        def filter_transform(get_frame, t):
-            frame = get_frame(t)
-            
-            # 只在指定时间段内应用滤镜
-            if start_time <= t <= start_time + duration:
-                return filter_func(frame)
-            return frame
-            
-        return clip.transform(filter_transform)
+        return FilterEffect(filter_name, start_time, duration, lut_path).transform(clip)
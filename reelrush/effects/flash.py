@@ -1,7 +1,55 @@
 import cv2
 import numpy as np
+from .base import Effect, register_effect
+from ..curves import Curve
+
+@register_effect
+class FlashEffect(Effect):
+    name = 'flash'
+
+    # 闪光强度随时间变化
+    TIME_INVARIANT = False
+    POINTWISE = True
+    INPLACE = True
+
+    @staticmethod
+    def render(frame, alpha, out=None):
+        """Brighten a single frame towards white.
+        
+        Args:
+            frame: RGB frame
+            alpha: Flash strength (0 to 1)
+            out: Optional preallocated output buffer (may be frame itself)
+        """
+        # 加上饱和标量，避免每帧分配整帧的白色图层
+        value = 255 * alpha
+        return cv2.add(frame, (value, value, value, 0), dst=out)
+
+    def __init__(self, timestamp, duration=0.1, intensity=1.0):
+        """Create a flash effect.
+
+        Args:
+            timestamp: Time to add flash
+            duration: Duration of flash
+            intensity: Flash intensity (0 to 1), or a Curve giving the flash strength over the effect
+        """
+        super().__init__(timestamp, duration)
+        self.intensity = intensity
+        self._alpha_table = None
+
+    def prepare(self, fps):
+        intensity = self.intensity
+        if not isinstance(intensity, Curve):
+            # 默认：先变亮再变暗的三角形曲线
+            intensity = Curve([(0, 0), (0.5, intensity), (1, 0)])
+        self._alpha_table = intensity.table(self.start_time, self.duration, fps)
+
+    def params(self):
+        return {'intensity': self.intensity}
+
+    def render_frame(self, frame, t, out=None):
+        return FlashEffect.render(frame, self._alpha_table(t), out)
 
-class FlashEffect:
     @staticmethod
     def apply(clip, timestamp, duration=0.1, intensity=1.0):
         """Add flash effect.
@@ -10,13 +58,6 @@ class FlashEffect:
             clip: Input video clip
             timestamp: Time to add flash
             duration: Duration of flash
-            intensity: Flash intensity (0 to 1)
+            intensity: Flash intensity (0 to 1), or a Curve giving the flash strength over the effect
         """
-        def flash_transform(frame, t):
-            if timestamp <= t <= timestamp + duration:
-                progress = 1 - abs(2 * (t - timestamp) / duration - 1)
-                flash = np.ones_like(frame) * 255
-                return cv2.addWeighted(frame, 1, flash, progress * intensity, 0)
-            return frame
-        
-        return clip.fl(flash_transform) 
\ No newline at end of file
+        return FlashEffect(timestamp, duration, intensity).transform(clip)
@@ -1,8 +1,25 @@
 from moviepy import VideoFileClip
 import numpy as np
 import cv2
+from ..buffers import FrameRing
+from ..curves import Curve
 
 class FlashCut:
+    # 白光强度随时间变化
+    TIME_INVARIANT = False
+
+    @staticmethod
+    def render(frame, alpha, out=None):
+        """Blend a single frame towards white.
+        
+        Args:
+            frame: RGB frame
+            alpha: Weight of the white layer (0 to 1)
+            out: Optional preallocated output buffer (may be frame itself)
+        """
+        # frame * (1 - alpha) + 255 * alpha，无需分配整帧的白色图层
+        return cv2.convertScaleAbs(frame, out, alpha=1.0 - alpha, beta=255 * alpha)
+
     @staticmethod
     def create(clip, timestamps, cut_duration=0.1, flash_intensity=1.0):
         """Create flash transitions at specified timestamps.
@@ -11,25 +28,24 @@ class FlashCut:
             clip: The video clip to add transitions to
             timestamps: List of timestamps where to add flash effects
             cut_duration: Duration of flash transition effect
-            flash_intensity: Intensity of flash effect (0 to 1)
+            flash_intensity: Intensity of flash effect (0 to 1), or a Curve giving the
+                flash strength over each cut
         """
+        ring = FrameRing()
+        if not isinstance(flash_intensity, Curve):
+            # 默认：淡入白光再淡出的三角形曲线
+            flash_intensity = Curve([(0, 0), (0.5, flash_intensity), (1, 0)])
+        # 所有切换时长相同，共用一张逐帧表，查表时传入各自的起点
+        alpha_table = flash_intensity.table(0, cut_duration, clip.fps or 30)
+
         def flash_transform(get_frame, t):
             frame = get_frame(t)
             
             # 检查当前时间是否接近任何一个时间戳
             for timestamp in timestamps:
                 if timestamp - cut_duration/2 <= t <= timestamp + cut_duration/2:
-                    # 计算闪光进度（0到1）
-                    if t <= timestamp:
-                        # 淡入白光
-                        progress = (t - (timestamp - cut_duration/2)) / (cut_duration/2)
-                    else:
-                        # 淡出白光
-                        progress = 1 - (t - timestamp) / (cut_duration/2)
-                    
-                    flash = np.ones_like(frame) * 255
-                    alpha = min(progress * flash_intensity, 1.0)  # 限制最大透明度
-                    return cv2.addWeighted(frame, 1.0 - alpha, flash, alpha, 0)
+                    alpha = min(alpha_table(t, timestamp - cut_duration/2), 1.0)  # 限制最大透明度
+                    return FlashCut.render(frame, alpha, ring.target(frame, inplace=True))
             
             return frame
         
@@ -1,7 +1,18 @@
-from moviepy import VideoFileClip, concatenate_videoclips
-from moviepy import *
+from ..timewarp import TimeWarp
 
 class FreezeFrame:
+    @staticmethod
+    def warp(timewarp, start_time, duration):
+        """Add a freeze segment to a TimeWarp.
+        
+        Args:
+            timewarp: TimeWarp to modify
+            start_time: Time to freeze frame (source time)
+            duration: Duration of freeze
+        """
+        timewarp.hold(start_time, duration)
+        return timewarp
+
     @staticmethod
     def apply(clip, start_time, duration):
         """Create a freeze frame effect.
@@ -11,9 +22,4 @@ class FreezeFrame:
             start_time: Time to freeze frame
             duration: Duration of freeze
         """
-        # 使用 vfx.Freeze 实现冻结帧效果
-        return clip.with_effects([vfx.Freeze(
-            t=start_time,  # 冻结时间点
-            freeze_duration=duration,  # 冻结持续时间
-            padding_end=0  # 结尾填充时间
-        )]) 
\ No newline at end of file
+        return FreezeFrame.warp(TimeWarp(clip.duration), start_time, duration).apply(clip)
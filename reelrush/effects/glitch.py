@@ -1,39 +1,275 @@
-import cv2
 import numpy as np
+from .base import Effect, register_effect
+from ..quality import current_quality
+from ..seeding import effect_seed, frame_rng
+
+# 故障模式，每帧按此顺序叠加
+MODES = ('shift', 'rgb_split', 'blocks', 'scanlines', 'quantize')
+
+
+class GlitchPlan:
+    """Corruption of every frame of a glitch, drawn once from the seed.
+
+    The random values of a frame only depend on the seed and the frame
+    index, and every mode's values are drawn whether or not the mode is
+    enabled, so enabling a mode never changes what the others do. Values
+    are stored relative to the frame size and converted to pixels once per
+    frame size.
+    """
+
+    # 强度为 1 时各模式在一帧中出现的概率
+    BURST = {'rgb_split': 0.6, 'blocks': 0.5, 'scanlines': 0.5, 'quantize': 0.3}
+    BLOCKS = 6        # 每帧最多移动的方块数
+    SCAN_STEPS = 16   # 扫描线抖动带内的分段数
+
+    def __init__(self, seed, first_frame, last_frame, fps, modes=('shift',), intensity=1.0):
+        """Draw the plan of frames first_frame..last_frame.
+
+        Args:
+            seed (int): Seed of the glitch
+            first_frame, last_frame (int): Frame indexes (at fps) of the effect window
+            fps (float): Frame rate
+            modes: Enabled modes, see MODES
+            intensity (float): Scales the burst probability and strength of the modes other than 'shift'
+        """
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown glitch modes: {sorted(unknown)}. Available modes: {list(MODES)}")
+        self.seed = seed
+        self.fps = fps
+        self.modes = tuple(mode for mode in MODES if mode in modes)
+        self.intensity = intensity
+        self.frames = {index: self._draw(index) for index in range(first_frame, last_frame + 1)}
+        self._pixels = {}
+
+    def _draw(self, index):
+        """Relative corruption parameters of one frame."""
+        rng = frame_rng(self.seed, index / self.fps, self.fps)
+        # 切片偏移最先抽取，与只有平移模式时的随机数相同
+        shifts = rng.integers(-50, 50, size=(10, 2))
+        burst = rng.random(4)
+        rgb = rng.uniform(-1, 1, 2)
+        blocks = rng.random((self.BLOCKS, 6))
+        scan = rng.random(2), rng.uniform(-1, 1, self.SCAN_STEPS)
+        quant = rng.random(2), rng.integers(3, 6)
+
+        frame = {}
+        active = {'shift': True}
+        for i, mode in enumerate(MODES[1:]):
+            active[mode] = burst[i] < self.BURST[mode] * self.intensity
+        for mode in self.modes:
+            if not active[mode]:
+                continue
+            if mode == 'shift':
+                frame[mode] = shifts
+            elif mode == 'rgb_split':
+                frame[mode] = rgb * 0.02 * self.intensity          # 红蓝通道相对宽度的偏移
+            elif mode == 'blocks':
+                frame[mode] = blocks
+            elif mode == 'scanlines':
+                frame[mode] = (scan[0], scan[1] * 0.05 * self.intensity)  # (带位置和高度, 各段相对宽度的偏移)
+            elif mode == 'quantize':
+                frame[mode] = (quant[0], int(quant[1]))               # (带位置和高度, 丢弃的低位数)
+        return frame
+
+    def _to_pixels(self, frame, height, width, scale):
+        """Pixel operations of a frame, in MODES order."""
+        ops = []
+        for mode, value in frame.items():
+            if mode == 'shift':
+                # 切片偏移以原分辨率的像素为单位
+                ops.append((mode, value if scale == 1 else np.round(value * scale).astype(value.dtype)))
+            elif mode == 'rgb_split':
+                dx, dy = (int(round(v)) for v in value * (width, height))
+                if dx or dy:
+                    ops.append((mode, (dx, dy)))
+            elif mode == 'blocks':
+                rects = []
+                for bw, bh, sx, sy, dx, dy in value:
+                    w, h = max(int(width * (0.05 + 0.2 * bw)), 1), max(int(height * (0.02 + 0.08 * bh)), 1)
+                    rects.append((w, h, int(sx * (width - w)), int(sy * (height - h)),
+                                  int(dx * (width - w)), int(dy * (height - h))))
+                ops.append((mode, rects))
+            elif mode == 'scanlines':
+                (position, size), offsets = value
+                y0, y1 = self._band(position, size, height)
+                # 带内分成若干段，每段整体水平错开（环绕）
+                edges = np.linspace(y0, y1, len(offsets) + 1).astype(int)
+                segments = [(a, b, int(round(offset * width)) % width)
+                            for a, b, offset in zip(edges[:-1], edges[1:], offsets) if b > a]
+                ops.append((mode, segments))
+            elif mode == 'quantize':
+                (position, size), bits = value
+                y0, y1 = self._band(position, size, height)
+                ops.append((mode, (y0, y1, np.uint8((0xff << bits) & 0xff))))
+        return ops
+
+    @staticmethod
+    def _band(position, size, height):
+        """Rows of a band covering 5-35% of the frame."""
+        h = max(int(height * (0.05 + 0.3 * size)), 1)
+        y0 = int(position * (height - h))
+        return y0, y0 + h
+
+    def ops_at(self, t, height, width, scale=1.0):
+        """Pixel operations of the frame at time t for frames of the given size.
+
+        Args:
+            t (float): Time of the frame
+            height, width (int): Frame size
+            scale (float): Output resolution relative to the source, scales the slice shifts
+        """
+        index = int(round(t * self.fps))
+        key = (index, height, width, scale)
+        ops = self._pixels.get(key)
+        if ops is None:
+            frame = self.frames.get(index)
+            if frame is None:
+                frame = self._draw(index)
+            ops = self._pixels[key] = self._to_pixels(frame, height, width, scale)
+        return ops
+
+
+@register_effect
+class GlitchEffect(Effect):
+    name = 'glitch'
+
+    # 每帧随机偏移（随机数只由时间决定）
+    TIME_INVARIANT = False
+    GEOMETRIC = True
+
+    @staticmethod
+    def _shift_into(src, dst, dx, dy):
+        """Copy src translated by (dx, dy) into dst, filling the uncovered area with black.
+
+        Equivalent to cv2.warpAffine with an integer translation, without the
+        intermediate allocation.
+        """
+        h, w = src.shape[:2]
+        dst.fill(0)
+        if abs(dx) >= w or abs(dy) >= h:
+            return dst
+        dst[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+            src[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+        return dst
+
+    @staticmethod
+    def render(frame, shifts, out=None):
+        """Shift horizontal slices of a single frame.
+        
+        Args:
+            frame: RGB frame
+            shifts: Array of (dx, dy) integer offsets, one per slice
+            out: Optional preallocated output buffer (must not be frame)
+        """
+        if out is None:
+            out = np.empty_like(frame)
+        height = frame.shape[0]
+        slice_h = int(height / len(shifts))
+        
+        for i, (dx, dy) in enumerate(shifts):
+            h_start = slice_h * i
+            h_end = h_start + slice_h
+            GlitchEffect._shift_into(frame[h_start:h_end], out[h_start:h_end], int(dx), int(dy))
+        
+        # 不足一个切片的剩余行保持原样
+        rest = slice_h * len(shifts)
+        out[rest:] = frame[rest:]
+        return out
+
+    @staticmethod
+    def _shift_inplace(image, dx, dy):
+        """Translate image by (dx, dy) in place, filling the uncovered area with black."""
+        h, w = image.shape[:2]
+        if abs(dx) >= w or abs(dy) >= h:
+            image.fill(0)
+            return
+        # NumPy 在源和目标重叠时会先复制源
+        image[max(dy, 0):h + min(dy, 0), max(dx, 0):w + min(dx, 0)] = \
+            image[max(-dy, 0):h + min(-dy, 0), max(-dx, 0):w + min(-dx, 0)]
+        image[:max(dy, 0)] = 0
+        image[h + min(dy, 0):] = 0
+        image[:, :max(dx, 0)] = 0
+        image[:, w + min(dx, 0):] = 0
+
+    @staticmethod
+    def render_plan(frame, ops, out=None):
+        """Apply the pixel operations of a GlitchPlan frame to a single frame.
+
+        Args:
+            frame: RGB frame
+            ops: GlitchPlan.ops_at(...) of the frame
+            out: Optional preallocated output buffer (must not be frame)
+        """
+        if out is None:
+            out = np.empty_like(frame)
+        if not ops or ops[0][0] != 'shift':
+            np.copyto(out, frame)
+        for mode, value in ops:
+            if mode == 'shift':
+                GlitchEffect.render(frame, value, out)
+            elif mode == 'rgb_split':
+                # 红、蓝通道反向错开
+                dx, dy = value
+                GlitchEffect._shift_inplace(out[:, :, 0], dx, dy)
+                GlitchEffect._shift_inplace(out[:, :, 2], -dx, -dy)
+            elif mode == 'blocks':
+                for w, h, sx, sy, dx, dy in value:
+                    out[dy:dy + h, dx:dx + w] = out[sy:sy + h, sx:sx + w]
+            elif mode == 'scanlines':
+                for a, b, shift in value:
+                    if shift:
+                        rows = out[a:b].copy()
+                        out[a:b, shift:] = rows[:, :-shift]
+                        out[a:b, :shift] = rows[:, -shift:]
+            elif mode == 'quantize':
+                y0, y1, mask = value
+                np.bitwise_and(out[y0:y1], mask, out=out[y0:y1])
+        return out
+
+    def __init__(self, start_time, duration=0.5, seed=None, modes=('shift',), intensity=1.0):
+        """Create a glitch effect.
+
+        Args:
+            start_time: Time to add glitch
+            duration: Duration of glitch effect
+            seed: Seed of the corruption plan, derived from the timing when None
+            modes: Corruptions to combine: 'shift' (slices), 'rgb_split', 'blocks',
+                'scanlines' and 'quantize' (color bursts)
+            intensity: Strength and frequency of the modes other than 'shift' (0 to 1)
+        """
+        super().__init__(start_time, duration)
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown glitch modes: {sorted(unknown)}. Available modes: {list(MODES)}")
+        self.seed = seed
+        self.modes = tuple(modes)
+        self.intensity = intensity
+        self.plan = None
+
+    def prepare(self, fps):
+        seed = effect_seed('glitch', self.start_time, self.duration) if self.seed is None else self.seed
+        # 整个特效时段的破坏计划只生成一次
+        self.plan = GlitchPlan(seed, int(round(self.start_time * fps)),
+                               int(round((self.start_time + self.duration) * fps)), fps, self.modes, self.intensity)
+
+    def params(self):
+        return {'seed': self.seed, 'modes': list(self.modes), 'intensity': self.intensity}
+
+    def render_frame(self, frame, t, out=None):
+        height, width = frame.shape[:2]
+        return GlitchEffect.render_plan(frame, self.plan.ops_at(t, height, width, current_quality().resolution_scale), out)
 
-class GlitchEffect:
     @staticmethod
-    def apply(clip, start_time, duration=0.5):
+    def apply(clip, start_time, duration=0.5, seed=None, modes=('shift',), intensity=1.0):
         """Add glitch effect at specified timestamp.
         
         Args:
             clip: Input video clip
             start_time: Time to add glitch
             duration: Duration of glitch effect
+            seed: Seed of the corruption plan, derived from the timing when None
+            modes: Corruptions to combine, see GlitchEffect.__init__
+            intensity: Strength and frequency of the modes other than 'shift' (0 to 1)
         """
-        def glitch_transform(get_frame, t):
-            # 获取原始帧
-            frame = get_frame(t)
-            
-            # 只在指定时间段内应用故障效果
-            if start_time <= t <= start_time + duration:
-                height, width = frame.shape[:2]
-                slice_h = int(height / 10)
-                shifts = np.random.randint(-50, 50, size=(10, 2))
-                
-                glitched = frame.copy()
-                for i, (dx, dy) in enumerate(shifts):
-                    h_start = slice_h * i
-                    h_end = h_start + slice_h
-                    temp = frame[h_start:h_end, :]
-                    
-                    M = np.float32([[1, 0, dx], [0, 1, dy]])
-                    glitched[h_start:h_end, :] = cv2.warpAffine(
-                        temp, 
-                        M, 
-                        (width, slice_h)
-                    )
-                return glitched
-            return frame
-            
-        return clip.transform(glitch_transform) 
\ No newline at end of file
+        return GlitchEffect(start_time, duration, seed, modes, intensity).transform(clip)
@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import cv2
+import numpy as np
+from ..buffers import frame_pool
+
+log = logging.getLogger()
+
+
+def load_cube(path):
+    """Parse a .cube 3D LUT file.
+
+    Args:
+        path (str): Path to the .cube file
+
+    Returns:
+        (table, domain_min, domain_max, title) where table is a float32 array
+        of shape (size, size, size, 3) indexed [b][g][r], as stored in the file
+    """
+    size = None
+    domain_min, domain_max = (0.0, 0.0, 0.0), (1.0, 1.0, 1.0)
+    title = None
+    values = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            keyword = line.split(None, 1)[0]
+            if keyword == 'TITLE':
+                title = line[len('TITLE'):].strip().strip('"')
+            elif keyword == 'LUT_3D_SIZE':
+                size = int(line.split()[1])
+            elif keyword == 'LUT_1D_SIZE':
+                raise ValueError(f"{path}: 1D LUTs are not supported")
+            elif keyword == 'DOMAIN_MIN':
+                domain_min = tuple(float(v) for v in line.split()[1:4])
+            elif keyword == 'DOMAIN_MAX':
+                domain_max = tuple(float(v) for v in line.split()[1:4])
+            elif keyword[0].isalpha():
+                # 其他关键字（如 LUT_3D_INPUT_RANGE）不影响查表
+                log.debug(f"{path}:{line_no}: ignoring {keyword}")
+            else:
+                values.append(line.split()[:3])
+
+    if size is None or size < 2:
+        raise ValueError(f"{path}: missing or invalid LUT_3D_SIZE")
+    if len(values) != size ** 3:
+        raise ValueError(f"{path}: expected {size ** 3} entries, found {len(values)}")
+    # .cube 文件中 R 变化最快，所以按 [b][g][r] 排列
+    table = np.array(values, dtype=np.float32).reshape(size, size, size, 3)
+    return table, domain_min, domain_max, title
+
+
+class ColorLut:
+    """3D color lookup table used for color grading.
+
+    Frames are graded either by trilinear interpolation of the LUT, or by a
+    dense table holding the interpolated result for every 8-bit color,
+    which turns grading into a single gather per pixel.
+    """
+
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, table, domain_min=(0.0, 0.0, 0.0), domain_max=(1.0, 1.0, 1.0), title=None):
+        """Create a LUT.
+
+        Args:
+            table: float array of shape (size, size, size, 3) indexed [b][g][r]
+            domain_min: Input value mapped to the first LUT entry
+            domain_max: Input value mapped to the last LUT entry
+            title (str): Name of the look
+        """
+        self.size = table.shape[0]
+        self.table = np.ascontiguousarray(table, dtype=np.float32)
+        self.domain_min = np.array(domain_min, dtype=np.float32)
+        self.domain_max = np.array(domain_max, dtype=np.float32)
+        self.title = title
+        self._dense = None
+        self._dense_lock = threading.Lock()
+
+    @staticmethod
+    def load(path):
+        """Load a .cube file, reusing the LUT already loaded by this process.
+
+        The cached LUT is reloaded when the file size or modification time
+        changes.
+        """
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        with ColorLut._cache_lock:
+            entry = ColorLut._cache.get(key)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+        lut = ColorLut(*load_cube(path))
+        log.info(f"Loaded {lut.size}^3 LUT {lut.title or ''} from {path}")
+        with ColorLut._cache_lock:
+            ColorLut._cache[key] = (signature, lut)
+        return lut
+
+    def lookup(self, rgb):
+        """Trilinear lookup of colors.
+
+        Args:
+            rgb: float array (..., 3) of input colors in 0-1
+
+        Returns:
+            float32 array (..., 3) of graded colors in 0-1
+        """
+        n = self.size
+        pos = (np.asarray(rgb, dtype=np.float32) - self.domain_min) / (self.domain_max - self.domain_min)
+        pos = np.clip(pos, 0, 1) * (n - 1)
+        base = np.minimum(pos.astype(np.int32), n - 2)
+        frac = pos - base
+        flat = self.table.reshape(-1, 3)
+        index = base[..., 0] + base[..., 1] * n + base[..., 2] * n * n
+        fr, fg, fb = frac[..., 0:1], frac[..., 1:2], frac[..., 2:3]
+
+        # 先沿 r 插值，再沿 g，最后沿 b
+        def along_r(offset):
+            c0 = flat[index + offset]
+            return c0 + (flat[index + offset + 1] - c0) * fr
+
+        c0 = along_r(0)
+        c0 += (along_r(n) - c0) * fg
+        c1 = along_r(n * n)
+        c1 += (along_r(n * n + n) - c1) * fg
+        return c0 + (c1 - c0) * fb
+
+    def _axis_weights(self, channel):
+        """Lower LUT index and interpolation weight of every 8-bit level on one channel."""
+        levels = np.arange(256, dtype=np.float32) / 255
+        span = self.domain_max[channel] - self.domain_min[channel]
+        pos = np.clip((levels - self.domain_min[channel]) / span, 0, 1) * (self.size - 1)
+        base = np.minimum(pos.astype(np.int32), self.size - 2)
+        return base, pos - base
+
+    def dense_table(self):
+        """Packed RGBA uint32 result for every 8-bit color, indexed r | g << 8 | b << 16.
+
+        Built once (64 MB) and shared by every job using this LUT.
+        """
+        with self._dense_lock:
+            if self._dense is None:
+                # 三线性插值可以按轴分解：先沿 r 再沿 g 把表放大到 256 级，最后逐个 b 平面插值
+                table = self.table
+                for axis, channel in ((2, 0), (1, 1)):
+                    base, frac = self._axis_weights(channel)
+                    shape = [1, 1, 1, 1]
+                    shape[axis] = 256
+                    low = np.take(table, base, axis=axis)
+                    table = low + (np.take(table, base + 1, axis=axis) - low) * frac.reshape(shape)
+                base, frac = self._axis_weights(2)
+                dense = np.empty(256 ** 3, dtype=np.uint32)
+                for b in range(256):
+                    low, high = table[base[b]], table[base[b] + 1]
+                    graded = np.clip((low + (high - low) * frac[b]) * 255 + 0.5, 0, 255).astype(np.uint32)
+                    plane = dense[b << 16:(b + 1) << 16].reshape(256, 256)
+                    np.left_shift(graded[:, :, 2], 8, out=plane)
+                    plane |= graded[:, :, 1]
+                    plane <<= 8
+                    plane |= graded[:, :, 0]
+                self._dense = dense
+        return self._dense
+
+    def render(self, frame, out=None, dense=True):
+        """Grade an RGB frame.
+
+        Args:
+            frame: uint8 RGB frame
+            out: Optional preallocated output buffer (may be frame itself)
+            dense (bool): Use the dense table instead of interpolating every pixel
+        """
+        if out is None:
+            out = np.empty_like(frame)
+        if not dense:
+            graded = self.lookup(frame.astype(np.float32) / 255)
+            np.copyto(out, np.clip(graded * 255 + 0.5, 0, 255), casting='unsafe')
+            return out
+
+        table = self.dense_table()
+        h, w = frame.shape[:2]
+        # RGBA 字节按小端解释为 uint32 即 r | g<<8 | b<<16 | a<<24，去掉 alpha 就是表的下标
+        rgba = frame_pool.acquire((h, w, 4), np.uint8)
+        graded = frame_pool.acquire((h, w, 4), np.uint8)
+        try:
+            cv2.cvtColor(frame, cv2.COLOR_RGB2RGBA, dst=rgba)
+            index = rgba.view(np.uint32).reshape(-1)
+            np.bitwise_and(index, 0xFFFFFF, out=index)
+            np.take(table, index, out=graded.view(np.uint32).reshape(-1), mode='clip')
+            cv2.cvtColor(graded, cv2.COLOR_RGBA2RGB, dst=out)
+        finally:
+            frame_pool.release(rgba)
+            frame_pool.release(graded)
+        return out
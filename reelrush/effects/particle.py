@@ -1,71 +1,167 @@
 import numpy as np
 import cv2
+from .base import Effect, register_effect
+from ..quality import current_quality
+from ..seeding import effect_seed
 
 class ParticleEffect:
-    def __init__(self, num_particles):
+    # 粒子随时间运动
+    TIME_INVARIANT = False
+
+    # 向下的加速度（像素/秒²）
+    GRAVITY = 500
+
+    def __init__(self, num_particles, seed=None):
         """Initialize particle system.
-        
+
         Args:
             num_particles (int): Number of particles to simulate
+            seed (int): Seed of the initial particle state, random when None
         """
         self.num_particles = num_particles
-        self.particles = []
-        
+        self.seed = seed
+        self.origin = None
+        self.positions = np.empty((0, 2))
+        self.velocities = np.empty((0, 2))
+        self.life = np.empty(0)
+        self._initial = None
+
     def initialize_particles(self, origin):
         """Initialize particles at given origin point.
-        
+
         Args:
             origin (tuple): (x,y) coordinates for particle origin
         """
-        self.particles = []
-        for _ in range(self.num_particles):
-            # 使用 float 数组来存储位置和速度
-            angle = np.random.uniform(0, 2*np.pi)
-            speed = np.random.uniform(100, 300)
-            particle = {
-                'pos': np.array(origin, dtype=np.float64),  # 改为 float64
-                'vel': np.array([
-                    speed * np.cos(angle),
-                    speed * np.sin(angle)
-                ], dtype=np.float64),  # 改为 float64
-                'life': np.random.uniform(0.5, 1.0)
-            }
-            self.particles.append(particle)
-            
+        rng = np.random.default_rng(self.seed)
+        angle = rng.uniform(0, 2*np.pi, self.num_particles)
+        speed = rng.uniform(100, 300, self.num_particles)
+        life = rng.uniform(0.5, 1.0, self.num_particles)
+        velocities = np.stack([speed * np.cos(angle), speed * np.sin(angle)], axis=1)
+
+        self.origin = tuple(origin)
+        self._initial = (np.array(origin, dtype=np.float64), velocities, life)
+        self.positions = np.tile(self._initial[0], (self.num_particles, 1))
+        self.velocities = velocities.copy()
+        self.life = life.copy()
+
     def update_particles(self, dt):
         """Update particle positions and lifetimes.
-        
+
         Args:
             dt (float): Time step for simulation
         """
-        for p in self.particles:
-            # 更新位置 (使用 float64 计算)
-            p['pos'] = p['pos'] + p['vel'] * dt
-            # 添加重力效果
-            p['vel'][1] += 500 * dt  # 向下的加速度
-            # 减少生命值
-            p['life'] -= dt
-            
-        # Remove dead particles
-        self.particles = [p for p in self.particles if p['life'] > 0]
-    
+        self.positions += self.velocities * dt
+        # 添加重力效果
+        self.velocities[:, 1] += self.GRAVITY * dt
+        # 减少生命值
+        self.life -= dt
+
+    def set_time(self, elapsed, dt=None):
+        """Move particles to their state elapsed seconds after initialization.
+
+        The state is computed in closed form, so frames can be rendered in
+        any order, or in different processes, with the same result.
+
+        Args:
+            elapsed (float): Seconds since the explosion started
+            dt (float): Frame duration; when given, the state is the one reached
+                by calling update_particles(dt) once per frame up to and including
+                the current one, as frame-by-frame rendering does
+        """
+        origin, velocities, life = self._initial
+        if dt is None:
+            self.positions = origin + velocities * elapsed
+            self.positions[:, 1] += 0.5 * self.GRAVITY * elapsed ** 2
+            self.velocities = velocities.copy()
+            self.velocities[:, 1] += self.GRAVITY * elapsed
+            self.life = life - elapsed
+            return
+        # n 次欧拉步：位置先用旧速度更新，再加速，因此重力位移是 g·dt²·n(n-1)/2
+        steps = int(round(elapsed / dt)) + 1
+        self.positions = origin + velocities * (steps * dt)
+        self.positions[:, 1] += 0.5 * self.GRAVITY * dt * dt * steps * (steps - 1)
+        self.velocities = velocities.copy()
+        self.velocities[:, 1] += self.GRAVITY * dt * steps
+        self.life = life - steps * dt
+
     def render(self, frame, t):
         """Render particles onto frame.
-        
+
         Args:
             frame: Video frame to draw on
             t (float): Current time
         """
-        for p in self.particles:
-            if p['life'] > 0:
-                # 转换为整数坐标进行绘制
-                pos = p['pos'].astype(np.int32)
-                alpha = p['life']  # 使用生命值作为透明度
-                cv2.circle(
-                    frame,
-                    (pos[0], pos[1]),
-                    2,
-                    (255, 255, 255),
-                    -1
-                )
-        return frame 
\ No newline at end of file
+        settings = current_quality()
+        alive = np.flatnonzero(self.life > 0)
+        # 降低质量时只绘制一部分粒子
+        count = int(round(len(alive) * settings.particle_fraction))
+        positions = self.positions[alive[:count]]
+        radius = 2
+        if settings.resolution_scale != 1:
+            # 速度和重力以原分辨率的像素为单位，降低输出分辨率时按比例缩小
+            origin = np.array(self.origin, dtype=np.float64)
+            positions = origin + (positions - origin) * settings.resolution_scale
+            radius = max(1, int(round(2 * settings.resolution_scale)))
+        for x, y in positions.astype(np.int32):
+            cv2.circle(
+                frame,
+                (int(x), int(y)),
+                radius,
+                (255, 255, 255),
+                -1
+            )
+        return frame
+
+
+@register_effect
+class ParticleExplosion(Effect):
+    """Particle explosion drawn on top of the video (a ParticleEffect placed in time)."""
+
+    name = 'particle'
+
+    # 粒子状态只由时间决定（闭式解），帧可以按任意顺序渲染
+    TIME_INVARIANT = False
+    INPLACE = True
+
+    def __init__(self, start_time, duration=1.0, num_particles=100, position='center', seed=None):
+        """Create a particle explosion.
+
+        Args:
+            start_time (float): Time to trigger explosion
+            duration (float): Duration of effect
+            num_particles (int): Number of particles
+            position (str/tuple): Position of explosion ('center' or (x,y) in range 0-1)
+            seed (int): Seed of the particles, derived from the timing when None
+        """
+        if position != 'center' and not (isinstance(position, (tuple, list)) and len(position) == 2):
+            raise ValueError("Position must be 'center' or a tuple of (x,y) in range 0-1")
+        super().__init__(start_time, duration)
+        self.num_particles = num_particles
+        self.position = position
+        self.seed = seed
+        self.dt = 1 / 30
+        self.particles = ParticleEffect(num_particles, seed)
+
+    def prepare(self, fps):
+        self.dt = 1 / fps
+        if self.seed is None:
+            self.particles.seed = effect_seed('particle', self.start_time, self.duration, self.num_particles)
+            self.particles.origin = None
+
+    def params(self):
+        return {'num_particles': self.num_particles, 'position': self.position, 'seed': self.seed}
+
+    def render_frame(self, frame, t, out=None):
+        height, width = frame.shape[:2]
+        if self.position == 'center':
+            origin = (width // 2, height // 2)
+        else:
+            # 将百分比位置转换为像素坐标
+            origin = (int(self.position[0] * width), int(self.position[1] * height))
+        if self.particles.origin != origin:
+            self.particles.initialize_particles(origin)
+
+        self.particles.set_time(t - self.start_time, self.dt)
+        if out is not frame:
+            np.copyto(out, frame)
+        return self.particles.render(out, t)
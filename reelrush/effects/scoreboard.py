@@ -0,0 +1,348 @@
+import csv
+import json
+import math
+import string
+import threading
+from bisect import bisect_right
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+from .base import Effect, register_effect
+from .sprite import TextSprite
+
+
+def _parse_value(value):
+    """Number if value looks like one, else the stripped string (None for empty cells)."""
+    if value is None or isinstance(value, (int, float, bool)):
+        return value
+    value = str(value).strip()
+    if value == '':
+        return None
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _clock_seconds(value):
+    """Seconds of a clock value given as seconds or 'M:SS'."""
+    if isinstance(value, str) and ':' in value:
+        minutes, seconds = value.split(':', 1)
+        return int(minutes) * 60 + float(seconds)
+    return float(value)
+
+
+def _format_clock(seconds):
+    seconds = max(int(math.ceil(seconds - 1e-6)), 0)
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class GameData:
+    """Game state over time, from a play-by-play file.
+
+    Each event has a time (seconds of the input video) and the fields it
+    changes, e.g. home_score, away_score, period or a player's points;
+    fields keep their value until an event changes them. A 'clock' field
+    (seconds or 'M:SS') counts down from the event time while the event's
+    'clock_running' field is true.
+    """
+
+    def __init__(self, events):
+        """Create the timeline.
+
+        Args:
+            events: Iterable of dicts with a 'time' key and the changed fields
+        """
+        self.times = []
+        self.states = []
+        state = {}
+        for event in sorted(events, key=lambda e: float(e['time'])):
+            state = dict(state)
+            for field, value in event.items():
+                if field == 'time':
+                    continue
+                value = _parse_value(value)
+                if value is not None:
+                    state[field] = value
+            self.times.append(float(event['time']))
+            self.states.append(state)
+
+    @classmethod
+    def load(cls, path):
+        """Load a .csv (one row per event, a 'time' column) or .json (list of events) file."""
+        if path.lower().endswith('.json'):
+            with open(path) as f:
+                data = json.load(f)
+            return cls(data['events'] if isinstance(data, dict) else data)
+        with open(path, newline='') as f:
+            return cls(list(csv.DictReader(f)))
+
+    def index_at(self, t):
+        """Index of the last event at or before t (-1 before the first one)."""
+        return bisect_right(self.times, t) - 1
+
+    def values_at(self, t):
+        """Field values to display at time t, with the clock run down."""
+        index = self.index_at(t)
+        if index < 0:
+            return {}
+        values = dict(self.states[index])
+        if 'clock' in values:
+            remaining = _clock_seconds(values['clock'])
+            if str(values.get('clock_running', '')).lower() in ('1', 'true', 'yes'):
+                remaining -= t - self.times[index]
+            values['clock'] = _format_clock(remaining)
+        return values
+
+
+class _Blank(dict):
+    """format_map mapping that shows missing fields as empty."""
+
+    def __missing__(self, key):
+        return ''
+
+
+class GlyphAtlas:
+    """Glyphs of one font, size and style, rasterized once and blitted into overlays.
+
+    Digits share the width of the widest digit, so scores and clocks do
+    not jitter when their value changes.
+    """
+
+    CHARSET = string.ascii_letters + string.digits + string.punctuation + ' '
+
+    _atlases = {}
+    _lock = threading.Lock()
+
+    def __init__(self, font_path, fontsize, color='white', stroke_color='black', stroke_width=1):
+        """Rasterize the glyphs of CHARSET (others are added on first use).
+
+        Args:
+            font_path (str): TrueType font file
+            fontsize (int): Font size in pixels
+            color: Glyph color (name or RGB tuple)
+            stroke_color: Outline color
+            stroke_width (int): Outline width in pixels
+        """
+        try:
+            self.font = ImageFont.truetype(font_path, fontsize)
+        except OSError:
+            self.font = ImageFont.load_default(fontsize)
+        self.color = ImageColor.getrgb(color) if isinstance(color, str) else tuple(color)
+        self.stroke_color = ImageColor.getrgb(stroke_color) if isinstance(stroke_color, str) else tuple(stroke_color)
+        self.stroke_width = stroke_width
+        ascent, descent = self.font.getmetrics()
+        self.height = ascent + descent + 2 * stroke_width
+        self.glyphs = {}
+        for char in self.CHARSET:
+            self.glyph(char)
+        self.digit_advance = max(self.glyphs[d][3] for d in string.digits)
+
+    @classmethod
+    def get(cls, font_path, fontsize, color='white', stroke_color='black', stroke_width=1):
+        """Atlas shared by every overlay in the process using the same font and style."""
+        key = (font_path, fontsize, str(color), str(stroke_color), stroke_width)
+        with cls._lock:
+            atlas = cls._atlases.get(key)
+            if atlas is None:
+                atlas = cls._atlases[key] = cls(font_path, fontsize, color, stroke_color, stroke_width)
+            return atlas
+
+    def glyph(self, char):
+        """(premultiplied color, alpha, x offset, advance) of a character."""
+        glyph = self.glyphs.get(char)
+        if glyph is not None:
+            return glyph
+        stroke = self.stroke_width
+        left, _, right, _ = self.font.getbbox(char, stroke_width=stroke)
+        advance = self.font.getlength(char)
+        # 描边已计入 bbox；左侧伸出原点的部分（如 j 的下伸）也要留出空间
+        pad = max(-left, 0)
+        width = max(int(math.ceil(max(right, advance))) + pad, 1)
+        image = Image.new('RGBA', (width, self.height), (0, 0, 0, 0))
+        ImageDraw.Draw(image).text((pad, stroke), char, font=self.font, fill=self.color,
+                                   stroke_width=stroke, stroke_fill=self.stroke_color)
+        rgba = np.asarray(image, dtype=np.float32)
+        alpha = rgba[:, :, 3:] / 255
+        glyph = (rgba[:, :, :3] * alpha, alpha, -pad, advance)
+        self.glyphs[char] = glyph
+        return glyph
+
+    def _advance(self, char):
+        return self.digit_advance if char.isdigit() else self.glyph(char)[3]
+
+    def text_width(self, text):
+        """Width in pixels of text drawn with draw()."""
+        return int(math.ceil(sum(self._advance(char) for char in text))) + 2 * self.stroke_width
+
+    def draw(self, text, color, alpha, x, y):
+        """Composite text over a premultiplied canvas with its top-left corner at (x, y).
+
+        Args:
+            text (str): Text to draw
+            color: (h, w, 3) float32 premultiplied color canvas, modified in place
+            alpha: (h, w, 1) float32 alpha canvas, modified in place
+            x, y: Top-left pixel of the text
+        """
+        height, width = alpha.shape[:2]
+        pen = x + self.stroke_width
+        for char in text:
+            glyph_color, glyph_alpha, offset, advance = self.glyph(char)
+            if char.isdigit():
+                # 数字等宽居中，比分和时钟变化时不会左右跳动
+                offset += (self.digit_advance - advance) / 2
+                advance = self.digit_advance
+            gx, gy = int(round(pen + offset)), y
+            x0, y0 = max(gx, 0), max(gy, 0)
+            x1, y1 = min(gx + glyph_alpha.shape[1], width), min(gy + glyph_alpha.shape[0], height)
+            if x0 < x1 and y0 < y1:
+                g = (slice(y0 - gy, y1 - gy), slice(x0 - gx, x1 - gx))
+                a = glyph_alpha[g]
+                color[y0:y1, x0:x1] = glyph_color[g] + color[y0:y1, x0:x1] * (1 - a)
+                alpha[y0:y1, x0:x1] = a + alpha[y0:y1, x0:x1] * (1 - a)
+            pen += advance
+
+
+@register_effect
+class Scoreboard(Effect):
+    """Score, game clock and stat bars drawn from play-by-play data.
+
+    The overlay panel is composed from a GlyphAtlas only when the displayed
+    values change; every frame only blends the panel's region.
+    """
+
+    name = 'scoreboard'
+
+    # 输出只取决于输入帧和显示的数值；只改变面板区域内的像素
+    TIME_INVARIANT = True
+    POINTWISE = True
+    INPLACE = True
+
+    DEFAULT_LINES = ("{home} {home_score}  {away} {away_score}", "Q{period}  {clock}")
+    CORNERS = ('top_left', 'top_right', 'bottom_left', 'bottom_right')
+
+    def __init__(self, data, start_time, duration, font_path, lines=DEFAULT_LINES, bars=(),
+                 position='top_left', fontsize=36, color='white', stroke_color='black', stroke_width=1,
+                 background=(0, 0, 0), background_opacity=0.6, bar_color=(255, 190, 0),
+                 padding=12, margin=24, bar_width=200, time_map=None):
+        """Create the overlay.
+
+        Args:
+            data (GameData): Game state over time
+            start_time (float): Start time of the overlay
+            duration (float): Duration of the overlay
+            font_path (str): TrueType font file
+            lines: Format strings of the text lines, filled with the current fields
+            bars: (label format, field, max value) of each stat bar
+            position: One of CORNERS, or (x, y) of the panel's top-left pixel
+            fontsize (int): Font size in pixels
+            color: Text color
+            stroke_color: Text outline color
+            stroke_width (int): Text outline width
+            background: RGB color of the panel
+            background_opacity (float): Opacity of the panel (0 to 1)
+            bar_color: RGB color of the filled part of the stat bars
+            padding (int): Pixels between the panel edge and its content
+            margin (int): Pixels between the frame edge and a corner panel
+            bar_width (int): Width of a full stat bar in pixels
+            time_map: Function mapping clip time to data time (e.g. the editor's TimeWarp), identity when None
+        """
+        if position not in self.CORNERS and not (isinstance(position, (tuple, list)) and len(position) == 2):
+            raise ValueError(f"Position must be one of {self.CORNERS} or an (x, y) tuple")
+        super().__init__(start_time, duration)
+        self.data = data
+        self.lines = list(lines)
+        self.bars = [tuple(bar) for bar in bars]
+        self.position = position
+        self.background = tuple(background)
+        self.background_opacity = background_opacity
+        self.bar_color = tuple(bar_color)
+        self.padding = padding
+        self.margin = margin
+        self.bar_width = bar_width
+        self.time_map = time_map
+        self.atlas = GlyphAtlas.get(font_path, fontsize, color, stroke_color, stroke_width)
+        self.redraws = 0  # 重新绘制面板的次数
+        self._key = None
+        self._sprite = None
+        self._size = self._panel_size()
+
+    def _texts(self, values):
+        fields = _Blank(values)
+        lines = [line.format_map(fields) for line in self.lines]
+        bars = []
+        for label, field, max_value in self.bars:
+            value = values.get(field)
+            fraction = min(max(float(value) / max_value, 0.0), 1.0) if isinstance(value, (int, float)) else 0.0
+            bars.append((label.format_map(fields), fraction))
+        return tuple(lines), tuple(bars)
+
+    def _panel_size(self):
+        """Panel size large enough for the values at every event, so the region never changes."""
+        label_width = line_width = 0
+        for time in self.data.times:
+            lines, bars = self._texts(self.data.values_at(time))
+            line_width = max([line_width] + [self.atlas.text_width(line) for line in lines])
+            label_width = max([label_width] + [self.atlas.text_width(label) for label, _ in bars])
+        bar_row = label_width + self.padding + self.bar_width if self.bars else 0
+        width = max(line_width, bar_row) + 2 * self.padding
+        height = (len(self.lines) + len(self.bars)) * self.atlas.height + 2 * self.padding
+        return width, height
+
+    def _data_time(self, t):
+        return self.time_map(t) if self.time_map is not None else t
+
+    def memo_key(self, t):
+        return self._texts(self.data.values_at(self._data_time(t)))
+
+    def region(self, width, height):
+        panel_width, panel_height = self._size
+        if self.position in self.CORNERS:
+            x = self.margin if self.position.endswith('left') else width - panel_width - self.margin
+            y = self.margin if self.position.startswith('top') else height - panel_height - self.margin
+        else:
+            x, y = int(self.position[0]), int(self.position[1])
+        # 面板保持在画面内，区域的左上角就是面板的左上角
+        x = max(min(x, width - panel_width), 0)
+        y = max(min(y, height - panel_height), 0)
+        return x, y, x + panel_width, y + panel_height
+
+    def params(self):
+        return {'lines': self.lines, 'bars': self.bars, 'position': self.position}
+
+    def _draw(self, key):
+        """Compose the panel for the displayed values."""
+        lines, bars = key
+        width, height = self._size
+        alpha = np.full((height, width, 1), self.background_opacity, dtype=np.float32)
+        color = np.empty((height, width, 3), dtype=np.float32)
+        color[:] = np.array(self.background, dtype=np.float32) * self.background_opacity
+        y = self.padding
+        for line in lines:
+            self.atlas.draw(line, color, alpha, self.padding, y)
+            y += self.atlas.height
+        bar_x = width - self.padding - self.bar_width
+        bar_h = max(self.atlas.height // 3, 2)
+        for label, fraction in bars:
+            self.atlas.draw(label, color, alpha, self.padding, y)
+            top = y + (self.atlas.height - bar_h) // 2
+            # 底槽半透明，填充部分不透明
+            track = (slice(top, top + bar_h), slice(bar_x, bar_x + self.bar_width))
+            color[track] = color[track] * 0.5 + 64
+            alpha[track] = alpha[track] * 0.5 + 0.5
+            filled = (slice(top, top + bar_h), slice(bar_x, bar_x + int(round(self.bar_width * fraction))))
+            color[filled] = self.bar_color
+            alpha[filled] = 1.0
+            y += self.atlas.height
+        self.redraws += 1
+        return TextSprite.from_premultiplied(color, alpha[:, :, 0])
+
+    def render_frame(self, frame, t, out=None):
+        """Blend the panel onto the region() of a frame (frame and out are that region)."""
+        key = self.memo_key(t)
+        if key != self._key:
+            # 数值变化时才重新绘制面板
+            self._sprite = self._draw(key)
+            self._key = key
+        return self._sprite.blend(frame, 0, 0, 1.0, out)
@@ -1,36 +1,72 @@
 from moviepy import *
 import numpy as np
+import cv2
+from .base import Effect, register_effect
+from ..curves import as_curve
+from ..quality import current_quality
+from ..seeding import effect_seed, frame_rng
+
+@register_effect
+class CameraShake(Effect):
+    name = 'camera_shake'
+
+    # 每帧随机抖动（随机数只由时间决定）
+    TIME_INVARIANT = False
+    GEOMETRIC = True
+
+    @staticmethod
+    def render(frame, dx, dy, out=None):
+        """Translate a single frame by (dx, dy).
+        
+        Args:
+            frame: RGB frame
+            dx, dy: Offset in pixels
+            out: Optional preallocated output buffer (must not be frame)
+        """
+        h, w = frame.shape[:2]
+        M = np.float32([[1, 0, dx], [0, 1, dy]])
+        return cv2.warpAffine(frame, M, (w, h), dst=out)
+
+    def __init__(self, start_time, duration, intensity=0.5, seed=None):
+        """Create a camera shake effect.
+
+        Args:
+            start_time: Start time in seconds
+            duration: Duration in seconds
+            intensity: Shake intensity (0.0 to 1.0), or a Curve giving the intensity over the effect
+            seed: Seed of the random offsets, derived from the timing when None
+        """
+        super().__init__(start_time, duration)
+        self.intensity = intensity
+        self.seed = seed
+        self.fps = 30
+        self._seed = seed
+        self._intensity_table = None
+
+    def prepare(self, fps):
+        self.fps = fps
+        self._intensity_table = as_curve(self.intensity).table(self.start_time, self.duration, fps)
+        if self.seed is None:
+            self._seed = effect_seed('camera_shake', self.start_time, self.duration)
+
+    def params(self):
+        return {'intensity': self.intensity, 'seed': self.seed}
+
+    def render_frame(self, frame, t, out=None):
+        # 生成随机偏移（像素幅度随输出分辨率缩放）
+        scale = current_quality().resolution_scale
+        dx, dy = scale * self._intensity_table(t) * frame_rng(self._seed, t, self.fps).uniform(-30, 30, size=2)
+        return CameraShake.render(frame, dx, dy, out)
 
-class CameraShake:
     @staticmethod
-    def apply(clip, start_time, duration, intensity=0.5):
+    def apply(clip, start_time, duration, intensity=0.5, seed=None):
         """Apply camera shake effect to video.
         
         Args:
             clip: Input video clip
             start_time: Start time in seconds
             duration: Duration in seconds
-            intensity: Shake intensity (0.0 to 1.0)
+            intensity: Shake intensity (0.0 to 1.0), or a Curve giving the intensity over the effect
+            seed: Seed of the random offsets, derived from the timing when None
         """
-        def shake_transform(get_frame, t):
-            # 只在指定时间段内应用抖动
-            if t < start_time or t > start_time + duration:
-                return get_frame(t)
-            
-            # 生成随机偏移
-            dx = intensity * np.random.uniform(-30, 30)
-            dy = intensity * np.random.uniform(-30, 30)
-            
-            # 获取原始帧
-            frame = get_frame(t)
-            
-            # 创建平移矩阵
-            h, w = frame.shape[:2]
-            M = np.float32([[1, 0, dx], [0, 1, dy]])
-            
-            # 应用平移变换
-            import cv2
-            return cv2.warpAffine(frame, M, (w, h))
-            
-        # 使用 transform 替代 fl
-        return clip.transform(shake_transform) 
\ No newline at end of file
+        return CameraShake(start_time, duration, intensity, seed).transform(clip)
@@ -1,8 +1,41 @@
 from moviepy import VideoFileClip, CompositeVideoClip
 import numpy as np
 import cv2
+from ..buffers import FrameRing
 
 class SlideTransition:
+    # 偏移量随进度变化
+    TIME_INVARIANT = False
+
+    @staticmethod
+    def render(frame, progress, direction='left', out=None):
+        """Slide a single frame out of view.
+        
+        Args:
+            frame: RGB frame
+            progress: Transition progress (0 to 1)
+            direction: Direction of slide ('left', 'right', 'up', 'down')
+            out: Optional preallocated output buffer (must not be frame)
+        """
+        h, w = frame.shape[:2]
+        
+        # 创建变换矩阵
+        if direction == 'left':
+            offset = int(w * progress)
+            M = np.float32([[1, 0, -offset], [0, 1, 0]])
+        elif direction == 'right':
+            offset = int(w * (1 - progress))
+            M = np.float32([[1, 0, offset], [0, 1, 0]])
+        elif direction == 'up':
+            offset = int(h * progress)
+            M = np.float32([[1, 0, 0], [0, 1, -offset]])
+        else:  # down
+            offset = int(h * (1 - progress))
+            M = np.float32([[1, 0, 0], [0, 1, offset]])
+        
+        # 应用变换
+        return cv2.warpAffine(frame, M, (w, h), dst=out)
+
     @staticmethod
     def apply(clip, start_time, duration=1.0, direction='left'):
         """Apply slide transition effect at specified timestamp.
@@ -13,6 +46,8 @@ class SlideTransition:
             duration (float): Duration of transition effect
             direction (str): Direction of slide ('left', 'right', 'up', 'down')
         """
+        ring = FrameRing()
+
         def slide_transform(get_frame, t):
             frame = get_frame(t)
             
@@ -20,24 +55,7 @@ class SlideTransition:
                 # 计算过渡进度 (0 到 1)
                 progress = (t - start_time) / duration
                 
-                h, w = frame.shape[:2]
-                
-                # 创建变换矩阵
-                if direction == 'left':
-                    offset = int(w * progress)
-                    M = np.float32([[1, 0, -offset], [0, 1, 0]])
-                elif direction == 'right':
-                    offset = int(w * (1 - progress))
-                    M = np.float32([[1, 0, offset], [0, 1, 0]])
-                elif direction == 'up':
-                    offset = int(h * progress)
-                    M = np.float32([[1, 0, 0], [0, 1, -offset]])
-                else:  # down
-                    offset = int(h * (1 - progress))
-                    M = np.float32([[1, 0, 0], [0, 1, offset]])
-                
-                # 应用变换
-                frame = cv2.warpAffine(frame, M, (w, h))
+                frame = SlideTransition.render(frame, progress, direction, ring.next(frame.shape, frame.dtype))
                 
             return frame
         
@@ -0,0 +1,168 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from moviepy import TextClip
+import cv2
+import numpy as np
+
+
+class TextSprite:
+    """Text rasterized once into a tight, premultiplied-alpha sprite.
+
+    Only the region of interest covered by the sprite is blended into a
+    frame; the rest of the frame is passed through untouched.
+    """
+
+    def __init__(self, rgb, alpha):
+        """Create a sprite from straight RGB and alpha.
+
+        Args:
+            rgb: (h, w, 3) uint8 color image
+            alpha: (h, w) alpha in 0-1
+        """
+        self.rgb = rgb
+        self.alpha = np.asarray(alpha, dtype=np.float32)[:, :, None]
+        self.premultiplied = rgb.astype(np.float32) * self.alpha
+        self.height, self.width = self.alpha.shape[:2]
+
+    @classmethod
+    def from_premultiplied(cls, premultiplied, alpha):
+        """Create a sprite from premultiplied color and (h, w) alpha."""
+        alpha = np.asarray(alpha, dtype=np.float32)
+        rgb = np.where(alpha[:, :, None] > 0, premultiplied / np.maximum(alpha, 1e-6)[:, :, None], 0)
+        return cls(np.clip(rgb + 0.5, 0, 255).astype(np.uint8), alpha)
+
+    def scaled(self, scale):
+        """A copy of the sprite resized by scale (filtered in premultiplied space)."""
+        return self.resized(max(int(round(self.width * scale)), 1), max(int(round(self.height * scale)), 1))
+
+    def resized(self, width, height):
+        """A copy of the sprite resized to width x height pixels (filtered in premultiplied space)."""
+        premultiplied = cv2.resize(self.premultiplied, (width, height), interpolation=cv2.INTER_AREA)
+        alpha = cv2.resize(self.alpha[:, :, 0], (width, height), interpolation=cv2.INTER_AREA)
+        return TextSprite.from_premultiplied(premultiplied.reshape(height, width, 3), alpha)
+
+    @classmethod
+    def render(cls, text, font, fontsize=70, color='white', stroke_color='black', stroke_width=2):
+        """Rasterize text with TextClip into a sprite just large enough to hold it."""
+        txt_clip = TextClip(
+            text=text,
+            font=font,
+            font_size=fontsize,
+            color=color,
+            stroke_color=stroke_color,
+            stroke_width=stroke_width,
+            method='label',
+            bg_color=None,
+        )
+        return cls(txt_clip.get_frame(0), txt_clip.mask.get_frame(0))
+
+    def position_in(self, frame_shape, position='center'):
+        """Top-left pixel of the sprite for a position ('center' or (x, y) in pixels)."""
+        if position == 'center':
+            return (frame_shape[1] - self.width) // 2, (frame_shape[0] - self.height) // 2
+        return int(position[0]), int(position[1])
+
+    def blend(self, frame, x, y, opacity=1.0, out=None):
+        """Alpha-blend the sprite onto frame with its top-left corner at (x, y).
+
+        Args:
+            frame: RGB frame
+            x, y: Top-left pixel of the sprite (may be partly outside the frame)
+            opacity: Scalar opacity applied to the whole sprite
+            out: Optional output buffer (may be frame itself)
+        """
+        if out is None:
+            out = frame.copy()
+        elif out is not frame:
+            np.copyto(out, frame)
+
+        # 只处理文字覆盖的区域
+        h, w = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + self.width, w), min(y + self.height, h)
+        if opacity <= 0 or x0 >= x1 or y0 >= y1:
+            return out
+
+        sx, sy = x0 - x, y0 - y
+        alpha = self.alpha[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        color = self.premultiplied[sy:sy + y1 - y0, sx:sx + x1 - x0]
+        roi = frame[y0:y1, x0:x1].astype(np.float32)
+        out[y0:y1, x0:x1] = roi * (1 - opacity * alpha) + opacity * color + 0.5
+        return out
+
+
+class SpritePyramid:
+    """Precomputed downscaled copies of a sprite for scale animations.
+
+    A frame at an arbitrary scale is resampled from the nearest level that
+    is not smaller, so the sprite is never rasterized while rendering and
+    each resize is by less than one level step. Resampled sprites are cached
+    by pixel size, so each size is only resampled once however many frames
+    (or animations going back and forth) use it.
+    """
+
+    def __init__(self, sprite, step=2 ** -0.125, min_scale=0.05, cache_size=128):
+        """Build the levels.
+
+        Args:
+            sprite: Full-size TextSprite (level 0)
+            step (float): Scale ratio between consecutive levels
+            min_scale (float): Smallest level to build
+            cache_size (int): Number of resampled sizes to keep
+        """
+        self.scales = [1.0]
+        self.levels = [sprite]
+        scale = step
+        while scale >= min_scale:
+            self.scales.append(scale)
+            self.levels.append(sprite.scaled(scale))
+            scale *= step
+        # scales 递减，取负值后递增，用于二分查找
+        self._negated_scales = [-s for s in self.scales]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def sprite_at(self, scale):
+        """Sprite scaled by scale, for scales between the smallest level and 1."""
+        width = max(int(round(self.levels[0].width * scale)), 1)
+        height = max(int(round(self.levels[0].height * scale)), 1)
+        sprite = self._cache.get((width, height))
+        if sprite is not None:
+            self._cache.move_to_end((width, height))
+            return sprite
+        # 不小于目标尺寸的最近一级（scales 中最后一个 >= scale 的）
+        k = bisect_right(self._negated_scales, -scale) - 1
+        level = self.levels[k]
+        sprite = level if (level.width, level.height) == (width, height) else level.resized(width, height)
+        self._cache[(width, height)] = sprite
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return sprite
+
+    def rect(self, cx, cy, scale):
+        """(x0, y0, x1, y1) covered by the sprite scaled by scale around (cx, cy)."""
+        width, height = self.levels[0].width * scale, self.levels[0].height * scale
+        return (int(cx - width / 2), int(cy - height / 2),
+                int(np.ceil(cx + width / 2)), int(np.ceil(cy + height / 2)))
+
+    def blend(self, frame, cx, cy, scale, opacity=1.0, out=None):
+        """Blend the sprite scaled by scale and centered on (cx, cy).
+
+        Args:
+            frame: RGB frame
+            cx, cy: Center of the sprite in pixels
+            scale: Scale relative to the full-size sprite (0 to 1)
+            opacity: Scalar opacity
+            out: Optional output buffer (may be frame itself)
+        """
+        scale = min(scale, 1.0)
+        if scale <= self.scales[-1]:
+            # 比最小一级还小：用最小一级并按比例淡出
+            level = self.levels[-1]
+            opacity *= max(scale, 0) / self.scales[-1]
+        else:
+            # 从不小于目标尺寸的最近一级缩小，只合成一次，不透明度保持不变
+            level = self.sprite_at(scale)
+
+        x, y = int(round(cx - level.width / 2)), int(round(cy - level.height / 2))
+        return level.blend(frame, x, y, opacity, out)
@@ -1,9 +1,18 @@
-from moviepy import TextClip, CompositeVideoClip
 import numpy as np
 import os
 from moviepy import *
+from ..curves import Curve
+from ..memo import FrameMemo
+from ..buffers import FrameRing
+from ..quality import current_quality
+from .sprite import TextSprite, SpritePyramid
+from .text_cache import FontIndex, sprite_cache
+
 
 class DynamicText:
+    # 输出只取决于输入帧和当前的不透明度
+    TIME_INVARIANT = True
+
     # 预设字体配置
     FONT_PRESETS = {
         'default': {
@@ -38,28 +47,42 @@ class DynamicText:
         }
     }
 
+    # 字体路径索引，第一次使用时建立
+    _font_index = None
+
+    @staticmethod
+    def font_index():
+        """Font preset paths for the current platform, resolved once per process."""
+        if DynamicText._font_index is None:
+            DynamicText._font_index = FontIndex(DynamicText.FONT_PRESETS)
+        return DynamicText._font_index
+
     @staticmethod
     def get_font_path(font_style='default'):
         """Get appropriate font path for current platform."""
         if font_style not in DynamicText.FONT_PRESETS:
             raise ValueError(f"Unknown font style: {font_style}. Available styles: {list(DynamicText.FONT_PRESETS.keys())}")
         
-        platform = 'darwin' if os.name == 'posix' and 'darwin' in os.uname().sysname.lower() else \
-                  'linux' if os.name == 'posix' else 'windows'
-        
-        font_path = DynamicText.FONT_PRESETS[font_style][platform]
-        
-        # 如果指定的字体不存在，回退到默认字体
-        if not os.path.exists(font_path):
-            return DynamicText.FONT_PRESETS['default'][platform]
-            
-        return font_path
+        return DynamicText.font_index().resolve(font_style)
+
+    @staticmethod
+    def get_sprite(text, font_style='default', fontsize=70, color='white',
+                   stroke_color='black', stroke_width=2):
+        """Get the rasterized sprite of a text, from the sprite cache when possible."""
+        font = DynamicText.get_font_path(font_style)
+        key = sprite_cache.key(text, font, fontsize, color, stroke_color, stroke_width,
+                               DynamicText.font_index().signature(font))
+        return sprite_cache.get(
+            key,
+            lambda: TextSprite.render(text, font, fontsize, color, stroke_color, stroke_width)
+        )
 
     @staticmethod
     def animated_text(clip, text, start_time, duration, 
                      position='center', fontsize=70, color='white',
                      animation='fade', stroke_color='black', stroke_width=2,
-                     font_style='default', blur_background=None):
+                     font_style='default', blur_background=None,
+                     blur_padding=20, blur_feather=0):
         """Create animated text overlay.
         
         Args:
@@ -75,31 +98,62 @@ class DynamicText:
             stroke_width: Width of text outline
             font_style: Font style to use ('default', 'bold', 'elegant', 'modern', 'impact', 'comic')
             blur_background: Type of blur effect for text background (None, 'box_blur', 'gaussian_blur', 'glass', 'motion_blur')
+            blur_padding: Pixels of blurred background around the text
+            blur_feather: Width in pixels of the soft edge of the blurred area
         """
-        # 如果需要模糊背景
-        if blur_background:
-            # 先对原始视频在文字显示的时间段应用模糊效果
-            from .filter import FilterEffect
-            clip = FilterEffect.apply(clip, blur_background, start_time, duration)
-        
-        # 获取对应平台的字体路径
-        font = DynamicText.get_font_path(font_style)
-            
-        txt_clip = TextClip(
-            text=text,
-            font=font,
-            font_size=fontsize,
-            color=color,
-            stroke_color=stroke_color,
-            stroke_width=stroke_width,
-            method='label',
-            size=clip.size,
-            bg_color=None,
-        )
-        
-        txt_clip = txt_clip.with_duration(duration)
-        
+        from .filter import FilterEffect
+
+        # 文字只光栅化一次，并在任务之间共享
+        sprite = DynamicText.get_sprite(text, font_style, fontsize, color, stroke_color, stroke_width)
+
+        # 动画曲线：入场/出场各 0.5 秒，预先编译成逐帧表
+        fps = clip.fps or 30
+        ramp = min(0.5 / duration, 0.5)
+        width, height = clip.size
+        x, y = sprite.position_in((height, width), position)
+        opacity, offset_x, scale = Curve.constant(1), Curve.constant(x), Curve.constant(1)
         if animation == 'fade':
-            txt_clip = txt_clip.with_effects([vfx.CrossFadeIn(0.5), vfx.CrossFadeOut(0.5)])
-        
-        return CompositeVideoClip([clip, txt_clip.with_start(start_time)]) 
\ No newline at end of file
+            opacity = Curve([(0, 0), (ramp, 1), (1 - ramp, 1), (1, 0)])
+        elif animation == 'slide':
+            # 从画面左侧外滑入，结束时向右侧滑出
+            offset_x = Curve([(0, -sprite.width, 'ease_out'), (ramp, x), (1 - ramp, x, 'ease_in'), (1, width)])
+        elif animation == 'scale':
+            scale = Curve([(0, 0, 'ease_out'), (ramp, 1), (1 - ramp, 1, 'ease_in'), (1, 0)])
+        opacity_table = opacity.table(start_time, duration, fps)
+        x_table = offset_x.table(start_time, duration, fps)
+        scale_table = scale.table(start_time, duration, fps)
+        pyramid = SpritePyramid(sprite) if animation == 'scale' else None
+        memo = FrameMemo()
+        ring = FrameRing()
+
+        def render(frame, out, x, current, size):
+            if pyramid is not None:
+                cx, cy = x + sprite.width / 2, y + sprite.height / 2
+                box = pyramid.rect(cx, cy, size)
+                draw = lambda f, o: pyramid.blend(f, cx, cy, size, current, o)
+            else:
+                box = (x, y, x + sprite.width, y + sprite.height)
+                draw = lambda f, o: sprite.blend(f, x, y, current, o)
+            if not blur_background:
+                return draw(frame, out)
+            # 背景模糊只作用于文字周围带边距的区域，结果写回输出缓冲区后再叠加文字
+            if out is not frame:
+                np.copyto(out, frame)
+            box = (box[0] - blur_padding, box[1] - blur_padding, box[2] + blur_padding, box[3] + blur_padding)
+            FilterEffect.render_region(frame, blur_background, box, out, blur_feather)
+            return draw(out, out)
+
+        def text_transform(get_frame, t):
+            frame = get_frame(t)
+            if not start_time <= t <= start_time + duration:
+                return frame
+
+            current = float(opacity_table(t))
+            current_x = int(round(x_table(t)))
+            size = float(scale_table(t))
+            if blur_background in FilterEffect.TIME_VARIANT_FILTERS:
+                return render(frame, ring.target(frame, inplace=True), current_x, current, size)
+            return memo.render(lambda f, out: render(f, out, current_x, current, size),
+                               frame, key=(current, current_x, size, current_quality()))
+
+        return clip.transform(text_transform)
@@ -0,0 +1,159 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+from .sprite import TextSprite
+
+log = logging.getLogger()
+
+# 修改精灵的渲染方式时递增，使旧的磁盘缓存失效
+SPRITE_CACHE_VERSION = 1
+
+
+def current_platform():
+    """Platform key used by the font presets ('darwin', 'linux' or 'windows')."""
+    if os.name == 'posix':
+        return 'darwin' if 'darwin' in os.uname().sysname.lower() else 'linux'
+    return 'windows'
+
+
+class FontIndex:
+    """Font preset paths resolved once, with the fallback already applied."""
+
+    def __init__(self, presets, platform=None):
+        """Look up every preset on the filesystem.
+
+        Args:
+            presets: Mapping of style -> {platform: font path}
+            platform (str): Platform key, detected when None
+        """
+        self.platform = platform or current_platform()
+        default = presets['default'][self.platform]
+        self.paths = {}
+        for style, paths in presets.items():
+            path = paths[self.platform]
+            # 如果指定的字体不存在，回退到默认字体
+            self.paths[style] = path if os.path.exists(path) else default
+        self._signatures = {}
+
+    def resolve(self, font_style):
+        """Font path for a style."""
+        return self.paths[font_style]
+
+    def signature(self, font_path):
+        """(size, mtime) of a font file, so cached sprites notice font updates."""
+        if font_path not in self._signatures:
+            try:
+                stat = os.stat(font_path)
+                self._signatures[font_path] = (stat.st_size, int(stat.st_mtime))
+            except OSError:
+                self._signatures[font_path] = None
+        return self._signatures[font_path]
+
+
+class SpriteCache:
+    """Memory and disk cache of rasterized text sprites.
+
+    Sprites are keyed by text, font file, size, colors and stroke. The
+    memory level is an LRU shared by every job in the process; the disk
+    level survives restarts and is shared by workers on the same machine.
+    """
+
+    def __init__(self, cache_dir=None, max_items=256):
+        """Create the cache.
+
+        Args:
+            cache_dir (str): Directory for cached sprites, None to keep them in memory only
+            max_items (int): Number of sprites kept in memory
+        """
+        self.cache_dir = cache_dir
+        self.max_items = max_items
+        self.hits = 0         # 内存命中
+        self.disk_hits = 0    # 磁盘命中
+        self.misses = 0       # 重新渲染
+        self._sprites = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text, font, fontsize, color, stroke_color, stroke_width, font_signature=None):
+        """Cache key of a sprite."""
+        fields = (SPRITE_CACHE_VERSION, text, font, font_signature, fontsize, color, stroke_color, stroke_width)
+        return hashlib.sha1(repr(fields).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.npz')
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                return TextSprite(data['rgb'], data['alpha'].astype(np.float32) / 255)
+        except (OSError, ValueError, KeyError) as e:
+            log.warning(f"Ignoring unreadable sprite cache entry {path}: {e}")
+            return None
+
+    @staticmethod
+    def _alpha8(sprite):
+        """Alpha of a sprite as stored on disk (8 bits)."""
+        return np.round(sprite.alpha[:, :, 0] * 255).astype(np.uint8)
+
+    @staticmethod
+    def _quantized(sprite):
+        """The sprite exactly as it reads back from disk."""
+        return TextSprite(sprite.rgb, SpriteCache._alpha8(sprite).astype(np.float32) / 255)
+
+    def _save(self, key, sprite):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，避免其他进程读到写了一半的文件
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, rgb=sprite.rgb, alpha=SpriteCache._alpha8(sprite))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            log.warning(f"Could not write sprite cache entry {path}: {e}")
+
+    def get(self, key, render):
+        """Get a sprite by key, calling render() to create it on a miss."""
+        with self._lock:
+            sprite = self._sprites.get(key)
+            if sprite is not None:
+                self._sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+
+        sprite = self._load(key)
+        if sprite is not None:
+            self.disk_hits += 1
+        else:
+            # 内存中与磁盘上保存同样量化到 8 位的 alpha，结果与命中哪一级无关
+            sprite = self._quantized(render())
+            self.misses += 1
+            self._save(key, sprite)
+
+        with self._lock:
+            self._sprites[key] = sprite
+            if len(self._sprites) > self.max_items:
+                self._sprites.popitem(last=False)
+        return sprite
+
+    def clear(self):
+        """Drop the sprites kept in memory."""
+        with self._lock:
+            self._sprites.clear()
+
+
+# 进程内共享的精灵缓存；REELRUSH_SPRITE_CACHE 指定磁盘缓存目录，设为空字符串则只用内存
+sprite_cache = SpriteCache(os.environ.get(
+    'REELRUSH_SPRITE_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'reelrush', 'sprites')
+) or None)
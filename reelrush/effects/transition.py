@@ -1,40 +1,194 @@
-from moviepy import VideoFileClip, concatenate_videoclips
-from moviepy.video.fx.FadeOut import FadeOut
-from moviepy.video.fx.FadeIn import FadeIn
+from bisect import bisect_right
+from moviepy import VideoClip, CompositeAudioClip
+from moviepy.audio.fx import AudioFadeIn, AudioFadeOut
+import numpy as np
+from ..buffers import FrameRing
+from .flash_cut import FlashCut
 
 class TransitionEffect:
+    """Transitions between consecutive clips.
+
+    Both clips are only decoded during the overlap window; everywhere else
+    the output is a pass-through of a single clip.
+    """
+
+    TRANSITIONS = ('crossfade', 'slide', 'wipe', 'flash')
+
+    # 转场进度随时间变化
+    TIME_INVARIANT = False
+
+    @staticmethod
+    def render(frame1, frame2, progress, kind='crossfade', direction='left', out=None, temp=None):
+        """Blend one frame of a transition.
+
+        Args:
+            frame1: Frame of the outgoing clip
+            frame2: Frame of the incoming clip
+            progress: Transition progress (0 to 1)
+            kind: 'crossfade', 'slide', 'wipe' or 'flash'
+            direction: Direction of slide/wipe ('left', 'right', 'up', 'down')
+            out: Optional preallocated output buffer
+            temp: Optional pair of uint16 buffers shaped like the frames, used by crossfade
+        """
+        if out is None:
+            out = np.empty_like(frame1)
+        h, w = frame1.shape[:2]
+
+        if kind == 'crossfade':
+            # 8 位定点混合：(f1 * (256 - k) + f2 * k) >> 8
+            k = int(round(progress * 256))
+            if temp is None:
+                temp = (np.empty(frame1.shape, np.uint16), np.empty(frame1.shape, np.uint16))
+            acc, other = temp
+            np.multiply(frame1, 256 - k, out=acc, dtype=np.uint16)
+            np.multiply(frame2, k, out=other, dtype=np.uint16)
+            np.add(acc, other, out=acc)
+            np.right_shift(acc, 8, out=acc)
+            np.copyto(out, acc, casting='unsafe')
+        elif kind in ('slide', 'wipe'):
+            horizontal = direction in ('left', 'right')
+            size = w if horizontal else h
+            offset = min(max(int(size * progress), 0), size)
+            # 把画面统一转换成"从左往右"的情况处理
+            if direction == 'right':
+                frame1, frame2, out_view = frame1[:, ::-1], frame2[:, ::-1], out[:, ::-1]
+            elif direction == 'down':
+                frame1, frame2, out_view = frame1[::-1], frame2[::-1], out[::-1]
+            else:
+                out_view = out
+            if not horizontal:
+                frame1, frame2, out_view = frame1.swapaxes(0, 1), frame2.swapaxes(0, 1), out_view.swapaxes(0, 1)
+            if kind == 'slide':
+                # 新画面把旧画面推出去
+                out_view[:, :size - offset] = frame1[:, offset:]
+                out_view[:, size - offset:] = frame2[:, :offset]
+            else:
+                # 旧画面不动，新画面从一侧逐渐露出
+                out_view[:, :size - offset] = frame1[:, :size - offset]
+                out_view[:, size - offset:] = frame2[:, size - offset:]
+        elif kind == 'flash':
+            # 前半段旧画面变白，后半段新画面从白色中出现
+            alpha = 1 - abs(2 * progress - 1)
+            FlashCut.render(frame1 if progress < 0.5 else frame2, alpha, out)
+        else:
+            raise ValueError(f"Unknown transition: {kind}. Available transitions: {list(TransitionEffect.TRANSITIONS)}")
+        return out
+
+    @staticmethod
+    def concatenate(clips, kind='crossfade', duration=0.5, direction='left'):
+        """Join clips back to back with a transition between each pair.
+
+        Args:
+            clips: List of video clips of the same size
+            kind: 'crossfade', 'slide', 'wipe' or 'flash'
+            duration: Duration of each transition (the clips overlap by this much)
+            direction: Direction of slide/wipe ('left', 'right', 'up', 'down')
+        """
+        if kind not in TransitionEffect.TRANSITIONS:
+            raise ValueError(f"Unknown transition: {kind}. Available transitions: {list(TransitionEffect.TRANSITIONS)}")
+        if not clips:
+            raise ValueError("No clips to concatenate")
+        if len({tuple(clip.size) for clip in clips}) != 1:
+            raise ValueError("All clips must have the same size")
+        if len(clips) > 1 and duration > min(clip.duration for clip in clips):
+            raise ValueError(f"Transition duration {duration} is longer than a clip")
+
+        # 每个片段在输出时间轴上的起点，相邻片段重叠 duration 秒
+        starts = [0.0]
+        for clip in clips[:-1]:
+            starts.append(starts[-1] + clip.duration - duration)
+        total = starts[-1] + clips[-1].duration
+        ring = FrameRing()
+        temp_ring = FrameRing(size=2)
+
+        def clip_index(t):
+            i = max(bisect_right(starts, t) - 1, 0)
+            # 落在上一个片段的尾部时属于重叠区间，返回较早的片段
+            if i > 0 and t < starts[i - 1] + clips[i - 1].duration:
+                i -= 1
+            return i
+
+        def frame_function(t):
+            i = clip_index(t)
+            if i + 1 >= len(clips) or t < starts[i + 1]:
+                return clips[i].get_frame(t - starts[i])
+
+            frame1 = clips[i].get_frame(t - starts[i])
+            frame2 = clips[i + 1].get_frame(t - starts[i + 1])
+            progress = (t - starts[i + 1]) / duration
+            temp = None
+            if kind == 'crossfade':
+                temp = (temp_ring.next(frame1.shape, np.uint16), temp_ring.next(frame1.shape, np.uint16))
+            return TransitionEffect.render(frame1, frame2, progress, kind, direction,
+                                           ring.next(frame1.shape, frame1.dtype), temp)
+
+        result = VideoClip(frame_function, duration=total)
+        result.fps = max(clip.fps or 0 for clip in clips) or None
+
+        # 重叠区间内声音交叉淡入淡出
+        audio = []
+        for i, (clip, start) in enumerate(zip(clips, starts)):
+            if clip.audio is None:
+                continue
+            effects = []
+            if i > 0:
+                effects.append(AudioFadeIn(duration))
+            if i < len(clips) - 1:
+                effects.append(AudioFadeOut(duration))
+            audio.append(clip.audio.with_effects(effects).with_start(start))
+        if audio:
+            result.audio = CompositeAudioClip(audio).with_duration(total)
+
+        # 各片段都能映射到源时间时（例如来自 SharedSource），拼接结果也能
+        if all(hasattr(clip, 'source_time') for clip in clips):
+            def source_time(t):
+                i = clip_index(t)
+                return clips[i].source_time(t - starts[i])
+            result.source_time = source_time
+        return result
+
     @staticmethod
     def fade(clip1, clip2, duration=1.0):
         """Create a fade transition between two clips.
-        
+
         Args:
             clip1: First video clip
             clip2: Second video clip
             duration: Duration of the fade effect
         """
-        clip1 = clip1.FadeOut(duration)
-        clip2 = clip2.FadeIn(duration)
-        return concatenate_videoclips([clip1, clip2])
-    
+        return TransitionEffect.concatenate([clip1, clip2], 'crossfade', duration)
+
     @staticmethod
     def slide(clip1, clip2, direction='left', duration=1.0):
         """Create a slide transition between clips.
-        
+
         Args:
             clip1: First video clip
             clip2: Second video clip
             direction: Direction of slide ('left', 'right', 'up', 'down')
             duration: Duration of the slide effect
         """
-        w, h = clip1.size
-        
-        def make_frame(t):
-            progress = t / duration
-            if direction in ['left', 'right']:
-                offset = int(w * progress) if direction == 'left' else int(w * (1 - progress))
-                return clip2.get_frame(t)[:, offset:] if direction == 'left' else clip1.get_frame(t)[:, :offset]
-            else:
-                offset = int(h * progress) if direction == 'up' else int(h * (1 - progress))
-                return clip2.get_frame(t)[offset:, :] if direction == 'up' else clip1.get_frame(t)[:offset, :]
-        
-        return VideoFileClip(make_frame, duration=duration) 
\ No newline at end of file
+        return TransitionEffect.concatenate([clip1, clip2], 'slide', duration, direction)
+
+    @staticmethod
+    def wipe(clip1, clip2, direction='left', duration=1.0):
+        """Create a wipe transition between clips.
+
+        Args:
+            clip1: First video clip
+            clip2: Second video clip
+            direction: Direction the new clip is revealed from ('left', 'right', 'up', 'down')
+            duration: Duration of the wipe effect
+        """
+        return TransitionEffect.concatenate([clip1, clip2], 'wipe', duration, direction)
+
+    @staticmethod
+    def flash(clip1, clip2, duration=0.4):
+        """Create a flash-to-white transition between clips.
+
+        Args:
+            clip1: First video clip
+            clip2: Second video clip
+            duration: Duration of the flash
+        """
+        return TransitionEffect.concatenate([clip1, clip2], 'flash', duration)
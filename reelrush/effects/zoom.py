@@ -1,29 +1,80 @@
 import cv2
+import numpy as np
+from .base import Effect, register_effect
+from ..curves import Curve
+from ..tiling import tile_executor
+
+@register_effect
+class DynamicZoom(Effect):
+    name = 'zoom'
+
+    # 缩放倍数随时间变化
+    TIME_INVARIANT = False
+    GEOMETRIC = True
 
-class DynamicZoom:
     @staticmethod
-    def apply(clip, start_time, duration, zoom_factor=1.5):
+    def render(frame, zoom, out=None):
+        """Zoom a single frame around its center.
+        
+        Args:
+            frame: RGB frame
+            zoom: Zoom level (1 means unchanged)
+            out: Optional preallocated output buffer (must not be frame)
+        """
+        h, w = frame.shape[:2]
+        center_x, center_y = w // 2, h // 2
+        
+        M = cv2.getRotationMatrix2D((center_x, center_y), 0, zoom)
+        if not tile_executor.should_tile(frame):
+            return cv2.warpAffine(frame, M, (w, h), dst=out)
+
+        # 每个线程直接计算输出的一条横带：平移矩阵使横带的第一行对应输出的第 y0 行
+        if out is None:
+            out = np.empty_like(frame)
+
+        def warp_band(y0, y1):
+            band = M.copy()
+            band[1, 2] -= y0
+            cv2.warpAffine(frame, band, (w, y1 - y0), dst=out[y0:y1])
+
+        tile_executor.map_bands(warp_band, h)
+        return out
+
+    def __init__(self, start_time, duration, zoom_factor=1.5, easing='linear'):
+        """Create a dynamic zoom effect.
+
+        Args:
+            start_time: Start time of zoom
+            duration: Duration of zoom effect
+            zoom_factor: Maximum zoom level, or a Curve giving the zoom level over the effect
+            easing: Easing of the zoom ramp when zoom_factor is a number
+        """
+        super().__init__(start_time, duration)
+        self.zoom_factor = zoom_factor
+        self.easing = easing
+        self._zoom_table = None
+
+    def prepare(self, fps):
+        zoom_factor = self.zoom_factor
+        if not isinstance(zoom_factor, Curve):
+            zoom_factor = Curve.ramp(1, zoom_factor, self.easing)
+        self._zoom_table = zoom_factor.table(self.start_time, self.duration, fps)
+
+    def params(self):
+        return {'zoom_factor': self.zoom_factor, 'easing': self.easing}
+
+    def render_frame(self, frame, t, out=None):
+        return DynamicZoom.render(frame, self._zoom_table(t), out)
+
+    @staticmethod
+    def apply(clip, start_time, duration, zoom_factor=1.5, easing='linear'):
         """Add dynamic zoom effect.
         
         Args:
             clip: Input video clip
             start_time: Start time of zoom
             duration: Duration of zoom effect
-            zoom_factor: Maximum zoom level
+            zoom_factor: Maximum zoom level, or a Curve giving the zoom level over the effect
+            easing: Easing of the zoom ramp when zoom_factor is a number
         """
-        def zoom_transform(get_frame, t):
-            # 获取当前帧
-            frame = get_frame(t)
-            
-            if start_time <= t <= start_time + duration:
-                progress = (t - start_time) / duration
-                current_zoom = 1 + (zoom_factor - 1) * progress
-                
-                h, w = frame.shape[:2]
-                center_x, center_y = w // 2, h // 2
-                
-                M = cv2.getRotationMatrix2D((center_x, center_y), 0, current_zoom)
-                return cv2.warpAffine(frame, M, (w, h))
-            return frame
-        
-        return clip.transform(zoom_transform) 
\ No newline at end of file
+        return DynamicZoom(start_time, duration, zoom_factor, easing).transform(clip)
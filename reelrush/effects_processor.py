@@ -1,8 +1,15 @@
 import logging
-from dataclasses import dataclass
+import os
+import cv2
+from dataclasses import dataclass, asdict, replace
 from typing import List, Union, Optional, Tuple
-from moviepy import VideoFileClip
+from moviepy import VideoFileClip, VideoClip, concatenate_videoclips
 from .editor import VideoEditor
+from .source import SharedSource
+from .curves import Curve, EASINGS
+from .effects.glitch import MODES as GLITCH_MODES
+from .effects.transition import TransitionEffect
+from .effects.scoreboard import Scoreboard
 
 log = logging.getLogger()
 
@@ -30,6 +37,8 @@ class TextEffectParams(BaseEffectParams):
     stroke_width: int = 2                        # 描边宽度（像素）
     font_style: str = 'default'                  # 字体样式：'default','bold','elegant','modern','impact','comic'
     blur_background: Optional[str] = None        # 背景模糊效果：None,'box_blur','gaussian_blur','glass','motion_blur'
+    blur_padding: int = 20                       # 模糊区域超出文字的边距（像素）
+    blur_feather: int = 0                        # 模糊区域边缘的羽化宽度（像素），0表示硬边
 
     def validate(self) -> bool:
         if not super().validate():
@@ -46,6 +55,9 @@ class TextEffectParams(BaseEffectParams):
         if self.animation not in ['fade', 'slide', 'scale']:
             log.error(f"Invalid animation type: {self.animation}")
             return False
+        if self.blur_padding < 0 or self.blur_feather < 0:
+            log.error(f"Invalid blur padding/feather: {self.blur_padding}, {self.blur_feather}")
+            return False
         return True
 
 # 慢动作特效参数
@@ -79,14 +91,21 @@ class FreezeFrameParams(BaseEffectParams):
             return False
         return True
 
+def _param_range(value: Union[float, Curve]) -> Tuple[float, float]:
+    """数值参数或关键帧曲线的取值范围"""
+    if isinstance(value, Curve):
+        return value.value_range()
+    return value, value
+
 @dataclass
 class CameraShakeParams(BaseEffectParams):
-    intensity: float = 0.5  # 抖动强度(0-1)，值越大抖动越剧烈
+    intensity: Union[float, Curve] = 0.5  # 抖动强度(0-1)，值越大抖动越剧烈；也可以是随时间变化的 Curve
 
     def validate(self) -> bool:
         if not super().validate():
             return False
-        if not 0 <= self.intensity <= 1:
+        low, high = _param_range(self.intensity)
+        if not (0 <= low and high <= 1):
             log.error(f"Invalid shake intensity: {self.intensity}")
             return False
         return True
@@ -94,8 +113,19 @@ class CameraShakeParams(BaseEffectParams):
 @dataclass
 class GlitchParams(BaseEffectParams):
     """故障特效参数"""
+    modes: Optional[List[str]] = None  # 叠加的故障模式：'shift','rgb_split','blocks','scanlines','quantize'，None只有切片平移
+    intensity: float = 1.0             # 除平移外各模式的强度和出现频率(0-1)
+
     def validate(self) -> bool:
-        return super().validate()
+        if not super().validate():
+            return False
+        if self.modes is not None and (not self.modes or not set(self.modes) <= set(GLITCH_MODES)):
+            log.error(f"Invalid glitch modes: {self.modes}")
+            return False
+        if not 0 <= self.intensity <= 1:
+            log.error(f"Invalid glitch intensity: {self.intensity}")
+            return False
+        return True
 
 @dataclass
 class ParticleExplosionParams(BaseEffectParams):
@@ -120,21 +150,25 @@ class ParticleExplosionParams(BaseEffectParams):
 
 @dataclass
 class ZoomParams(BaseEffectParams):
-    zoom_factor: float = 1.5  # 缩放倍数，大于1表示放大，小于1表示缩小
+    zoom_factor: Union[float, Curve] = 1.5  # 缩放倍数，大于1表示放大，小于1表示缩小；也可以是缩放随时间变化的 Curve
+    easing: str = 'linear'                   # zoom_factor 为数值时缩放过程的缓动方式
 
     def validate(self) -> bool:
         if not super().validate():
             return False
-        if self.zoom_factor <= 0:
+        if _param_range(self.zoom_factor)[0] <= 0:
             log.error(f"Invalid zoom factor: {self.zoom_factor}")
             return False
+        if self.easing not in EASINGS:
+            log.error(f"Invalid easing: {self.easing}")
+            return False
         return True
 
 @dataclass
 class FlashCutsParams:
     timestamps: List[float]           # 闪光切换的时间点列表（秒）
     cut_duration: float = 0.4         # 每次切换的持续时间（秒）
-    flash_intensity: float = 0.7      # 闪光强度(0-1)，值越大越亮
+    flash_intensity: Union[float, Curve] = 0.7  # 闪光强度(0-1)，值越大越亮；也可以是每次切换内的 Curve
 
     def validate(self) -> bool:
         if not self.timestamps:
@@ -146,7 +180,8 @@ class FlashCutsParams:
         if self.cut_duration <= 0:
             log.error(f"Invalid cut duration: {self.cut_duration}")
             return False
-        if not 0 <= self.flash_intensity <= 1:
+        low, high = _param_range(self.flash_intensity)
+        if not (0 <= low and high <= 1):
             log.error(f"Invalid flash intensity: {self.flash_intensity}")
             return False
         return True
@@ -166,16 +201,92 @@ class SlideTransitionParams(BaseEffectParams):
 @dataclass
 class FilterParams(BaseEffectParams):
     filter_name: str  # 滤镜类型：'grayscale'(灰度),'sepia'(复古),'warm'(暖色),'cool'(冷色),'vintage'(老电影),
-                     # 'gaussian_blur'(高斯模糊),'box_blur'(方框模糊),'glass'(毛玻璃),'motion_blur'(运动模糊)
+                     # 'gaussian_blur'(高斯模糊),'box_blur'(方框模糊),'glass'(毛玻璃),'motion_blur'(运动模糊),
+                     # 'lut'(使用 .cube 3D LUT 调色)
+    lut_path: Optional[str] = None  # 'lut' 滤镜使用的 .cube 文件路径
 
     def validate(self) -> bool:
         if not super().validate():
             return False
         valid_filters = ['grayscale', 'sepia', 'warm', 'cool', 'vintage', 
-                        'gaussian_blur', 'box_blur', 'glass', 'motion_blur']
+                        'gaussian_blur', 'box_blur', 'glass', 'motion_blur', 'lut']
         if self.filter_name not in valid_filters:
             log.error(f"Invalid filter name. Must be one of {valid_filters}")
             return False
+        if self.filter_name == 'lut' and not (self.lut_path and os.path.isfile(self.lut_path)):
+            log.error(f"LUT file not found: {self.lut_path}")
+            return False
+        return True
+
+@dataclass
+class ScoreboardParams:
+    data_path: str                                # 比赛数据文件（.csv 或 .json），事件时间为原视频文件的时间（不受 source_ranges 影响）
+    start_time: float = 0                         # 开始显示的时间（秒）
+    duration: Optional[float] = None              # 显示时长（秒），None表示直到视频结束
+    lines: Optional[List[str]] = None             # 文字行的格式串，如 "{home} {home_score}"，None使用默认比分和时钟
+    bars: Optional[List[Tuple[str, str, float]]] = None  # 数据条：(标签格式串, 字段名, 最大值)
+    position: Union[str, Tuple[int, int]] = 'top_left'  # 'top_left','top_right','bottom_left','bottom_right'或(x,y)
+    fontsize: int = 36                            # 字体大小（像素）
+    color: str = 'white'                          # 字体颜色
+    font_style: str = 'bold'                      # 字体样式
+    background_opacity: float = 0.6               # 面板背景不透明度
+
+    def validate(self) -> bool:
+        if not os.path.isfile(self.data_path):
+            log.error(f"Scoreboard data file not found: {self.data_path}")
+            return False
+        if self.start_time < 0 or (self.duration is not None and self.duration <= 0):
+            log.error(f"Invalid timing parameters: start_time={self.start_time}, duration={self.duration}")
+            return False
+        if isinstance(self.position, str) and self.position not in ['top_left', 'top_right', 'bottom_left', 'bottom_right']:
+            log.error(f"Invalid position: {self.position}")
+            return False
+        if self.fontsize <= 0 or not 0 <= self.background_opacity <= 1:
+            log.error(f"Invalid font size/background opacity: {self.fontsize}, {self.background_opacity}")
+            return False
+        return True
+
+@dataclass
+class MusicParams:
+    path: str                   # 背景音乐文件
+    start_time: float = 0       # 音乐开始的时间（秒，源视频时间）
+    volume: float = 0.5         # 音乐音量(0-1)
+    loop: bool = True           # 循环播放直到视频结束
+    fade: float = 1.0           # 淡入淡出时长（秒）
+    duck_db: float = -12.0      # 原声响亮时音乐降低的分贝数，0表示不闪避
+    threshold_db: float = -35.0  # 触发闪避的原声 RMS 电平（dB）
+
+    def validate(self) -> bool:
+        if not os.path.isfile(self.path):
+            log.error(f"Music file not found: {self.path}")
+            return False
+        if self.start_time < 0 or self.fade < 0:
+            log.error(f"Invalid music timing: start_time={self.start_time}, fade={self.fade}")
+            return False
+        if not 0 <= self.volume <= 1:
+            log.error(f"Invalid music volume: {self.volume}")
+            return False
+        if self.duck_db > 0:
+            log.error(f"Invalid ducking amount: {self.duck_db}")
+            return False
+        return True
+
+@dataclass
+class TransitionParams:
+    kind: str = 'crossfade'   # 转场类型：'crossfade'(交叉淡化),'slide'(推移),'wipe'(擦除),'flash'(闪白)
+    duration: float = 0.5     # 转场时长（秒），相邻两段在此期间重叠
+    direction: str = 'left'   # slide/wipe 的方向：'left','right','up','down'
+
+    def validate(self) -> bool:
+        if self.kind not in ['crossfade', 'slide', 'wipe', 'flash']:
+            log.error(f"Invalid transition type: {self.kind}")
+            return False
+        if self.duration <= 0:
+            log.error(f"Invalid transition duration: {self.duration}")
+            return False
+        if self.direction not in ['left', 'right', 'up', 'down']:
+            log.error(f"Invalid transition direction: {self.direction}")
+            return False
         return True
 
 # 视频处理参数结构体
@@ -193,31 +304,138 @@ class VideoProcessingParams:
     flash_cuts: Optional[FlashCutsParams] = None  # 闪光切换特效
     slide_transitions: List[SlideTransitionParams] = None  # 滑动转场特效列表
     filter_effects: List[FilterParams] = None     # 滤镜特效列表
+    source_ranges: Optional[List[Tuple[float, float]]] = None  # 只使用源视频的这些时间段（按顺序拼接），None表示整段视频
+    play_transition: Optional[TransitionParams] = None  # source_ranges 各段之间的转场，None表示直接硬切
+    scoreboard: Optional[ScoreboardParams] = None  # 比分牌和数据条叠加层
+    music: Optional[MusicParams] = None           # 背景音乐，原声响亮时自动压低
 
     def validate(self) -> bool:
         if not self.video_path and not self.video_file_clip:
             log.error("Either video_path or video_file_clip must be provided")
             return False
+        if self.source_ranges is not None:
+            if not self.source_ranges:
+                log.error("Source ranges cannot be empty")
+                return False
+            if any(start < 0 or end <= start for start, end in self.source_ranges):
+                log.error(f"Invalid source ranges: {self.source_ranges}")
+                return False
+        if self.play_transition is not None:
+            if not self.play_transition.validate():
+                return False
+            if self.source_ranges and any(end - start < self.play_transition.duration
+                                          for start, end in self.source_ranges):
+                log.error(f"Transition duration {self.play_transition.duration} is longer than a source range")
+                return False
+        # 慢动作区间不能互相重叠（冻结帧可以落在慢动作区间内）
+        spans = sorted((effect.start_time, effect.start_time + effect.duration)
+                       for effect in self.slow_motion_effects or [])
+        for (start, end), (next_start, _) in zip(spans, spans[1:]):
+            if next_start < end:
+                log.error(f"Slow motion {start}-{end} overlaps the slow motion starting at {next_start}")
+                return False
         return True
 
-def process_video_effects(params: VideoProcessingParams, output_path: str, fps: int = 30) -> None:
+def process_video_effects(params: VideoProcessingParams, output_path: str, fps: int = 30,
+                          checkpoint_dir: Optional[str] = None, chunk_duration: float = 10.0) -> None:
     """处理视频特效
 
     Args:
         params: 视频处理参数
         output_path: 输出文件路径
         fps: 输出视频帧率
+        checkpoint_dir: 分段渲染的检查点目录，中断后用相同参数重新调用会从最后完成的分段继续
+        chunk_duration: 每个分段的时长（秒）
     """
     # 验证参数
     if not params.validate():
         log.error("Invalid video processing parameters")
         return
 
+    editor = build_editor(params)
+
+    # 保存结果
+    editor.save(output_path, fps=fps, checkpoint_dir=checkpoint_dir, chunk_duration=chunk_duration)
+
+def source_range_clip(params: VideoProcessingParams, source: Optional[SharedSource] = None) -> VideoClip:
+    """Cut params.source_ranges out of the input and join them in order.
+
+    Args:
+        params: 视频处理参数
+        source: 已打开的共享解码器，为None时按params.video_path打开
+
+    Returns:
+        Clip of the selected ranges, joined with params.play_transition if set
+    """
+    ranges = params.source_ranges or [(0, None)]
+    transition = params.play_transition
+    if params.video_path:
+        source = source or SharedSource(params.video_path)
+        if transition:
+            pieces = [source.clip_for([(start, end if end is not None else source.duration)]) for start, end in ranges]
+        else:
+            pieces = [source.clip_for(params.source_ranges)]
+    else:
+        clip = params.video_file_clip
+        pieces = [clip.subclipped(start, end) for start, end in ranges]
+
+    if transition:
+        return TransitionEffect.concatenate(pieces, transition.kind, transition.duration, transition.direction)
+    return pieces[0] if len(pieces) == 1 else concatenate_videoclips(pieces)
+
+def scale_params(params: VideoProcessingParams, scale: float) -> VideoProcessingParams:
+    """Copy of params with the sizes given in pixels (fonts, outlines, padding, positions) scaled."""
+    def px(value, minimum=0):
+        return max(minimum, int(round(value * scale)))
+
+    def position(value):
+        return value if isinstance(value, str) else tuple(px(v) for v in value)
+
+    texts = [replace(e, fontsize=px(e.fontsize, 1), stroke_width=px(e.stroke_width), position=position(e.position),
+                     blur_padding=px(e.blur_padding), blur_feather=px(e.blur_feather))
+             for e in params.text_effects or []] or params.text_effects
+    scoreboard = params.scoreboard
+    if scoreboard:
+        scoreboard = replace(scoreboard, fontsize=px(scoreboard.fontsize, 1), position=position(scoreboard.position))
+    return replace(params, text_effects=texts, scoreboard=scoreboard)
+
+def build_editor(params: VideoProcessingParams, source_clip: Optional[VideoClip] = None,
+                 size: Optional[Tuple[int, int]] = None) -> VideoEditor:
+    """Create a VideoEditor and apply every effect described by params.
+
+    Args:
+        params: 视频处理参数
+        source_clip: 已经准备好的输入片段（例如来自共享解码器），为None时按params打开
+        size: Output (width, height); the input is resized before any effect is added,
+            so effects render at this size, and pixel sized parameters are scaled with it.
+            Render under a QualitySettings with the same resolution_scale so effects with
+            built-in pixel amplitudes (shake, glitch slices, particles) scale too.
+
+    Returns:
+        VideoEditor with all effects applied, ready to save
+    """
     # 初始化编辑器
-    editor = VideoEditor(
-        video_path=params.video_path,
-        vide_file_clip=params.video_file_clip
-    )
+    if source_clip is None and (params.source_ranges or params.play_transition or size):
+        source_clip = source_range_clip(params)
+    if size is not None and tuple(size) != tuple(source_clip.size):
+        # 先缩小输入再叠加特效，特效的计算量随分辨率一起下降
+        params = scale_params(params, size[1] / source_clip.size[1])
+        source_clip = source_clip.image_transform(
+            lambda frame: cv2.resize(frame, tuple(size), interpolation=cv2.INTER_AREA))
+    if source_clip is not None:
+        editor = VideoEditor(video_path=None, vide_file_clip=source_clip)
+    else:
+        editor = VideoEditor(
+            video_path=params.video_path,
+            vide_file_clip=params.video_file_clip
+        )
+    editor.source = {
+        'video_path': params.video_path,
+        'source_ranges': params.source_ranges,
+        'play_transition': asdict(params.play_transition) if params.play_transition else None
+    }
+    if size is not None:
+        editor.source['size'] = list(size)
 
     # 收集所有时序特效
     timed_effects = []
@@ -243,8 +461,8 @@ def process_video_effects(params: VideoProcessingParams, output_path: str, fps:
                 else:
                     log.warning(f"Skipping invalid {effect_type} effect")
 
-    # 按开始时间排序
-    timed_effects.sort(key=lambda x: x[1].start_time)
+    # 先应用改变时间轴的特效（慢动作、冻结帧），其余特效再按开始时间排序
+    timed_effects.sort(key=lambda x: (x[0] not in ('slow_motion', 'freeze'), x[1].start_time))
 
     # 按顺序应用特效
     for effect_type, effect in timed_effects:
@@ -260,7 +478,9 @@ def process_video_effects(params: VideoProcessingParams, output_path: str, fps:
                 stroke_color=effect.stroke_color,
                 stroke_width=effect.stroke_width,
                 font_style=effect.font_style,
-                blur_background=effect.blur_background
+                blur_background=effect.blur_background,
+                blur_padding=effect.blur_padding,
+                blur_feather=effect.blur_feather
             )
         elif effect_type == 'slow_motion':
             editor.add_slow_motion(
@@ -284,7 +504,9 @@ def process_video_effects(params: VideoProcessingParams, output_path: str, fps:
         elif effect_type == 'glitch':
             editor.add_glitch(
                 start_time=effect.start_time,
-                duration=effect.duration
+                duration=effect.duration,
+                modes=effect.modes or ('shift',),
+                intensity=effect.intensity
             )
         elif effect_type == 'particle':
             editor.add_particle_explosion(
@@ -297,7 +519,8 @@ def process_video_effects(params: VideoProcessingParams, output_path: str, fps:
             editor.add_zoom(
                 start_time=effect.start_time,
                 duration=effect.duration,
-                zoom_factor=effect.zoom_factor
+                zoom_factor=effect.zoom_factor,
+                easing=effect.easing
             )
         elif effect_type == 'slide':
             editor.add_slide_transition(
@@ -309,7 +532,8 @@ def process_video_effects(params: VideoProcessingParams, output_path: str, fps:
             editor.add_filter(
                 filter_name=effect.filter_name,
                 start_time=effect.start_time,
-                duration=effect.duration
+                duration=effect.duration,
+                lut_path=effect.lut_path
             )
 
     # 最后处理 flash_cuts
@@ -323,5 +547,38 @@ def process_video_effects(params: VideoProcessingParams, output_path: str, fps:
         else:
             log.warning("Skipping invalid flash_cuts effect")
 
-    # 保存结果
-    editor.save(output_path, fps=fps) 
\ No newline at end of file
+    # 比分牌叠加在所有特效之上
+    if params.scoreboard:
+        if params.scoreboard.validate():
+            scoreboard = params.scoreboard
+            editor.add_scoreboard(
+                data=scoreboard.data_path,
+                start_time=scoreboard.start_time,
+                duration=scoreboard.duration,
+                lines=scoreboard.lines or Scoreboard.DEFAULT_LINES,
+                bars=scoreboard.bars or (),
+                position=scoreboard.position,
+                fontsize=scoreboard.fontsize,
+                color=scoreboard.color,
+                font_style=scoreboard.font_style,
+                background_opacity=scoreboard.background_opacity
+            )
+        else:
+            log.warning("Skipping invalid scoreboard")
+
+    if params.music:
+        if params.music.validate():
+            music = params.music
+            editor.add_music(
+                music.path,
+                start_time=music.start_time,
+                volume=music.volume,
+                loop=music.loop,
+                fade=music.fade,
+                duck_db=music.duck_db,
+                threshold_db=music.threshold_db
+            )
+        else:
+            log.warning("Skipping invalid music")
+
+    return editor
@@ -0,0 +1,719 @@
+"""Pixel equivalence of the optimized effects against frozen reference implementations.
+
+Each case renders the same synthetic clip through a straightforward
+reference version of an effect and through the current implementation,
+and compares the frames by PSNR and SSIM. The cases cover the filters
+(including a LUT grade), glitch (slice shift and the other corruption
+modes), camera shake, zoom, particles, flash, flash cuts, slide, the play
+transitions and text (fade animation, with and without a blurred
+background box). The scale and slide text animations, the scoreboard and
+the audio have no reference here; their unit tests cover them.
+"""
+import argparse
+import atexit
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+import cv2
+import numpy as np
+from moviepy import TextClip, VideoClip
+from .editor import VideoEditor
+from .effects import (
+    CameraShake, DynamicText, DynamicZoom, FilterEffect, FlashEffect, GlitchEffect, TransitionEffect
+)
+from .effects.flash_cut import FlashCut
+from .effects.glitch import MODES as GLITCH_MODES
+from .effects.slide import SlideTransition
+from .seeding import effect_seed, frame_rng
+
+# 默认阈值：优化后的实现与参考实现逐帧比较的最低 PSNR（dB）和 SSIM
+MIN_PSNR = 40.0
+MIN_SSIM = 0.99
+
+
+def synthetic_clip(size=(320, 240), duration=1.0, fps=30, seed=0):
+    """Deterministic test clip with gradients, edges, fine texture and motion.
+
+    Args:
+        size (tuple): (width, height) of the frames
+        duration (float): Clip duration in seconds
+        fps (int): Frame rate
+        seed (int): Seed of the texture
+    """
+    width, height = size
+    rng = np.random.default_rng(seed)
+    # 纹理比画面大一圈，每帧平移一段，模拟镜头移动
+    texture = rng.integers(0, 64, (height + 64, width + 64, 3), dtype=np.uint8)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+
+    def make_frame(t):
+        phase = t / duration if duration else 0.0
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[:, :, 0] = (x * 0.6 + y * 0.2 + 60 * phase).clip(0, 255)
+        frame[:, :, 1] = (y * 0.7 + 40 * math.sin(2 * math.pi * phase)).clip(0, 255)
+        frame[:, :, 2] = (255 - x * 0.5 - y * 0.2).clip(0, 255)
+        offset = int(round(phase * 63))
+        cv2.add(frame, texture[offset:offset + height, offset:offset + width], dst=frame)
+        # 运动的实心图形提供锐利边缘
+        cx = int(width * (0.2 + 0.6 * phase))
+        cv2.circle(frame, (cx, height // 2), max(4, height // 6), (250, 240, 30), -1)
+        cv2.rectangle(frame, (width // 8, height // 8), (width // 8 + width // 5, height // 8 + height // 10),
+                      (20, 30, 200), -1)
+        cv2.line(frame, (0, height - 1 - int(phase * (height - 1))), (width - 1, int(phase * (height - 1))),
+                 (255, 255, 255), 2)
+        return frame
+
+    return VideoClip(make_frame, duration=duration).with_fps(fps)
+
+
+def psnr(reference, frame):
+    """Peak signal-to-noise ratio of frame against reference in dB (inf when identical)."""
+    mse = np.mean((reference.astype(np.float64) - frame.astype(np.float64)) ** 2)
+    if mse == 0:
+        return math.inf
+    return 10 * math.log10(255.0 ** 2 / mse)
+
+
+def ssim(reference, frame):
+    """Mean structural similarity of two RGB frames (11x11 Gaussian window, sigma 1.5)."""
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    a = reference.astype(np.float64)
+    b = frame.astype(np.float64)
+
+    def blur(image):
+        return cv2.GaussianBlur(image, (11, 11), 1.5)
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a ** 2
+    var_b = blur(b * b) - mu_b ** 2
+    cov = blur(a * b) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(ssim_map.mean())
+
+
+class ReferenceEffects:
+    """Frozen reference implementations of the effects.
+
+    These are the straightforward versions of the effects whose look was
+    approved, kept unchanged so optimized implementations can be compared
+    against them. Randomness is drawn from the same seeded generators as
+    the current implementations, so both sides see the same random values.
+    Do not optimize this class, and do not read constants from the current
+    implementations: a changed constant must show up as a drift.
+    """
+
+    # 粒子的重力加速度（像素/秒²）
+    GRAVITY = 500
+    # 故障各模式在强度为 1 时出现的概率
+    GLITCH_BURST = {'rgb_split': 0.6, 'blocks': 0.5, 'scanlines': 0.5, 'quantize': 0.3}
+
+    FILTERS = {
+        'grayscale': lambda frame: cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB),
+        'sepia': lambda frame: np.clip(cv2.transform(
+            frame,
+            np.array([
+                [0.393, 0.769, 0.189],
+                [0.349, 0.686, 0.168],
+                [0.272, 0.534, 0.131]
+            ])
+        ), 0, 255).astype(np.uint8),
+        'warm': lambda frame: cv2.addWeighted(
+            frame, 1.0, np.full_like(frame, fill_value=(30, 20, 10), dtype=np.uint8), 0.3, 0
+        ),
+        'cool': lambda frame: cv2.addWeighted(
+            frame, 1.0, np.full_like(frame, fill_value=(10, 20, 30), dtype=np.uint8), 0.3, 0
+        ),
+        'vintage': lambda frame: cv2.addWeighted(
+            cv2.cvtColor(cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY), cv2.COLOR_GRAY2RGB),
+            0.7,
+            cv2.addWeighted(frame, 0.6, np.full_like(frame, fill_value=(30, 20, 10), dtype=np.uint8), 0.3, 0),
+            0.3,
+            0
+        ),
+        'gaussian_blur': lambda frame: cv2.GaussianBlur(frame, (21, 21), 0),
+        'box_blur': lambda frame: cv2.blur(frame, (20, 20)),
+        'glass': lambda frame: ReferenceEffects._frosted_glass(frame),
+        'motion_blur': lambda frame: cv2.filter2D(frame, -1, ReferenceEffects._motion_blur_kernel())
+    }
+
+    @staticmethod
+    def _frosted_glass(frame, strength=10):
+        height, width = frame.shape[:2]
+        # 位移图每 16 行一块，每块用以 (种子, 块号) 为种子的生成器
+        seed = np.random.randint(2 ** 63)
+        blocks = [np.random.default_rng([seed, k]).integers(-strength, strength, (2, 16, width))
+                  for k in range((height + 15) // 16)]
+        dx, dy = np.concatenate(blocks, axis=1)[:, :height].astype(np.float32)
+        x, y = np.meshgrid(np.arange(width), np.arange(height))
+        map_x = (x + dx).astype(np.float32)
+        map_y = (y + dy).astype(np.float32)
+        distorted = cv2.remap(frame, map_x, map_y, cv2.INTER_LINEAR)
+        return cv2.GaussianBlur(distorted, (7, 7), 0)
+
+    @staticmethod
+    def _motion_blur_kernel(size=15):
+        kernel = np.zeros((size, size))
+        kernel[int((size-1)/2), :] = np.ones(size)
+        return kernel / size
+
+    @staticmethod
+    def filter(clip, filter_name, start_time, duration):
+        filter_func = ReferenceEffects.FILTERS[filter_name]
+
+        def filter_transform(get_frame, t):
+            frame = get_frame(t)
+            if start_time <= t <= start_time + duration:
+                return filter_func(frame)
+            return frame
+
+        return clip.transform(filter_transform)
+
+    @staticmethod
+    def glitch(clip, start_time, duration=0.5, seed=None):
+        fps = clip.fps or 30
+        seed = effect_seed('glitch', start_time, duration) if seed is None else seed
+
+        def glitch_transform(get_frame, t):
+            frame = get_frame(t)
+            if start_time <= t <= start_time + duration:
+                height, width = frame.shape[:2]
+                slice_h = int(height / 10)
+                shifts = frame_rng(seed, t, fps).integers(-50, 50, size=(10, 2))
+                glitched = frame.copy()
+                for i, (dx, dy) in enumerate(shifts):
+                    h_start = slice_h * i
+                    h_end = h_start + slice_h
+                    M = np.float32([[1, 0, dx], [0, 1, dy]])
+                    glitched[h_start:h_end, :] = cv2.warpAffine(frame[h_start:h_end, :], M, (width, slice_h))
+                return glitched
+            return frame
+
+        return clip.transform(glitch_transform)
+
+    @staticmethod
+    def shake(clip, start_time, duration, intensity=0.5, seed=None):
+        fps = clip.fps or 30
+        seed = effect_seed('camera_shake', start_time, duration) if seed is None else seed
+
+        def shake_transform(get_frame, t):
+            if t < start_time or t > start_time + duration:
+                return get_frame(t)
+            rng = frame_rng(seed, t, fps)
+            dx = intensity * rng.uniform(-30, 30)
+            dy = intensity * rng.uniform(-30, 30)
+            frame = get_frame(t)
+            h, w = frame.shape[:2]
+            M = np.float32([[1, 0, dx], [0, 1, dy]])
+            return cv2.warpAffine(frame, M, (w, h))
+
+        return clip.transform(shake_transform)
+
+    @staticmethod
+    def zoom(clip, start_time, duration, zoom_factor=1.5):
+        def zoom_transform(get_frame, t):
+            frame = get_frame(t)
+            if start_time <= t <= start_time + duration:
+                progress = (t - start_time) / duration
+                current_zoom = 1 + (zoom_factor - 1) * progress
+                h, w = frame.shape[:2]
+                M = cv2.getRotationMatrix2D((w // 2, h // 2), 0, current_zoom)
+                return cv2.warpAffine(frame, M, (w, h))
+            return frame
+
+        return clip.transform(zoom_transform)
+
+    @staticmethod
+    def particles(clip, start_time, duration=1.0, num_particles=100, seed=None):
+        """Particle explosion at the frame center, stepped frame by frame.
+
+        Needs the frames in order. Particles are created once, on the first
+        frame of the effect, with the seeded initial state of ParticleEffect.
+        """
+        seed = effect_seed('particle', start_time, duration, num_particles) if seed is None else seed
+        state = {'particles': None}
+        dt = 1 / clip.fps
+
+        def particle_transform(get_frame, t):
+            frame = get_frame(t)
+            if not start_time <= t <= start_time + duration:
+                return frame
+            height, width = frame.shape[:2]
+            if state['particles'] is None:
+                rng = np.random.default_rng(seed)
+                angle = rng.uniform(0, 2*np.pi, num_particles)
+                speed = rng.uniform(100, 300, num_particles)
+                life = rng.uniform(0.5, 1.0, num_particles)
+                state['particles'] = [
+                    {'pos': np.array((width // 2, height // 2), dtype=np.float64),
+                     'vel': np.array([s * np.cos(a), s * np.sin(a)], dtype=np.float64),
+                     'life': l}
+                    for a, s, l in zip(angle, speed, life)
+                ]
+            for p in state['particles']:
+                p['pos'] = p['pos'] + p['vel'] * dt
+                p['vel'][1] += ReferenceEffects.GRAVITY * dt
+                p['life'] -= dt
+            state['particles'] = [p for p in state['particles'] if p['life'] > 0]
+            frame = frame.copy()
+            for p in state['particles']:
+                pos = p['pos'].astype(np.int32)
+                cv2.circle(frame, (pos[0], pos[1]), 2, (255, 255, 255), -1)
+            return frame
+
+        return clip.transform(particle_transform)
+
+
+    @staticmethod
+    def _shift(image, dx, dy):
+        h, w = image.shape[:2]
+        M = np.float32([[1, 0, dx], [0, 1, dy]])
+        return cv2.warpAffine(image, M, (w, h))
+
+    @staticmethod
+    def glitch_modes(clip, start_time, duration, modes, intensity=1.0, seed=None):
+        """Glitch with the corruption modes applied one after another, in the order of glitch.MODES."""
+        fps = clip.fps or 30
+        seed = effect_seed('glitch', start_time, duration) if seed is None else seed
+
+        def band(position, size, height):
+            h = max(int(height * (0.05 + 0.3 * size)), 1)
+            y0 = int(position * (height - h))
+            return y0, y0 + h
+
+        def glitch_transform(get_frame, t):
+            frame = get_frame(t)
+            if not start_time <= t <= start_time + duration:
+                return frame
+            height, width = frame.shape[:2]
+            # 每帧的随机数按固定顺序抽取，与启用哪些模式无关
+            rng = frame_rng(seed, t, fps)
+            shifts = rng.integers(-50, 50, size=(10, 2))
+            burst = rng.random(4)
+            rgb = rng.uniform(-1, 1, 2)
+            blocks = rng.random((6, 6))
+            scan = rng.random(2), rng.uniform(-1, 1, 16)
+            quant = rng.random(2), rng.integers(3, 6)
+            active = {mode: burst[i] < ReferenceEffects.GLITCH_BURST[mode] * intensity
+                      for i, mode in enumerate(('rgb_split', 'blocks', 'scanlines', 'quantize'))}
+
+            out = frame.copy()
+            if 'shift' in modes:
+                slice_h = int(height / 10)
+                for i, (dx, dy) in enumerate(shifts):
+                    rows = slice(slice_h * i, slice_h * (i + 1))
+                    out[rows] = ReferenceEffects._shift(frame[rows], int(dx), int(dy))
+            if 'rgb_split' in modes and active['rgb_split']:
+                dx, dy = (int(round(v)) for v in rgb * 0.02 * intensity * (width, height))
+                out[:, :, 0] = ReferenceEffects._shift(out[:, :, 0].copy(), dx, dy)
+                out[:, :, 2] = ReferenceEffects._shift(out[:, :, 2].copy(), -dx, -dy)
+            if 'blocks' in modes and active['blocks']:
+                for bw, bh, sx, sy, dx, dy in blocks:
+                    w, h = max(int(width * (0.05 + 0.2 * bw)), 1), max(int(height * (0.02 + 0.08 * bh)), 1)
+                    sx, sy = int(sx * (width - w)), int(sy * (height - h))
+                    dx, dy = int(dx * (width - w)), int(dy * (height - h))
+                    out[dy:dy + h, dx:dx + w] = out[sy:sy + h, sx:sx + w].copy()
+            if 'scanlines' in modes and active['scanlines']:
+                y0, y1 = band(scan[0][0], scan[0][1], height)
+                edges = np.linspace(y0, y1, 17).astype(int)
+                for a, b, offset in zip(edges[:-1], edges[1:], scan[1] * 0.05 * intensity):
+                    out[a:b] = np.roll(out[a:b], int(round(offset * width)), axis=1)
+            if 'quantize' in modes and active['quantize']:
+                y0, y1 = band(quant[0][0], quant[0][1], height)
+                out[y0:y1] &= np.uint8((0xff << int(quant[1])) & 0xff)
+            return out
+
+        return clip.transform(glitch_transform)
+
+    @staticmethod
+    def flash(clip, timestamp, duration=0.1, intensity=1.0):
+        def flash_transform(get_frame, t):
+            frame = get_frame(t)
+            if timestamp <= t <= timestamp + duration:
+                progress = 1 - abs(2 * (t - timestamp) / duration - 1)
+                flash = np.ones_like(frame) * 255
+                return cv2.addWeighted(frame, 1, flash, progress * intensity, 0)
+            return frame
+
+        return clip.transform(flash_transform)
+
+    @staticmethod
+    def flash_cuts(clip, timestamps, cut_duration=0.1, flash_intensity=1.0):
+        def flash_transform(get_frame, t):
+            frame = get_frame(t)
+            for timestamp in timestamps:
+                if timestamp - cut_duration / 2 <= t <= timestamp + cut_duration / 2:
+                    if t <= timestamp:
+                        progress = (t - (timestamp - cut_duration / 2)) / (cut_duration / 2)
+                    else:
+                        progress = 1 - (t - timestamp) / (cut_duration / 2)
+                    alpha = min(progress * flash_intensity, 1.0)
+                    return cv2.addWeighted(frame, 1.0 - alpha, np.ones_like(frame) * 255, alpha, 0)
+            return frame
+
+        return clip.transform(flash_transform)
+
+    @staticmethod
+    def slide(clip, start_time, duration=1.0, direction='left'):
+        def slide_transform(get_frame, t):
+            frame = get_frame(t)
+            if start_time <= t <= start_time + duration:
+                progress = (t - start_time) / duration
+                h, w = frame.shape[:2]
+                if direction == 'left':
+                    dx, dy = -int(w * progress), 0
+                elif direction == 'right':
+                    dx, dy = int(w * (1 - progress)), 0
+                elif direction == 'up':
+                    dx, dy = 0, -int(h * progress)
+                else:
+                    dx, dy = 0, int(h * (1 - progress))
+                frame = ReferenceEffects._shift(frame, dx, dy)
+            return frame
+
+        return clip.transform(slide_transform)
+
+    @staticmethod
+    def transition(clip1, clip2, kind='crossfade', duration=0.5):
+        """Two clips overlapping by duration, blended left to right during the overlap."""
+        start2 = clip1.duration - duration
+
+        def make_frame(t):
+            if t < start2:
+                return clip1.get_frame(t)
+            if t >= clip1.duration:
+                return clip2.get_frame(t - start2)
+            frame1, frame2 = clip1.get_frame(t), clip2.get_frame(t - start2)
+            progress = (t - start2) / duration
+            w = frame1.shape[1]
+            if kind == 'crossfade':
+                return cv2.addWeighted(frame1, 1 - progress, frame2, progress, 0)
+            if kind == 'slide':
+                offset = int(w * progress)
+                return np.hstack([frame1[:, offset:], frame2[:, :offset]])
+            if kind == 'wipe':
+                offset = int(w * progress)
+                return np.hstack([frame1[:, :w - offset], frame2[:, w - offset:]])
+            alpha = 1 - abs(2 * progress - 1)
+            base = frame1 if progress < 0.5 else frame2
+            return cv2.addWeighted(base, 1 - alpha, np.ones_like(base) * 255, alpha, 0)
+
+        result = VideoClip(make_frame, duration=clip1.duration + clip2.duration - duration)
+        result.fps = clip1.fps
+        return result
+
+    @staticmethod
+    def lut(clip, table, start_time, duration):
+        """Grade with a [b][g][r] indexed LUT by trilinear interpolation of every pixel."""
+        n = table.shape[0]
+
+        def grade(frame):
+            pos = frame.astype(np.float64) / 255 * (n - 1)
+            base = np.minimum(pos.astype(int), n - 2)
+            frac = pos - base
+            r, g, b = base[..., 0], base[..., 1], base[..., 2]
+            fr, fg, fb = frac[..., 0:1], frac[..., 1:2], frac[..., 2:3]
+            graded = np.zeros(frame.shape, np.float64)
+            for db in (0, 1):
+                for dg in (0, 1):
+                    for dr in (0, 1):
+                        weight = (fr if dr else 1 - fr) * (fg if dg else 1 - fg) * (fb if db else 1 - fb)
+                        graded += weight * table[b + db, g + dg, r + dr]
+            return np.clip(graded * 255 + 0.5, 0, 255).astype(np.uint8)
+
+        def lut_transform(get_frame, t):
+            frame = get_frame(t)
+            if start_time <= t <= start_time + duration:
+                return grade(frame)
+            return frame
+
+        return clip.transform(lut_transform)
+
+    @staticmethod
+    def text(clip, text, start_time, duration, fontsize=40, blur_background=None, blur_padding=20):
+        """Centered text fading in and out over 0.5 s, composited over the whole frame."""
+        txt_clip = TextClip(text=text, font=DynamicText.get_font_path('default'), font_size=fontsize,
+                            color='white', stroke_color='black', stroke_width=2, method='label', bg_color=None)
+        rgb = txt_clip.get_frame(0).astype(np.float64)
+        alpha = txt_clip.mask.get_frame(0)[:, :, None]
+        th, tw = alpha.shape[:2]
+        ramp = min(0.5 / duration, 0.5)
+
+        def text_transform(get_frame, t):
+            frame = get_frame(t)
+            if not start_time <= t <= start_time + duration:
+                return frame
+            u = (t - start_time) / duration
+            opacity = min(u / ramp, 1.0, (1 - u) / ramp)
+            h, w = frame.shape[:2]
+            x, y = (w - tw) // 2, (h - th) // 2
+            if blur_background:
+                blurred = ReferenceEffects.FILTERS[blur_background](frame)
+                frame = frame.copy()
+                x0, y0 = max(x - blur_padding, 0), max(y - blur_padding, 0)
+                x1, y1 = min(x + tw + blur_padding, w), min(y + th + blur_padding, h)
+                frame[y0:y1, x0:x1] = blurred[y0:y1, x0:x1]
+            # 文字图层与画面同尺寸，整帧混合
+            layer = np.zeros(frame.shape, np.float64)
+            mask = np.zeros(frame.shape[:2] + (1,), np.float64)
+            layer[y:y + th, x:x + tw] = rgb
+            mask[y:y + th, x:x + tw] = alpha * opacity
+            return (frame * (1 - mask) + layer * mask + 0.5).astype(np.uint8)
+
+        return clip.transform(text_transform)
+
+
+def _reference_particles(clip, start_time, duration=1.0, num_particles=100):
+    # 与编辑器一样用换算到输出时间轴后的时间窗口生成种子
+    window = VideoEditor(None, vide_file_clip=clip)._get_adjusted_window(start_time, duration)
+    seed = effect_seed('particle', *window, num_particles)
+    return ReferenceEffects.particles(clip, start_time, duration, num_particles, seed)
+
+
+def _editor_particles(clip, start_time, duration=1.0, num_particles=100):
+    editor = VideoEditor(None, vide_file_clip=clip)
+    editor.add_particle_explosion(start_time, duration, num_particles)
+    return editor.clip
+
+
+def _look_table(size=17):
+    """Smooth non-linear look as a [b][g][r] indexed table: lifted shadows, warm highlights."""
+    levels = np.linspace(0, 1, size)
+    b, g, r = np.meshgrid(levels, levels, levels, indexing='ij')
+    luma = 0.3 * r + 0.6 * g + 0.1 * b
+    table = np.stack([r ** 0.8, 0.05 + 0.9 * g + 0.05 * luma, b * 0.85 + 0.1 * (1 - luma)], -1)
+    return np.clip(table, 0, 1)
+
+
+_lut_dir = None
+
+
+def _look_cube():
+    """Path of a .cube file holding _look_table(), written once per process."""
+    global _lut_dir
+    if _lut_dir is None:
+        _lut_dir = tempfile.mkdtemp(prefix='reelrush-equivalence-')
+        atexit.register(shutil.rmtree, _lut_dir, True)
+        table = _look_table()
+        with open(os.path.join(_lut_dir, 'look.cube'), 'w') as f:
+            f.write(f'TITLE "equivalence look"\nLUT_3D_SIZE {table.shape[0]}\n')
+            np.savetxt(f, table.reshape(-1, 3), fmt='%.6f')
+    return os.path.join(_lut_dir, 'look.cube')
+
+
+def _pieces(clip, overlap):
+    """Two pieces of clip that joined with an overlap of overlap seconds are as long as clip.
+
+    Both pieces start at the beginning of clip, so the two sides of the
+    transition show different source times.
+    """
+    length = (clip.duration + overlap) / 2
+    return clip.subclipped(0, length), clip.subclipped(0, length)
+
+
+@dataclass
+class EffectCase:
+    """An effect rendered both by its reference and by its current implementation."""
+    name: str
+    reference: Callable   # (clip) -> clip
+    current: Callable     # (clip) -> clip
+    min_psnr: float = MIN_PSNR
+    min_ssim: float = MIN_SSIM
+
+
+@dataclass
+class EquivalenceResult:
+    """Fidelity and speed of an effect's current implementation against its reference."""
+    name: str
+    frames: int
+    min_psnr: float          # 最差帧的 PSNR（dB）
+    mean_psnr: float         # 有限值的平均 PSNR；所有帧都完全相同时为 inf
+    min_ssim: float          # 最差帧的 SSIM
+    worst_time: float        # PSNR 最低的帧的时间
+    reference_seconds: float  # 参考实现渲染所有帧的耗时
+    current_seconds: float    # 当前实现渲染所有帧的耗时
+    passed: bool
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_seconds / self.current_seconds if self.current_seconds > 0 else math.inf
+
+
+def default_cases(start_time=0.2, duration=0.6) -> List[EffectCase]:
+    """One case per effect (and per filter) with the effect active from start_time."""
+    cases = [
+        EffectCase(
+            f'filter:{name}',
+            lambda clip, name=name: ReferenceEffects.filter(clip, name, start_time, duration),
+            lambda clip, name=name: FilterEffect.apply(clip, name, start_time, duration)
+        )
+        for name in ReferenceEffects.FILTERS
+    ]
+    cases += [
+        EffectCase('glitch',
+                   lambda clip: ReferenceEffects.glitch(clip, start_time, duration),
+                   lambda clip: GlitchEffect.apply(clip, start_time, duration)),
+        EffectCase('camera_shake',
+                   lambda clip: ReferenceEffects.shake(clip, start_time, duration),
+                   lambda clip: CameraShake.apply(clip, start_time, duration)),
+        EffectCase('zoom',
+                   lambda clip: ReferenceEffects.zoom(clip, start_time, duration),
+                   lambda clip: DynamicZoom.apply(clip, start_time, duration)),
+        EffectCase('particle',
+                   lambda clip: _reference_particles(clip, start_time, duration),
+                   lambda clip: _editor_particles(clip, start_time, duration)),
+        EffectCase('glitch:modes',
+                   lambda clip: ReferenceEffects.glitch_modes(clip, start_time, duration, GLITCH_MODES),
+                   lambda clip: GlitchEffect.apply(clip, start_time, duration, modes=GLITCH_MODES)),
+        EffectCase('filter:lut',
+                   lambda clip: ReferenceEffects.lut(clip, _look_table(), start_time, duration),
+                   lambda clip: FilterEffect.apply(clip, 'lut', start_time, duration, lut_path=_look_cube())),
+        EffectCase('flash',
+                   lambda clip: ReferenceEffects.flash(clip, start_time, duration),
+                   lambda clip: FlashEffect.apply(clip, start_time, duration)),
+        EffectCase('flash_cut',
+                   lambda clip: ReferenceEffects.flash_cuts(clip, [start_time + duration / 2], duration),
+                   lambda clip: FlashCut.create(clip, [start_time + duration / 2], duration)),
+        EffectCase('slide',
+                   lambda clip: ReferenceEffects.slide(clip, start_time, duration),
+                   lambda clip: SlideTransition.apply(clip, start_time, duration)),
+    ]
+    cases += [
+        EffectCase(
+            f'transition:{kind}',
+            lambda clip, kind=kind: ReferenceEffects.transition(*_pieces(clip, duration / 2), kind, duration / 2),
+            lambda clip, kind=kind: TransitionEffect.concatenate(list(_pieces(clip, duration / 2)), kind, duration / 2)
+        )
+        for kind in TransitionEffect.TRANSITIONS
+    ]
+    cases += [
+        EffectCase('text',
+                   lambda clip: ReferenceEffects.text(clip, 'GOAL!', start_time, duration),
+                   lambda clip: DynamicText.animated_text(clip, 'GOAL!', start_time, duration, fontsize=40)),
+        EffectCase('text:blur_background',
+                   lambda clip: ReferenceEffects.text(clip, 'GOAL!', start_time, duration,
+                                                      blur_background='gaussian_blur'),
+                   lambda clip: DynamicText.animated_text(clip, 'GOAL!', start_time, duration, fontsize=40,
+                                                          blur_background='gaussian_blur')),
+    ]
+    return cases
+
+
+def _render(clip, times, seed):
+    """Frames of clip at times, with the legacy global NumPy generator reseeded per frame."""
+    frames = []
+    elapsed = 0.0
+    for i, t in enumerate(times):
+        # 仍使用全局随机数的效果（毛玻璃）在两边得到相同的随机数
+        np.random.seed((seed + i) % 2 ** 32)
+        start = time.perf_counter()
+        frame = clip.get_frame(t)
+        elapsed += time.perf_counter() - start
+        # 输出可能是会被下一帧复用的缓冲区
+        frames.append(np.array(frame, copy=True))
+    return frames, elapsed
+
+
+def _cached_source(clip):
+    """Clip serving precomputed frames of clip, so timings only measure the effect."""
+    cache = {}
+    times = np.arange(0, clip.duration, 1.0 / clip.fps)
+    for t in times:
+        cache[round(t * clip.fps)] = clip.get_frame(t)
+
+    def make_frame(t):
+        return cache[int(round(t * clip.fps))].copy()
+
+    return VideoClip(make_frame, duration=clip.duration).with_fps(clip.fps), times
+
+
+def check_equivalence(case: EffectCase, clip=None, seed=0, repeats=3) -> EquivalenceResult:
+    """Render every frame of clip through both implementations of case and compare them.
+
+    Args:
+        case: Effect to check
+        clip: Source clip, synthetic_clip() by default
+        seed: Seed of the global NumPy generator before each frame
+        repeats (int): Renders per implementation; the fastest one is timed
+    """
+    source, times = _cached_source(clip if clip is not None else synthetic_clip())
+    reference_seconds = current_seconds = math.inf
+    for _ in range(max(repeats, 1)):
+        # 每次都重新构造效果，参考实现的粒子等状态从头开始
+        reference_frames, elapsed = _render(case.reference(source), times, seed)
+        reference_seconds = min(reference_seconds, elapsed)
+        current_frames, elapsed = _render(case.current(source), times, seed)
+        current_seconds = min(current_seconds, elapsed)
+
+    psnrs = [psnr(a, b) for a, b in zip(reference_frames, current_frames)]
+    ssims = [ssim(a, b) for a, b in zip(reference_frames, current_frames)]
+    finite = [value for value in psnrs if value != math.inf]
+    worst = int(np.argmin(psnrs))
+    min_psnr, min_ssim = psnrs[worst], min(ssims)
+    return EquivalenceResult(
+        name=case.name,
+        frames=len(times),
+        min_psnr=min_psnr,
+        mean_psnr=float(np.mean(finite)) if finite else math.inf,
+        min_ssim=min_ssim,
+        worst_time=float(times[worst]),
+        reference_seconds=reference_seconds,
+        current_seconds=current_seconds,
+        passed=min_psnr >= case.min_psnr and min_ssim >= case.min_ssim
+    )
+
+
+def run(cases: Optional[List[EffectCase]] = None, size=(320, 240), duration=1.0, fps=30,
+        seed=0, repeats=3) -> List[EquivalenceResult]:
+    """Check every case on the same synthetic clip.
+
+    Args:
+        cases: Cases to check, default_cases() by default
+        size (tuple): (width, height) of the synthetic clip
+        duration (float): Duration of the synthetic clip
+        fps (int): Frame rate of the synthetic clip
+        seed (int): Seed of the synthetic clip and of the global NumPy generator
+        repeats (int): Renders per implementation; the fastest one is timed
+    """
+    clip = synthetic_clip(size, duration, fps, seed)
+    return [check_equivalence(case, clip, seed, repeats) for case in (cases or default_cases())]
+
+
+def format_report(results: List[EquivalenceResult]) -> str:
+    """Table of fidelity and speedup per effect."""
+    lines = [f"{'effect':<22} {'min PSNR':>9} {'min SSIM':>9} {'ref ms/f':>9} {'cur ms/f':>9} {'speedup':>8}  result"]
+    for r in results:
+        lines.append(
+            f"{r.name:<22} {r.min_psnr:>9.2f} {r.min_ssim:>9.5f} "
+            f"{1000 * r.reference_seconds / r.frames:>9.2f} {1000 * r.current_seconds / r.frames:>9.2f} "
+            f"{r.speedup:>7.2f}x  {'ok' if r.passed else f'DRIFT at t={r.worst_time:.3f}'}"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the effects with their frozen reference implementations")
+    parser.add_argument('--size', default='320x240', help="WIDTHxHEIGHT of the synthetic clip")
+    parser.add_argument('--duration', type=float, default=1.0)
+    parser.add_argument('--fps', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--effect', action='append', help="Only check effects whose name starts with this")
+    args = parser.parse_args(argv)
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    cases = default_cases()
+    if args.effect:
+        cases = [case for case in cases if any(case.name.startswith(prefix) for prefix in args.effect)]
+    results = run(cases, (width, height), args.duration, args.fps, args.seed, args.repeats)
+    print(format_report(results))
+    return 0 if all(r.passed for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+from bisect import bisect_right
+from fractions import Fraction
+from moviepy import VideoFileClip
+from moviepy.config import FFMPEG_BINARY
+from moviepy.tools import cross_platform_popen_params, ffmpeg_escape_filename
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+
+log = logging.getLogger()
+
+# 索引格式变化时递增，旧的索引文件会被重建
+INDEX_VERSION = 1
+
+# 源目录不可写时索引存放的目录；REELRUSH_INDEX_CACHE 可以指定其他目录
+INDEX_CACHE_DIR = os.environ.get(
+    'REELRUSH_INDEX_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'reelrush', 'keyframes')
+)
+
+
+class KeyframeIndex:
+    """Times of the keyframes of a video's first video stream.
+
+    The index is built once per file by demuxing the packets with ffmpeg
+    (no decoding) and stored in a sidecar file next to the video, or in
+    INDEX_CACHE_DIR when that directory is read-only. The sidecar records
+    the file size and modification time and is rebuilt when they change.
+    """
+
+    _loaded = {}
+    _lock = threading.Lock()
+
+    def __init__(self, keyframes, packets, size=None, mtime_ns=None):
+        """Create an index.
+
+        Args:
+            keyframes (list): Sorted keyframe times in seconds (ffmpeg -ss positions)
+            packets (int): Number of video packets in the file
+            size (int): File size the index was built for
+            mtime_ns (int): File modification time the index was built for
+        """
+        self.keyframes = keyframes
+        self.packets = packets
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @staticmethod
+    def sidecar_path(path):
+        return path + '.keyframes.json'
+
+    @staticmethod
+    def cache_path(path):
+        key = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+        return os.path.join(INDEX_CACHE_DIR, key + '.json')
+
+    @classmethod
+    def build(cls, path):
+        """Scan the packets of path with ffmpeg."""
+        stat = os.stat(path)
+        proc = subprocess.run(
+            [FFMPEG_BINARY, '-v', 'error', '-i', path, '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
+        )
+        time_base = Fraction(1, 1000)
+        keyframes = []
+        packets = 0
+        for line in proc.stdout.decode('ascii', 'replace').splitlines():
+            if line.startswith('#tb 0:'):
+                time_base = Fraction(line.split(':', 1)[1].strip())
+                continue
+            if not line or line.startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split(',')]
+            packets += 1
+            # framecrc 只在标志不是默认的关键帧（F=0x1）时打印 F=
+            flags = next((int(field[2:], 16) for field in fields[6:] if field.startswith('F=')), 1)
+            if flags & 1:
+                keyframes.append(float(int(fields[2]) * time_base))
+        if not keyframes:
+            raise ValueError(f"No keyframes found in {path}")
+        return cls(sorted(keyframes), packets, stat.st_size, stat.st_mtime_ns)
+
+    def to_dict(self):
+        return {'version': INDEX_VERSION, 'size': self.size, 'mtime_ns': self.mtime_ns,
+                'packets': self.packets, 'keyframes': self.keyframes}
+
+    @classmethod
+    def _read(cls, index_path, stat):
+        """Load an index file if it exists and matches the file, else None."""
+        try:
+            with open(index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (data.get('version') != INDEX_VERSION or data.get('size') != stat.st_size
+                or data.get('mtime_ns') != stat.st_mtime_ns):
+            return None
+        return cls(data['keyframes'], data['packets'], data['size'], data['mtime_ns'])
+
+    def _write(self, path):
+        """Store the index in the sidecar, or in the cache directory when that fails."""
+        for index_path in (self.sidecar_path(path), self.cache_path(path)):
+            try:
+                os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+                tmp_path = f"{index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(self.to_dict(), f)
+                os.replace(tmp_path, index_path)
+                return index_path
+            except OSError as e:
+                log.debug(f"Could not write keyframe index {index_path}: {e}")
+        log.warning(f"Could not store the keyframe index of {path}")
+        return None
+
+    @classmethod
+    def for_file(cls, path):
+        """Index of path, loaded from its sidecar or built (and stored) if missing or stale."""
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+        with cls._lock:
+            index = cls._loaded.get(key)
+        if index is not None:
+            return index
+
+        for index_path in (cls.sidecar_path(path), cls.cache_path(path)):
+            index = cls._read(index_path, stat)
+            if index is not None:
+                break
+        else:
+            index = cls.build(path)
+            stored = index._write(path)
+            log.info(f"Indexed {len(index.keyframes)} keyframes of {path} into {stored}")
+
+        with cls._lock:
+            cls._loaded[key] = index
+        return index
+
+    def keyframe_before(self, t):
+        """Time of the last keyframe at or before t (the first keyframe if t precedes it)."""
+        i = bisect_right(self.keyframes, t) - 1
+        return self.keyframes[max(i, 0)]
+
+
+class IndexedVideoReader(FFMPEG_VideoReader):
+    """FFMPEG_VideoReader that uses a KeyframeIndex to decide how to seek.
+
+    MoviePy restarts ffmpeg for any jump of more than 100 frames and
+    starts decoding one second before the target, which means from the
+    keyframe before that. This reader restarts ffmpeg exactly at the
+    keyframe before the target, and chooses between restarting and reading
+    forward from the cost of each: frames read through the pipe cost
+    pipe_cost times more than frames ffmpeg decodes and drops itself, and
+    a restart costs about reopen_frames decoded frames.
+    """
+
+    def __init__(self, reader, index, reopen_frames=None, pipe_cost=3.0):
+        """Take over an open reader.
+
+        Args:
+            reader (FFMPEG_VideoReader): Reader to take over (e.g. VideoFileClip.reader)
+            index (KeyframeIndex): Keyframes of the reader's file
+            reopen_frames (float): Cost of restarting ffmpeg in decoded frames, 1.5 seconds of frames by default
+            pipe_cost (float): Cost of reading a frame through the pipe relative to decoding it
+        """
+        self.__dict__.update(reader.__dict__)
+        # 原读取器被回收时会关闭 ffmpeg 进程，进程已经归这里所有
+        reader.proc = None
+        self.index = index
+        self.reopen_frames = reopen_frames if reopen_frames is not None else 1.5 * self.fps
+        self.pipe_cost = pipe_cost
+        self.reopens = 0  # 重新启动 ffmpeg 的次数
+
+    def _keyframe_number(self, pos):
+        """Frame number of the last keyframe at or before frame pos."""
+        # 允许半帧误差，目标帧本身是关键帧时从它开始
+        keyframe = self.index.keyframe_before((pos + 0.5) / self.fps)
+        return self.get_frame_number(keyframe)
+
+    def initialize(self, start_time=0):
+        """Open the file at start_time.
+
+        With a single accurate input seek ffmpeg jumps to the keyframe
+        before the target and drops the frames up to it right after
+        decoding, before scaling and pixel format conversion.
+        """
+        self.close(delete_lastread=False)
+        self.pos = self.get_frame_number(start_time)
+        self.reopens += 1
+
+        i_arg = ['-i', ffmpeg_escape_filename(self.filename)]
+        if self.pos != 0:
+            i_arg = ['-ss', '%.06f' % (self.pos / self.fps - 0.00001)] + i_arg
+
+        if self.depth == 4:
+            codec_name = self.infos.get('video_codec_name')
+            if codec_name == 'vp9':
+                i_arg = ['-c:v', 'libvpx-vp9'] + i_arg
+            elif codec_name == 'vp8':
+                i_arg = ['-c:v', 'libvpx'] + i_arg
+
+        cmd = [FFMPEG_BINARY] + i_arg + [
+            '-loglevel', 'error',
+            '-f', 'image2pipe',
+            '-vf', 'scale=%d:%d' % tuple(self.size),
+            '-sws_flags', self.resize_algo,
+            '-pix_fmt', self.pixel_format,
+            '-vcodec', 'rawvideo',
+            '-'
+        ]
+        popen_params = cross_platform_popen_params({
+            'bufsize': self.bufsize,
+            'stdout': subprocess.PIPE,
+            'stderr': subprocess.PIPE,
+            'stdin': subprocess.DEVNULL
+        })
+        self.proc = subprocess.Popen(cmd, **popen_params)
+        self.last_read = self.read_frame()
+
+    def get_frame(self, t):
+        """Read a file video frame at time t."""
+        pos = self.get_frame_number(t) + 1
+        if self.proc and pos > self.pos + 1:
+            skip = pos - self.pos - 1
+            reopen = self.reopen_frames + (pos - 1 - self._keyframe_number(pos - 1))
+            if skip * self.pipe_cost <= reopen:
+                self.skip_frames(skip)
+                return self.read_frame()
+            self.initialize(t)
+            return self.last_read
+        return super().get_frame(t)
+
+
+def open_video(path, index=True, **kwargs):
+    """Open a VideoFileClip, seeking through a keyframe index when index is set.
+
+    Args:
+        path (str): Video file
+        index (bool): Use (and build on first use) the keyframe index sidecar;
+            leave it off for files that are still being written
+        **kwargs: Passed to VideoFileClip
+    """
+    clip = VideoFileClip(path, **kwargs)
+    if not index:
+        return clip
+    try:
+        keyframes = KeyframeIndex.for_file(path)
+    except (OSError, ValueError, subprocess.CalledProcessError) as e:
+        log.warning(f"Seeking in {path} without a keyframe index: {e}")
+        return clip
+    clip.reader = IndexedVideoReader(clip.reader, keyframes)
+    return clip
@@ -0,0 +1,343 @@
+import logging
+import math
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from dataclasses import replace
+from fractions import Fraction
+import numpy as np
+from moviepy.config import FFMPEG_BINARY
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from .effects_processor import VideoProcessingParams, build_editor, source_range_clip
+from .metrics import instrument_output, queue_depth, track_job
+from .source import SharedSource
+
+log = logging.getLogger()
+
+
+class GrowingFileFollower:
+    """Follow a recording that is still being written and track how much of it has landed.
+
+    New bytes appended to the file are streamed into ffmpeg, which only
+    demuxes them (no decoding) and reports the timestamp of every video
+    packet. Each time the available duration grows, the wall clock time is
+    recorded so the landing time of any source time can be looked up.
+
+    The source must be in a streamable container (MPEG-TS, Matroska,
+    fragmented MP4, FLV).
+    """
+
+    def __init__(self, path, poll_interval=0.2, idle_timeout=5.0, chunk_size=1 << 16):
+        """Create the follower.
+
+        Args:
+            path (str): Path to the growing recording
+            poll_interval (float): Seconds to wait before checking the file for new data
+            idle_timeout (float): The recording is considered finished after this many seconds without new data
+            chunk_size (int): Bytes read from the file at a time
+        """
+        self.path = path
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.chunk_size = chunk_size
+        self.finished = False
+        self._available = []   # 已到达的源时长（秒），单调递增
+        self._landed_at = []   # 对应的墙钟时间
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._proc = None
+        self._threads = []
+
+    @property
+    def available(self):
+        """Seconds of source that can be read."""
+        with self._condition:
+            return self._available[-1] if self._available else 0.0
+
+    def start(self):
+        """Start following the file in background threads."""
+        self._proc = subprocess.Popen(
+            [FFMPEG_BINARY, '-v', 'error', '-i', 'pipe:0', '-map', '0:v:0', '-c', 'copy', '-f', 'framecrc', '-'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._threads = [
+            threading.Thread(target=self._feed, name='reelrush-live-feed', daemon=True),
+            threading.Thread(target=self._parse, name='reelrush-live-parse', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _feed(self):
+        """Copy bytes appended to the file into ffmpeg."""
+        try:
+            while not os.path.exists(self.path):
+                if self._stopped.wait(self.poll_interval):
+                    return
+            with open(self.path, 'rb') as f:
+                last_data = time.monotonic()
+                while not self._stopped.is_set():
+                    data = f.read(self.chunk_size)
+                    if data:
+                        self._proc.stdin.write(data)
+                        self._proc.stdin.flush()
+                        last_data = time.monotonic()
+                    elif time.monotonic() - last_data > self.idle_timeout:
+                        log.info(f"No new data in {self.path} for {self.idle_timeout}s, recording finished")
+                        break
+                    else:
+                        self._stopped.wait(self.poll_interval)
+        except (BrokenPipeError, OSError) as e:
+            log.error(f"Stopped following {self.path}: {e}")
+        finally:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+    def _parse(self):
+        """Read packet timestamps reported by ffmpeg."""
+        time_base = Fraction(1, 1000)
+        first_dts = None
+        for line in self._proc.stdout:
+            line = line.decode('ascii', 'replace').strip()
+            if line.startswith('#tb 0:'):
+                time_base = Fraction(line.split(':', 1)[1].strip())
+                continue
+            if not line or line.startswith('#'):
+                continue
+            fields = [field.strip() for field in line.split(',')]
+            if len(fields) < 4:
+                continue
+            dts = int(fields[1])
+            if first_dts is None:
+                first_dts = dts
+            # dts 不超过 pts，所以 pts 不晚于这个时间的帧都已完整到达
+            available = float((dts - first_dts) * time_base)
+            with self._condition:
+                if not self._available or available > self._available[-1]:
+                    self._available.append(available)
+                    self._landed_at.append(time.time())
+                    self._condition.notify_all()
+        self._proc.wait()
+        with self._condition:
+            self.finished = True
+            self._condition.notify_all()
+
+    def landing_time(self, source_t):
+        """Wall clock time at which source time source_t became available, None if it has not yet."""
+        with self._condition:
+            i = bisect_left(self._available, source_t)
+            return self._landed_at[i] if i < len(self._available) else None
+
+    def wait(self, timeout=None):
+        """Block until more source lands or the recording finishes."""
+        with self._condition:
+            if not self.finished:
+                self._condition.wait(timeout)
+
+    def stop(self):
+        """Stop following the file."""
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.kill()
+
+
+class LiveHighlighter:
+    """Cut highlights from a growing recording and publish them as HLS while the game goes on.
+
+    Highlights are VideoProcessingParams whose source_ranges select the
+    play; effect timestamps are relative to the highlight, as with
+    source_ranges elsewhere. A highlight is rendered as soon as its whole
+    source range has landed. Each one is split into HLS segments, and the
+    playlist is rewritten as soon as each segment has been encoded.
+    """
+
+    def __init__(self, source_path, output_dir, segment_duration=2.0, fps=30, codec='libx264',
+                 preset='veryfast', playlist_name='highlights.m3u8', safety_margin=0.5,
+                 poll_interval=0.2, idle_timeout=5.0):
+        """Create the highlighter.
+
+        Args:
+            source_path (str): Path to the growing recording
+            output_dir (str): Directory receiving the playlist and segments
+            segment_duration (float): Target duration of HLS segments in seconds
+            fps (int): Output frame rate
+            codec (str): Video codec to use
+            preset (str): Encoder preset, fast presets keep latency down
+            playlist_name (str): File name of the playlist
+            safety_margin (float): Extra seconds that must have landed after a highlight before reading it
+            poll_interval (float): Seconds between checks of the recording
+            idle_timeout (float): The recording is considered finished after this many seconds without new data
+        """
+        self.source_path = source_path
+        self.output_dir = output_dir
+        self.segment_duration = segment_duration
+        self.fps = fps
+        self.codec = codec
+        self.preset = preset
+        self.playlist_path = os.path.join(output_dir, playlist_name)
+        self.safety_margin = safety_margin
+        self.follower = GrowingFileFollower(source_path, poll_interval, idle_timeout)
+        self.segments = []  # 已发布的分片：{'uri', 'duration', 'latency', 'discontinuity'}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._pending_depth = queue_depth.labels(queue='live_highlights')
+
+    def add_highlight(self, params: VideoProcessingParams):
+        """Queue a highlight; may be called from another thread while run() is going."""
+        if not params.source_ranges:
+            raise ValueError("Live highlights need source_ranges")
+        params = replace(params, video_path=self.source_path, video_file_clip=None)
+        with self._lock:
+            self._pending.append(params)
+            self._pending_depth.set(len(self._pending))
+
+    def stop(self):
+        """Ask run() to return after the current highlight."""
+        self._stopped.set()
+
+    def _needed_until(self, params):
+        return max(end for _, end in params.source_ranges) + self.safety_margin
+
+    def _next_ready(self):
+        """Pop the queued highlight whose source has landed, or return None."""
+        available = self.follower.available
+        with self._lock:
+            ready = [p for p in self._pending if self._needed_until(p) <= available]
+            if not ready:
+                return None
+            params = min(ready, key=self._needed_until)
+            self._pending.remove(params)
+            self._pending_depth.set(len(self._pending))
+            return params
+
+    def run(self):
+        """Render queued highlights until the recording finishes and the queue is empty.
+
+        Returns:
+            dict with the published segments and latency statistics in seconds
+            ('segments', 'latency_mean', 'latency_max')
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.follower.start()
+        try:
+            while not self._stopped.is_set():
+                params = self._next_ready()
+                if params is not None:
+                    with track_job():
+                        self._render(params)
+                    continue
+                if self.follower.finished:
+                    with self._lock:
+                        for params in self._pending:
+                            log.error(f"Recording ended before highlight {params.source_ranges} was available")
+                        self._pending.clear()
+                        self._pending_depth.set(0)
+                    break
+                self.follower.wait(self.follower.poll_interval)
+        finally:
+            self.follower.stop()
+            self._write_playlist(final=True)
+
+        latencies = [segment['latency'] for segment in self.segments]
+        report = {
+            'segments': list(self.segments),
+            'latency_mean': float(np.mean(latencies)) if latencies else 0.0,
+            'latency_max': float(np.max(latencies)) if latencies else 0.0
+        }
+        log.info(f"Published {len(latencies)} live segments, latency mean {report['latency_mean']:.2f}s, "
+                 f"max {report['latency_max']:.2f}s")
+        return report
+
+    def _render(self, params):
+        """Render one highlight into HLS segments."""
+        if not params.validate():
+            log.error(f"Skipping invalid live highlight {params.source_ranges}")
+            return
+        # 文件头里的时长不可靠，用实际已到达的时长打开
+        source = SharedSource(self.source_path, duration=self.follower.available)
+        temp_dir = tempfile.mkdtemp(prefix='reelrush_live_')
+        try:
+            base = source_range_clip(params, source)
+            editor = build_editor(params, source_clip=base)
+            clip = instrument_output(editor.clip)
+            count = max(1, math.ceil(clip.duration / self.segment_duration - 1e-6))
+            for k in range(count):
+                start = k * self.segment_duration
+                end = min(start + self.segment_duration, clip.duration)
+                self._write_segment(clip, start, end, temp_dir,
+                                    lambda t: base.source_time(editor.timewarp(t)), discontinuity=(k == 0))
+        finally:
+            for name in os.listdir(temp_dir):
+                os.remove(os.path.join(temp_dir, name))
+            os.rmdir(temp_dir)
+            source.close()
+
+    def _write_segment(self, clip, start, end, temp_dir, source_time, discontinuity):
+        index = len(self.segments)
+        uri = f'segment_{index:05d}.ts'
+        path = os.path.join(self.output_dir, uri)
+        # 分片时间戳接在播放列表已有内容之后
+        offset = sum(segment['duration'] for segment in self.segments)
+
+        audiofile = None
+        if clip.audio is not None:
+            audiofile = os.path.join(temp_dir, f'{uri}.m4a')
+            clip.audio.subclipped(start, end).write_audiofile(audiofile, codec='aac', logger=None)
+
+        times = np.arange(start, end - 1e-6, 1.0 / self.fps)
+        writer = FFMPEG_VideoWriter(path + '.tmp', clip.size, self.fps, codec=self.codec, preset=self.preset,
+                                    audiofile=audiofile, ffmpeg_params=['-output_ts_offset', f'{offset:.6f}', '-f', 'mpegts'])
+        needed = 0.0
+        try:
+            for t in times:
+                frame = clip.get_frame(t)
+                if frame.dtype != np.uint8:
+                    frame = frame.astype(np.uint8)
+                writer.write_frame(frame)
+                needed = max(needed, source_time(t))
+        finally:
+            writer.close()
+        os.replace(path + '.tmp', path)
+        written_at = time.time()
+
+        landed_at = self.follower.landing_time(needed)
+        latency = written_at - landed_at if landed_at is not None else 0.0
+        self.segments.append({
+            'uri': uri,
+            'duration': len(times) / self.fps,
+            'latency': latency,
+            'discontinuity': discontinuity and index > 0
+        })
+        self._write_playlist()
+        log.info(f"Live segment {uri} written {latency:.2f}s after its last source frame landed")
+
+    def _write_playlist(self, final=False):
+        """Atomically rewrite the playlist with every published segment."""
+        target = max([math.ceil(segment['duration']) for segment in self.segments] + [math.ceil(self.segment_duration)])
+        lines = [
+            '#EXTM3U',
+            '#EXT-X-VERSION:3',
+            f'#EXT-X-TARGETDURATION:{target}',
+            '#EXT-X-MEDIA-SEQUENCE:0',
+            '#EXT-X-PLAYLIST-TYPE:EVENT'
+        ]
+        for segment in self.segments:
+            if segment['discontinuity']:
+                # 不同高光片段之间内容不连续
+                lines.append('#EXT-X-DISCONTINUITY')
+            lines.append(f"#EXTINF:{segment['duration']:.3f},")
+            lines.append(segment['uri'])
+        if final:
+            lines.append('#EXT-X-ENDLIST')
+        tmp_path = self.playlist_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.playlist_path)
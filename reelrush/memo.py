@@ -0,0 +1,43 @@
+from .buffers import FramePool, FrameRing
+from .metrics import memo_hits, memo_misses
+
+# 记忆化特效的输出来自独立的缓冲池：同一个缓冲区可能被连续返回多次，
+# 因此不能被下游特效当作临时缓冲区原地修改
+memo_pool = FramePool()
+
+
+class FrameMemo:
+    """Reuse the last result of a time-invariant effect while its input is unchanged.
+
+    An effect is time-invariant when its output depends only on the input
+    frame (plus an optional key of per-frame parameters such as opacity).
+    Upstream stages return the very same array while the source frame does
+    not change, e.g. during a freeze, so the input is compared by identity.
+    """
+
+    def __init__(self):
+        self.ring = FrameRing(pool=memo_pool)
+        self.hits = 0    # 直接复用上一结果的帧数
+        self.misses = 0  # 重新计算的帧数
+        self._input = None
+        self._key = None
+        self._output = None
+
+    def render(self, render_func, frame, key=None):
+        """Return render_func(frame, out), or the previous result if frame and key are unchanged.
+
+        Args:
+            render_func: Function (frame, out) -> result frame
+            frame: Input frame
+            key: Hashable value of any per-frame parameters the result depends on
+        """
+        if frame is self._input and key == self._key:
+            self.hits += 1
+            memo_hits.inc()
+            return self._output
+        self.misses += 1
+        memo_misses.inc()
+        self._output = render_func(frame, self.ring.next(frame.shape, frame.dtype))
+        self._input = frame
+        self._key = key
+        return self._output
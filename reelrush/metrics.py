@@ -0,0 +1,360 @@
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+log = logging.getLogger()
+
+# 默认的耗时分桶（秒），覆盖单帧处理的常见范围
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+                     for name, value in labels)
+    return '{' + pairs + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value))
+
+
+class _Metric:
+    """Base of the metric types: a family of children, one per label value combination."""
+
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """Child metric for the given label values."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        key = tuple((name, labels[name]) for name in self.labelnames)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._child()
+            return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels {self.labelnames}, use labels()")
+        return self.labels()
+
+    def _child(self):
+        raise NotImplementedError
+
+    def expose(self):
+        """Lines of the Prometheus text format for this metric."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            children = list(self._children.items())
+        for key, child in children:
+            for suffix, extra, value in child.samples():
+                lines.append(f'{self.name}{suffix}{_format_labels(key + extra)} {_format_value(value)}')
+        return lines
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [('_total', (), self.value)]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count (exposed with a _total suffix)."""
+
+    kind = 'counter'
+
+    def _child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+        self._lock = threading.Lock()
+
+    def set(self, value):
+        with self._lock:
+            self.value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def set_function(self, function):
+        """Read the value from function() at exposition time."""
+        self.function = function
+
+    def samples(self):
+        return [('', (), self.function() if self.function else self.value)]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down."""
+
+    kind = 'gauge'
+
+    def _child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+    def inc(self, amount=1):
+        self._default().inc(amount)
+
+    def dec(self, amount=1):
+        self._default().dec(amount)
+
+    def set_function(self, function):
+        self._default().set_function(function)
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+                    break
+            self.sum += value
+            self.count += 1
+
+    def samples(self):
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            samples.append(('_bucket', (('le', _format_value(bound)),), cumulative))
+        samples.append(('_sum', (), total))
+        samples.append(('_count', (), count))
+        return samples
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def _child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+
+class MetricsRegistry:
+    """A set of metrics that can be exported in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} already registered with a different type or labels")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def expose(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return '\n'.join(lines) + '\n'
+
+    def write_textfile(self, path):
+        """Atomically write the metrics to path (for node_exporter's textfile collector)."""
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(self.expose())
+        os.replace(tmp_path, path)
+
+    def start_textfile_writer(self, path, interval=15.0):
+        """Rewrite the textfile every interval seconds in a daemon thread.
+
+        Returns:
+            threading.Event; set it to stop the writer
+        """
+        stopped = threading.Event()
+
+        def run():
+            while True:
+                try:
+                    self.write_textfile(path)
+                except OSError as e:
+                    log.warning(f"Could not write metrics to {path}: {e}")
+                if stopped.wait(interval):
+                    return
+
+        threading.Thread(target=run, name='reelrush-metrics-textfile', daemon=True).start()
+        return stopped
+
+    def serve(self, port=9464, addr='127.0.0.1'):
+        """Serve the metrics over HTTP in a daemon thread.
+
+        Returns:
+            The HTTP server; call shutdown() on it to stop serving
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.expose().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((addr, port), Handler)
+        threading.Thread(target=server.serve_forever, name='reelrush-metrics-http', daemon=True).start()
+        log.info(f"Serving metrics on http://{addr}:{server.server_address[1]}/metrics")
+        return server
+
+
+# 进程内共享的默认指标集
+registry = MetricsRegistry()
+
+frames_rendered = registry.counter('reelrush_frames_rendered', 'Frames rendered by this process')
+stage_seconds = registry.histogram('reelrush_stage_seconds', 'Time spent per frame in each render stage',
+                                   ('stage',))
+frame_cache_requests = registry.counter('reelrush_frame_cache_requests',
+                                        'Frame cache lookups by cache and result', ('cache', 'result'))
+queue_depth = registry.gauge('reelrush_queue_depth', 'Items waiting in render queues', ('queue',))
+active_jobs = registry.gauge('reelrush_active_jobs', 'Renders in progress')
+admission_decisions = registry.counter('reelrush_admission_decisions', 'Admission control decisions',
+                                       ('decision',))
+peak_rss = registry.gauge('reelrush_peak_rss_bytes', 'Peak resident set size of this process')
+if resource is not None:
+    # Linux 上 ru_maxrss 的单位是 KiB，macOS 上是字节
+    _rss_unit = 1 if os.uname().sysname == 'Darwin' else 1024
+    peak_rss.set_function(lambda: resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _rss_unit)
+
+# 热路径上直接使用的子指标，避免每帧查找标签
+source_cache_hits = frame_cache_requests.labels(cache='source', result='hit')
+source_cache_misses = frame_cache_requests.labels(cache='source', result='miss')
+memo_hits = frame_cache_requests.labels(cache='memo', result='hit')
+memo_misses = frame_cache_requests.labels(cache='memo', result='miss')
+decode_seconds = stage_seconds.labels(stage='decode')
+effects_seconds = stage_seconds.labels(stage='effects')
+encode_seconds = stage_seconds.labels(stage='encode')
+
+_local = threading.local()
+
+
+def timed_source(clip):
+    """Clip reading clip while adding the time spent to the current frame's decode time."""
+    def decode(get_frame, t):
+        start = time.perf_counter()
+        frame = get_frame(t)
+        _local.decode = getattr(_local, 'decode', 0.0) + time.perf_counter() - start
+        return frame
+
+    return clip.transform(decode)
+
+
+def instrument_output(clip):
+    """Clip recording per-frame stage times and the rendered frame count.
+
+    Decode time is measured by timed_source further down the chain; the
+    rest of get_frame counts as effects time. The time between returning
+    a frame and being asked for the next one is spent by the writer, and
+    counts as encode time.
+    """
+    state = {'armed': False, 'returned': None}
+
+    def measure(get_frame, t):
+        if not state['armed']:
+            # MoviePy 构造片段时会读取一帧来确定尺寸，不计入
+            return get_frame(t)
+        start = time.perf_counter()
+        if state['returned'] is not None:
+            encode_seconds.observe(start - state['returned'])
+        _local.decode = 0.0
+        frame = get_frame(t)
+        end = time.perf_counter()
+        decode_seconds.observe(_local.decode)
+        effects_seconds.observe(max(end - start - _local.decode, 0.0))
+        frames_rendered.inc()
+        state['returned'] = end
+        return frame
+
+    clip = clip.transform(measure)
+    state['armed'] = True
+    return clip
+
+
+@contextmanager
+def track_job():
+    """Count the render inside the with block in the active jobs gauge."""
+    active_jobs.inc()
+    try:
+        yield
+    finally:
+        active_jobs.dec()
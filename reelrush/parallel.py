@@ -0,0 +1,264 @@
+import logging
+import multiprocessing
+import os
+import queue
+import tempfile
+from concurrent.futures import wait
+from multiprocessing import shared_memory
+import numpy as np
+from moviepy import VideoClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from .audio import mux
+from .effects_processor import VideoProcessingParams, build_editor, source_range_clip
+from .metrics import active_jobs, frames_rendered, queue_depth
+
+log = logging.getLogger()
+
+
+class SharedFrameRing:
+    """Fixed number of frame slots in one shared memory block.
+
+    Processes attach to the block by name and address frames by slot
+    index, so only small integers ever travel between them.
+    """
+
+    def __init__(self, slots, shape, name=None):
+        """Create the block, or attach to an existing one when name is given.
+
+        Args:
+            slots (int): Number of frame slots
+            shape (tuple): (height, width, channels) of one frame
+            name (str): Name of an existing block to attach to
+        """
+        self.slots = slots
+        self.shape = tuple(shape)
+        size = slots * int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def frame(self, slot):
+        """Writable view of a slot.
+
+        A new view object is returned on every call: FrameMemo compares
+        input frames by identity, and a slot holds a different frame each
+        time it is reused.
+        """
+        return np.ndarray(self.shape, dtype=np.uint8, buffer=self.shm.buf,
+                          offset=slot * self.frames[0].nbytes)
+
+    def close(self):
+        del self.frames
+        try:
+            self.shm.close()
+        except BufferError:
+            # 特效的缓存可能仍引用槽位视图，映射随进程退出释放
+            pass
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def _decode(params, ring_name, slots, shape, total_frames, fps, free_slots, work, done):
+    """Decoder process: read source frames (through the time warp) into free slots."""
+    ring = SharedFrameRing(slots, shape, ring_name)
+    try:
+        editor = build_editor(params)
+        for i in range(total_frames):
+            slot = free_slots.get()
+            frame = editor.base_clip.get_frame(editor.timewarp(i / fps))
+            np.copyto(ring.frame(slot), frame, casting='unsafe')
+            work.put((i, slot))
+    except Exception as e:
+        log.exception("Parallel render decoder failed")
+        done.put((-1, -1, f"decoder: {e!r}"))
+    finally:
+        ring.close()
+
+
+def _apply_effects(params, ring_name, slots, shape, base_duration, fps, work, done):
+    """Worker process: run the effect chain on the frame in a slot and write the result back."""
+    ring = SharedFrameRing(slots, shape, ring_name)
+    current = {'slot': 0}
+    try:
+        # 源片段直接返回当前槽位中已解码（已经过时间映射）的帧，任意时间都一样
+        source = VideoClip(lambda t: ring.frame(current['slot']), duration=base_duration).with_fps(fps)
+        if params.source_ranges or params.play_transition:
+            # 比分牌等按原视频时间取数据，需要剪辑片段到原视频的时间映射（不解码帧）
+            source.source_time = source_range_clip(params).source_time
+        editor = build_editor(params, source_clip=source)
+        while True:
+            item = work.get()
+            if item is None:
+                break
+            i, slot = item
+            try:
+                current['slot'] = slot
+                frame = editor.clip.get_frame(i / fps)
+                out = ring.frame(slot)
+                if not np.shares_memory(frame, out):
+                    np.copyto(out, frame, casting='unsafe')
+                done.put((i, slot, None))
+            except Exception as e:
+                log.exception(f"Parallel render failed on frame {i}")
+                done.put((i, slot, repr(e)))
+    except Exception as e:
+        log.exception("Parallel render worker failed")
+        done.put((-1, -1, f"worker: {e!r}"))
+    finally:
+        ring.close()
+
+
+def _check_processes(processes, finished=False):
+    """Raise if a render process (decoder or effect worker) failed.
+
+    Args:
+        processes: Decoder process followed by the effect processes
+        finished (bool): Whether the workers have been told to stop; before
+            that only the decoder may exit, once it has queued every frame
+    """
+    for k, process in enumerate(processes):
+        # 被信号杀死时 exitcode 为负数
+        if process.exitcode not in (None, 0):
+            raise RuntimeError(f"Parallel render process {process.name} exited with code {process.exitcode}")
+        if k > 0 and not finished and process.exitcode is not None:
+            raise RuntimeError(f"Parallel render process {process.name} exited unexpectedly")
+
+
+def process_video_effects_parallel(params: VideoProcessingParams, output_path: str, fps: int = 30,
+                                   workers: int = None, codec: str = 'libx264', slots: int = None) -> bool:
+    """Render a video with the effect chain applied to several frames at once.
+
+    A decoder process writes source frames into a shared memory ring of
+    frame slots, worker processes apply the effect stack to the slots, and
+    this process feeds them to the encoder in order. Frames are never
+    pickled or copied between processes; the queues only carry frame and
+    slot indices.
+
+    Every worker builds its own copy of the effect chain, so effects must
+    render a frame from its time alone (see reelrush.seeding). Edits with
+    STATEFUL effects are rendered in order in this process instead.
+
+    Args:
+        params: 视频处理参数, video_path is required (clips cannot be shared between processes)
+        output_path: 输出视频路径
+        fps: 输出视频帧率
+        workers: Number of effect processes, one per CPU by default
+        codec: Video codec to use
+        slots: Frame slots in the ring, 2 * workers + 2 by default
+
+    Returns:
+        bool: 处理是否成功
+    """
+    if not params.validate():
+        log.error("Invalid video processing parameters")
+        return False
+    if not params.video_path:
+        log.error("Parallel rendering needs params.video_path")
+        return False
+
+    workers = workers or os.cpu_count() or 1
+    slots = slots or 2 * workers + 2
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context('fork' if 'fork' in methods else 'spawn')
+
+    editor = build_editor(params)
+    if editor.stateful:
+        # 有状态的特效依赖前面的帧，只能按顺序渲染
+        log.warning(f"Effects of {output_path} must be rendered in order, rendering without workers")
+        try:
+            editor.save(output_path, codec=codec, fps=fps)
+            return True
+        except Exception as e:
+            log.error(f"Render of {output_path} failed: {e}")
+            return False
+        finally:
+            editor.base_clip.close()
+    clip = editor.clip
+    width, height = clip.size
+    shape = (height, width, 3)
+    total_frames = len(np.arange(0, clip.duration, 1.0 / fps))
+
+    ring = SharedFrameRing(slots, shape)
+    free_slots, work, done = context.Queue(), context.Queue(), context.Queue()
+    for slot in range(slots):
+        free_slots.put(slot)
+
+    processes = [context.Process(
+        target=_decode, name='reelrush-decode', daemon=True,
+        args=(params, ring.name, slots, shape, total_frames, fps, free_slots, work, done)
+    )]
+    processes += [context.Process(
+        target=_apply_effects, name=f'reelrush-effects-{k}', daemon=True,
+        args=(params, ring.name, slots, shape, editor.base_clip.duration, fps, work, done)
+    ) for k in range(workers)]
+
+    temp_dir = tempfile.mkdtemp(prefix='reelrush_parallel_')
+    audio = None
+    writer = None
+    reorder_depth = queue_depth.labels(queue='parallel_reorder')
+    active_jobs.inc()
+    try:
+        for process in processes:
+            process.start()
+
+        # 音频在后台线程编码，与帧渲染同时进行，最后复制两路流合并
+        audio = editor.render_audio(os.path.join(temp_dir, 'audio.m4a'))
+        video_path = os.path.join(temp_dir, 'video' + os.path.splitext(output_path)[1]) if audio else output_path
+        writer = FFMPEG_VideoWriter(video_path, clip.size, fps, codec=codec)
+
+        # 工作进程完成的顺序不定，按帧号重新排序后写入编码器
+        ready = {}
+        next_frame = 0
+        while next_frame < total_frames:
+            try:
+                i, slot, error = done.get(timeout=1.0)
+            except queue.Empty:
+                _check_processes(processes)
+                continue
+            if error is not None:
+                raise RuntimeError(f"Parallel render failed on frame {i}: {error}")
+            ready[i] = slot
+            while next_frame in ready:
+                slot = ready.pop(next_frame)
+                writer.write_frame(ring.frames[slot])
+                free_slots.put(slot)
+                next_frame += 1
+                frames_rendered.inc()
+            reorder_depth.set(len(ready))
+
+        for _ in range(workers):
+            work.put(None)
+        for process in processes:
+            process.join()
+        _check_processes(processes, finished=True)
+        if audio:
+            writer.close()
+            writer = None
+            mux(video_path, audio.result(), output_path)
+        log.info(f"Rendered {total_frames} frames of {output_path} with {workers} effect processes")
+        return True
+    except Exception as e:
+        log.error(f"Parallel render of {output_path} failed: {e}")
+        return False
+    finally:
+        active_jobs.dec()
+        reorder_depth.set(0)
+        if writer is not None:
+            writer.close()
+        for process in processes:
+            if process.pid is None:
+                continue
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        ring.close()
+        ring.unlink()
+        if audio:
+            wait([audio])
+        for name in os.listdir(temp_dir):
+            os.remove(os.path.join(temp_dir, name))
+        os.rmdir(temp_dir)
@@ -0,0 +1,103 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+import proglog
+
+
+class RenderCancelled(Exception):
+    """Raised inside a render when it has been asked to stop."""
+
+
+@dataclass
+class RenderProgress:
+    """Progress of a render at one point in time."""
+    frames_done: int              # 已完成的帧数（包括从检查点恢复的帧）
+    total_frames: int             # 总帧数
+    elapsed: float                # 已用时间（秒）
+    fps: float                    # 本次渲染的平均速度（帧/秒）
+    eta: Optional[float] = None   # 预计剩余时间（秒），速度未知时为None
+
+    @property
+    def fraction(self) -> float:
+        return self.frames_done / self.total_frames if self.total_frames else 1.0
+
+
+@dataclass
+class RenderResult:
+    """Outcome of a render."""
+    output_path: str
+    success: bool
+    cancelled: bool = False
+    error: Optional[str] = None   # 失败原因
+    frames: int = 0               # 已完成的帧数
+    elapsed: float = 0.0          # 总耗时（秒）
+
+
+class RenderProgressLogger(proglog.ProgressBarLogger):
+    """proglog logger turning MoviePy's frame progress into RenderProgress reports.
+
+    Every callback also checks the cancel event and raises RenderCancelled
+    once it is set, which unwinds the render and closes the encoder.
+    """
+
+    def __init__(self, total_frames: int, on_progress: Optional[Callable[[RenderProgress], None]] = None,
+                 cancel_event: Optional[threading.Event] = None, min_interval: float = 0.5):
+        """Create the logger.
+
+        Args:
+            total_frames (int): Number of frames of the output
+            on_progress: Called with a RenderProgress at most every min_interval seconds
+            cancel_event (threading.Event): Set it to stop the render
+            min_interval (float): Minimum seconds between two progress reports
+        """
+        super().__init__()
+        self.total_frames = total_frames
+        self.on_progress = on_progress
+        self.cancel_event = cancel_event or threading.Event()
+        self.min_interval = min_interval
+        self.started = time.monotonic()
+        self.resumed_frames = 0   # 从检查点恢复、本次不需要渲染的帧
+        self._finished_bars = 0   # 之前的分段中已完成的帧
+        self._index = 0           # 当前分段中已完成的帧
+        self._last_report = 0.0
+
+    @property
+    def frames_done(self) -> int:
+        return min(self.resumed_frames + self._finished_bars + self._index, self.total_frames)
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise RenderCancelled()
+
+    def progress(self) -> RenderProgress:
+        elapsed = time.monotonic() - self.started
+        rendered = self.frames_done - self.resumed_frames
+        fps = rendered / elapsed if elapsed > 0 else 0.0
+        eta = (self.total_frames - self.frames_done) / fps if fps > 0 else None
+        return RenderProgress(self.frames_done, self.total_frames, elapsed, fps, eta)
+
+    def report(self, force=False):
+        """Send a progress report if min_interval has passed (or force is set)."""
+        now = time.monotonic()
+        if self.on_progress is not None and (force or now - self._last_report >= self.min_interval):
+            self._last_report = now
+            self.on_progress(self.progress())
+
+    def callback(self, **changes):
+        if 'resumed_frames' in changes:
+            self.resumed_frames = changes['resumed_frames']
+            self.report(force=True)
+        self.check_cancelled()
+
+    def bars_callback(self, bar, attr, value, old_value=None):
+        self.check_cancelled()
+        if bar != 'frame_index':
+            return
+        if attr == 'total':
+            # 分段渲染时每个分段是一个新的进度条
+            self._finished_bars += self._index
+            self._index = 0
+        elif attr == 'index':
+            self._index = max(value, 0)
+            self.report()
@@ -0,0 +1,245 @@
+import logging
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, asdict
+import numpy as np
+from .metrics import track_job
+
+log = logging.getLogger()
+
+
+@dataclass(frozen=True)
+class QualitySettings:
+    """Knobs that trade output quality for render speed."""
+    particle_fraction: float = 1.0   # 绘制的粒子比例
+    blur_scale: float = 1.0          # 模糊滤镜的计算分辨率（相对原图）
+    glass_noise_scale: float = 1.0   # 毛玻璃随机位移图的分辨率（相对原图）
+    encoder_effort: int = 0          # 编码器运动搜索的简化程度，见 ENCODER_EFFORT
+    resolution_scale: float = 1.0    # 输出分辨率（相对原图），特效的像素幅度（抖动、故障、粒子）随之缩放
+
+    def changes(self, other):
+        """Fields that differ from other, as {name: (old, new)}."""
+        return {name: (value, getattr(other, name)) for name, value in asdict(self).items()
+                if getattr(other, name) != value}
+
+
+FULL_QUALITY = QualitySettings()
+
+# 逐级降低质量：先降视觉影响最小、收益最大的设置
+QUALITY_LEVELS = [
+    FULL_QUALITY,
+    QualitySettings(particle_fraction=0.5, glass_noise_scale=0.5),
+    QualitySettings(particle_fraction=0.5, glass_noise_scale=0.5, blur_scale=0.5),
+    QualitySettings(particle_fraction=0.5, glass_noise_scale=0.5, blur_scale=0.5, encoder_effort=1),
+    QualitySettings(particle_fraction=0.25, glass_noise_scale=0.25, blur_scale=0.5, encoder_effort=2),
+    QualitySettings(particle_fraction=0.25, glass_noise_scale=0.25, blur_scale=0.25, encoder_effort=3),
+]
+
+# x264 的速度档位只改运动搜索，不改变码流头（SPS/PPS），因此不同档位编码的分段可以直接拼接
+ENCODER_EFFORT = [
+    [],
+    ['-x264-params', 'me=hex:subme=4:trellis=0'],
+    ['-x264-params', 'me=dia:subme=2:trellis=0:rc-lookahead=10'],
+    ['-x264-params', 'me=dia:subme=1:trellis=0:rc-lookahead=0:partitions=none'],
+]
+
+# 输出分辨率只能在渲染开始前确定一次（所有分段尺寸必须相同）
+RESOLUTION_SCALES = [1.0, 0.75, 0.5]
+
+_quality = ContextVar('reelrush_quality', default=FULL_QUALITY)
+
+
+def current_quality() -> QualitySettings:
+    """Quality settings effects should render with in the current context."""
+    return _quality.get()
+
+
+@contextmanager
+def quality(settings: QualitySettings):
+    """Render with settings inside the with block (per thread / task)."""
+    token = _quality.set(settings)
+    try:
+        yield settings
+    finally:
+        _quality.reset(token)
+
+
+class DeadlineController:
+    """Step down quality when the achieved frame rate falls behind a deadline.
+
+    After each chunk the controller compares the frame rate achieved so far
+    in the current quality level with the frame rate needed to finish the
+    remaining frames before the deadline, and moves one level down the
+    ladder when it is not fast enough.
+    """
+
+    def __init__(self, deadline, total_frames, levels=None, margin=1.1, start_level=0):
+        """Create the controller.
+
+        Args:
+            deadline (float): Seconds from now by which rendering should finish
+            total_frames (int): Number of frames to render
+            levels (list): Quality ladder, QUALITY_LEVELS by default
+            margin (float): Required speed headroom, 1.1 keeps 10% in reserve
+            start_level (int): Index of the initial level
+        """
+        self.levels = levels or QUALITY_LEVELS
+        self.total_frames = total_frames
+        self.margin = margin
+        self.level = start_level
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline
+        self.frames_done = 0
+        self.downgrades = []
+        self._level_frames = 0
+        self._level_seconds = 0.0
+
+    @property
+    def settings(self) -> QualitySettings:
+        return self.levels[self.level]
+
+    def required_fps(self):
+        remaining_time = self.deadline - time.monotonic()
+        remaining_frames = self.total_frames - self.frames_done
+        if remaining_frames <= 0:
+            return 0.0
+        return math.inf if remaining_time <= 0 else remaining_frames / remaining_time
+
+    def update(self, frames, seconds):
+        """Report a rendered chunk and return the settings for the next one.
+
+        Args:
+            frames (int): Frames in the chunk
+            seconds (float): Wall time the chunk took
+        """
+        self.frames_done += frames
+        self._level_frames += frames
+        self._level_seconds += seconds
+        achieved = self._level_frames / self._level_seconds if self._level_seconds > 0 else math.inf
+        required = self.required_fps()
+        if achieved < required * self.margin and self.level < len(self.levels) - 1:
+            old = self.settings
+            self.level += 1
+            self._level_frames = 0
+            self._level_seconds = 0.0
+            changes = ', '.join(f'{name} {a} -> {b}' for name, (a, b) in old.changes(self.settings).items())
+            self.downgrades.append({
+                'frame': self.frames_done,
+                'level': self.level,
+                'achieved_fps': achieved,
+                'required_fps': required,
+                'changes': old.changes(self.settings)
+            })
+            log.warning(f"Render at {achieved:.1f} fps, {required:.1f} fps needed for the deadline: "
+                        f"quality level {self.level} ({changes})")
+        return self.settings
+
+
+def plan_resolution(estimate_seconds, deadline, size, slowest_level_speedup=2.0):
+    """Choose the output resolution scale up front from a predicted render time.
+
+    Args:
+        estimate_seconds (float): Predicted render time at full quality (e.g. CostModel.estimate)
+        deadline (float): Seconds available
+        size (tuple): Full output (width, height)
+        slowest_level_speedup (float): Speedup expected from the rest of the quality ladder
+
+    Returns:
+        (scale, (width, height)) with even dimensions
+    """
+    scale = 1.0
+    for candidate in RESOLUTION_SCALES:
+        scale = candidate
+        # 耗时大致与像素数成正比
+        if estimate_seconds * candidate ** 2 / slowest_level_speedup <= deadline:
+            break
+    width = max(2, int(round(size[0] * scale / 2)) * 2)
+    height = max(2, int(round(size[1] * scale / 2)) * 2)
+    return scale, (width, height)
+
+
+def render_with_deadline(params, output_path, deadline, fps=None, codec='libx264',
+                         chunk_duration=2.0, estimate_seconds=None):
+    """Render an edit in chunks, lowering quality as needed to finish by the deadline.
+
+    The output resolution is chosen before the edit is built: the input is
+    downscaled first, so the effects render (and cost) at that resolution too.
+
+    Args:
+        params (VideoProcessingParams): Description of the edit
+        output_path (str): Path to save the output video
+        deadline (float): Seconds from now by which the render should finish
+        fps (int): Output frame rate, the clip's by default
+        codec (str): Video codec to use
+        chunk_duration (float): Seconds per chunk; quality can change between chunks
+        estimate_seconds (float): Predicted full quality render time, used to lower the
+            output resolution up front when even the lowest quality level would be late
+
+    Returns:
+        dict with 'elapsed', 'deadline', 'met', 'resolution_scale', 'downgrades' and 'final_quality'
+    """
+    # 特效模块依赖本模块，在函数内导入以避免循环导入
+    from .effects_processor import build_editor, source_range_clip
+
+    source = source_range_clip(params)
+    size = tuple(source.size)
+    resolution_scale = 1.0
+    if estimate_seconds is not None and estimate_seconds > deadline:
+        resolution_scale, size = plan_resolution(estimate_seconds, deadline, size)
+        if resolution_scale < 1.0:
+            log.warning(f"Predicted {estimate_seconds:.1f}s for a {deadline:.1f}s deadline: "
+                        f"rendering at {size[0]}x{size[1]}")
+    editor = build_editor(params, source_clip=source, size=size)
+
+    fps = fps or editor.clip.fps
+    total_frames = len(np.arange(0, editor.clip.duration, 1.0 / fps))
+    frames_per_chunk = max(1, int(round(chunk_duration * fps)))
+
+    levels = [QualitySettings(**{**asdict(level), 'resolution_scale': resolution_scale})
+              for level in QUALITY_LEVELS]
+    controller = DeadlineController(deadline, total_frames, levels)
+    if codec != 'libx264':
+        log.info(f"Encoder effort only applies to libx264, not {codec}")
+
+    work_dir = tempfile.mkdtemp(prefix='reelrush_deadline_')
+    chunks = []
+    # 音频与视频分段同时编码
+    audio = editor.render_audio(os.path.join(work_dir, 'audio.m4a'))
+    try:
+        with track_job():
+            for index, first in enumerate(range(0, total_frames, frames_per_chunk)):
+                last = min(first + frames_per_chunk, total_frames)
+                settings = controller.settings
+                name = f'chunk_{index:05d}.mp4'
+                encoder_params = ENCODER_EFFORT[settings.encoder_effort] if codec == 'libx264' else []
+                start = time.monotonic()
+                with quality(settings):
+                    editor.write_chunk(os.path.join(work_dir, name), first, last, fps, codec,
+                                       ffmpeg_params=encoder_params)
+                controller.update(last - first, time.monotonic() - start)
+                chunks.append(name)
+            editor.join_chunks(output_path, work_dir, chunks, audio)
+    finally:
+        if audio:
+            wait([audio])
+        for name in os.listdir(work_dir):
+            os.remove(os.path.join(work_dir, name))
+        os.rmdir(work_dir)
+
+    elapsed = time.monotonic() - controller.started
+    report = {
+        'elapsed': elapsed,
+        'deadline': deadline,
+        'met': elapsed <= deadline,
+        'resolution_scale': resolution_scale,
+        'downgrades': controller.downgrades,
+        'final_quality': asdict(controller.settings)
+    }
+    log.info(f"Rendered {output_path} in {elapsed:.1f}s for a {deadline:.1f}s deadline "
+             f"with {len(controller.downgrades)} quality downgrades")
+    return report
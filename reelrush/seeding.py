@@ -0,0 +1,19 @@
+import hashlib
+import numpy as np
+
+
+def effect_seed(*values):
+    """Stable seed derived from an effect's parameters (same in every process and run)."""
+    digest = hashlib.sha1(repr(values).encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'little')
+
+
+def frame_rng(seed, t, fps):
+    """Random generator for the frame at time t, so random effects only depend on time.
+
+    Args:
+        seed (int): Seed of the effect, see effect_seed
+        t (float): Frame time
+        fps (float): Frame rate used to turn t into a frame index
+    """
+    return np.random.default_rng([seed, int(round(t * fps))])
@@ -0,0 +1,142 @@
+from bisect import bisect_right
+from collections import OrderedDict
+from moviepy import VideoClip, concatenate_audioclips
+import numpy as np
+from .keyframes import open_video
+from .metrics import source_cache_hits, source_cache_misses
+
+
+def merge_ranges(ranges):
+    """Merge overlapping or touching (start, end) ranges.
+
+    Args:
+        ranges: Iterable of (start, end) tuples in seconds
+
+    Returns:
+        Sorted list of disjoint (start, end) tuples
+    """
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SharedSource:
+    """A single decoder shared by every clip cut from the same source file.
+
+    Decoded frames are kept in a small LRU cache keyed by frame index, so
+    several clips reading the same source time only decode it once.
+
+    Clips that are read alternately at different source times (e.g. both
+    sides of a crossfade) would make one decoder seek back and forth on
+    every frame, so up to max_readers decoders are kept open and each
+    frame is read by the decoder just behind it.
+    """
+
+    def __init__(self, video_path, cache_frames=8, duration=None, max_readers=2):
+        """Open the source file.
+
+        Args:
+            video_path (str): Path to the source video
+            cache_frames (int): Number of decoded frames to keep around
+            duration (float): Known duration of the source, overrides the
+                container header (e.g. for a file that is still being written,
+                which is then read without a keyframe index)
+            max_readers (int): Number of decoders that may be open at once
+        """
+        self.video_path = video_path
+        self._indexed = duration is None  # 仍在写入的文件不建关键帧索引
+        self.clip = open_video(video_path, index=self._indexed)
+        if duration is not None:
+            self.clip = self.clip.with_duration(duration)
+        self.reader = self.clip.reader
+        self.readers = [self.reader]  # 最近使用的解码器排在最后
+        self.max_readers = max_readers
+        self._extra_clips = []
+        self.fps = self.clip.fps
+        self.size = self.clip.size
+        self.duration = self.clip.duration
+        self.cache_frames = cache_frames
+        self.decoded_frames = 0  # 实际解码的帧数
+        self.cache_hits = 0      # 命中缓存的帧数
+        self._cache = OrderedDict()
+
+    def get_frame(self, t):
+        """Get the source frame at time t, decoding it at most once."""
+        index = self.reader.get_frame_number(t)
+        frame = self._cache.get(index)
+        if frame is not None:
+            self._cache.move_to_end(index)
+            self.cache_hits += 1
+            source_cache_hits.inc()
+            return frame
+
+        frame = self._reader_for(index).get_frame(t)
+        self.decoded_frames += 1
+        source_cache_misses.inc()
+        self._cache[index] = frame
+        if len(self._cache) > self.cache_frames:
+            self._cache.popitem(last=False)
+        return frame
+
+    def _reader_for(self, index):
+        """Decoder to read frame index with: one just behind it, else a new or the least recently used one."""
+        # 解码器的 pos 是上一次读取的帧号加一；向前读不超过一秒时不必跳转
+        ahead = [(index + 1 - reader.pos, k) for k, reader in enumerate(self.readers)
+                 if reader.proc is not None and 0 <= index + 1 - reader.pos <= self.fps]
+        if ahead:
+            k = min(ahead)[1]
+        elif len(self.readers) < self.max_readers:
+            extra = open_video(self.video_path, index=self._indexed, audio=False)
+            self._extra_clips.append(extra)
+            self.readers.append(extra.reader)
+            k = len(self.readers) - 1
+        else:
+            k = 0
+        reader = self.readers.pop(k)
+        self.readers.append(reader)
+        return reader
+
+    def clip_for(self, ranges=None):
+        """Build a clip that plays the given source ranges back to back.
+
+        Args:
+            ranges: List of (start, end) source times, None for the whole file
+
+        Returns:
+            VideoClip reading its frames through this shared decoder
+        """
+        if not ranges:
+            ranges = [(0, self.duration)]
+        ranges = [(max(0, start), min(end, self.duration)) for start, end in ranges]
+
+        # 输出时间轴上每段的起点
+        offsets = np.cumsum([0] + [end - start for start, end in ranges])
+        out_starts = list(offsets[:-1])
+        duration = float(offsets[-1])
+
+        def source_time(t):
+            i = max(0, bisect_right(out_starts, t) - 1)
+            return ranges[i][0] + (t - out_starts[i])
+
+        clip = VideoClip(lambda t: self.get_frame(source_time(t)), duration=duration)
+        clip.fps = self.fps
+        clip.source_time = source_time
+
+        if self.clip.audio is not None:
+            clip.audio = concatenate_audioclips([
+                self.clip.audio.subclipped(start, end) for start, end in ranges
+            ])
+        return clip
+
+    def close(self):
+        """Release the decoder."""
+        self._cache.clear()
+        for clip in self._extra_clips:
+            clip.close()
+        self._extra_clips = []
+        self.readers = [self.reader]
+        self.clip.close()
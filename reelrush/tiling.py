@@ -0,0 +1,109 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+
+
+class TileExecutor:
+    """Run per-frame OpenCV work on horizontal bands of a frame in a thread pool.
+
+    OpenCV releases the GIL inside its functions, so bands of one large
+    frame are processed on several cores at once. While the pool exists,
+    OpenCV's own thread count is lowered so that the tile threads and
+    OpenCV's internal threads together do not use more threads than there
+    are cores.
+    """
+
+    def __init__(self, threads=None, min_pixels=1920 * 1080, min_band_rows=64):
+        """Create the executor (the thread pool is started on first use).
+
+        Args:
+            threads (int): Number of bands / threads, one per CPU by default
+            min_pixels (int): Frames smaller than this are processed in one call
+            min_band_rows (int): Bands are never made thinner than this
+        """
+        self.threads = threads or os.cpu_count() or 1
+        self.min_pixels = min_pixels
+        self.min_band_rows = min_band_rows
+        self._pool = None
+        self._opencv_threads = None
+        self._lock = threading.Lock()
+
+    def should_tile(self, frame):
+        """Whether frame is large enough to be split into bands."""
+        height, width = frame.shape[:2]
+        return self.threads > 1 and height * width >= self.min_pixels and height >= 2 * self.min_band_rows
+
+    def bands(self, height):
+        """Row ranges [(y0, y1), ...] covering height rows."""
+        count = max(1, min(self.threads, height // self.min_band_rows))
+        edges = np.linspace(0, height, count + 1).round().astype(int)
+        return list(zip(edges[:-1], edges[1:]))
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # 分块线程各自调用 OpenCV，其内部线程数按核数平分，避免超额订阅
+                self._opencv_threads = cv2.getNumThreads()
+                cores = os.cpu_count() or 1
+                cv2.setNumThreads(max(1, cores // self.threads))
+                self._pool = ThreadPoolExecutor(self.threads, thread_name_prefix='reelrush-tile')
+            return self._pool
+
+    def map_bands(self, func, height):
+        """Call func(y0, y1) for every band in parallel and wait for all of them.
+
+        Each band runs in a copy of the caller's context, so context variables
+        such as the current quality settings apply inside the threads too.
+        """
+        bands = self.bands(height)
+        if len(bands) == 1:
+            func(*bands[0])
+            return
+        # 同一个上下文不能在多个线程中同时进入，每个横带各复制一份
+        futures = [self._executor().submit(contextvars.copy_context().run, func, y0, y1) for y0, y1 in bands]
+        for future in futures:
+            future.result()
+
+    def filter(self, func, frame, halo, out=None, rows=False, **kwargs):
+        """Apply a neighbourhood filter band by band.
+
+        Each band is filtered together with halo extra rows above and below,
+        so the result matches filtering the whole frame.
+
+        Args:
+            func: Filter (frame, out=None, **kwargs) -> filtered frame of the same size
+            frame: RGB frame
+            halo (int): Radius in pixels of the neighbourhood each output pixel depends on
+            out: Optional preallocated output buffer (must not be frame)
+            rows (bool): Also pass func top= and frame_height=, the position of
+                the band in the frame (for filters drawing noise per row)
+            **kwargs: Extra arguments passed to every call of func
+        """
+        if not self.should_tile(frame):
+            return func(frame, out, **kwargs)
+        if out is None:
+            out = np.empty_like(frame)
+        height = frame.shape[0]
+
+        def run(y0, y1):
+            cy0, cy1 = max(y0 - halo, 0), min(y1 + halo, height)
+            band_kwargs = dict(kwargs, top=cy0, frame_height=height) if rows else kwargs
+            out[y0:y1] = func(frame[cy0:cy1], **band_kwargs)[y0 - cy0:y1 - cy0]
+
+        self.map_bands(run, height)
+        return out
+
+    def close(self):
+        """Stop the threads and restore OpenCV's thread count."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+                cv2.setNumThreads(self._opencv_threads)
+
+
+# 进程内共享的默认分块执行器
+tile_executor = TileExecutor()
@@ -0,0 +1,191 @@
+from bisect import bisect_left, bisect_right
+import numpy as np
+
+
+def linear_shape(u):
+    """Constant speed."""
+    return u
+
+
+def hold_shape(u):
+    """Frozen on the first frame of the segment."""
+    return np.zeros_like(u)
+
+
+def accel_decel_shape(abruptness=0, soonness=1):
+    """Speed ramp of moviepy's vfx.AccelDecel, normalized to 0-1."""
+    a = 1.0 + abruptness
+
+    def shape(u):
+        u = np.asarray(u, dtype=np.float64) ** soonness
+        f1 = 0.5 ** (1 - a) * u ** a
+        f2 = 1 - 0.5 ** (1 - a) * (1 - u) ** a
+        return np.where(u < 0.5, f1, f2)
+    return shape
+
+
+def sub_shape(shape, u0, u1):
+    """Part u0..u1 of a shape, rescaled to 0-1 on both axes (hold_shape if it does not advance)."""
+    v0, v1 = float(shape(np.float64(u0))), float(shape(np.float64(u1)))
+    if v1 <= v0:
+        return hold_shape
+
+    def part(u):
+        return (shape(u0 + (u1 - u0) * np.asarray(u, dtype=np.float64)) - v0) / (v1 - v0)
+    return part
+
+
+class TimeWarp:
+    """Monotonic piecewise map from output time to source time.
+
+    The output timeline is split into segments. Each segment plays a source
+    range [src_start, src_end] over [out_start, out_end] following a shape
+    function u -> v on 0-1 (constant speed, speed ramp or hold). Lookups in
+    either direction are binary searches over the segment boundaries.
+
+    Remaps are described in source time, the same time base as effect
+    timestamps, so they compose regardless of the order they are added in.
+    """
+
+    def __init__(self, duration):
+        """Create an identity warp.
+
+        Args:
+            duration (float): Duration of the source clip
+        """
+        self._out_starts = [0.0]
+        self._out_ends = [float(duration)]
+        self._src_starts = [0.0]
+        self._src_ends = [float(duration)]
+        self._shapes = [linear_shape]
+
+    @property
+    def duration(self):
+        """Duration of the output timeline."""
+        return self._out_ends[-1]
+
+    @property
+    def segments(self):
+        """List of (out_start, out_end, src_start, src_end, shape) tuples."""
+        return list(zip(self._out_starts, self._out_ends, self._src_starts, self._src_ends, self._shapes))
+
+    def is_identity(self):
+        """Whether the warp leaves time unchanged."""
+        return all(shape is linear_shape and o1 - o0 == s1 - s0
+                   for o0, o1, s0, s1, shape in self.segments)
+
+    def _segment_at(self, t):
+        """Index of the segment containing output time t."""
+        return min(max(bisect_right(self._out_starts, t) - 1, 0), len(self._out_starts) - 1)
+
+    def _evaluate(self, i, t):
+        o0, o1 = self._out_starts[i], self._out_ends[i]
+        s0, s1 = self._src_starts[i], self._src_ends[i]
+        u = np.clip((t - o0) / (o1 - o0), 0, 1) if o1 > o0 else 0.0
+        return s0 + (s1 - s0) * self._shapes[i](u)
+
+    def __call__(self, t):
+        """Map output time t (scalar or array) to source time."""
+        if np.isscalar(t):
+            return float(self._evaluate(self._segment_at(t), t))
+
+        t = np.asarray(t, dtype=np.float64)
+        index = np.clip(np.searchsorted(self._out_starts, t, side='right') - 1, 0, len(self._out_starts) - 1)
+        result = np.empty_like(t)
+        for i in np.unique(index):
+            mask = index == i
+            result[mask] = self._evaluate(i, t[mask])
+        return result
+
+    def source_time(self, t):
+        """Alias of calling the warp with output time t."""
+        return self(t)
+
+    def to_output(self, source_t):
+        """Map source time to the first output time showing it."""
+        i = min(bisect_left(self._src_ends, source_t), len(self._src_ends) - 1)
+        o0, o1 = self._out_starts[i], self._out_ends[i]
+        s0, s1 = self._src_starts[i], self._src_ends[i]
+        if s1 <= s0:
+            return o0
+        v = min(max((source_t - s0) / (s1 - s0), 0), 1)
+        shape = self._shapes[i]
+        if shape is linear_shape:
+            u = v
+        else:
+            # 变速曲线单调，用采样表反查
+            samples = np.linspace(0, 1, 257)
+            u = float(np.interp(v, shape(samples), samples))
+        return o0 + (o1 - o0) * u
+
+    def _split(self, t):
+        """Make output time t a segment boundary, return the index of the segment starting there."""
+        i = self._segment_at(t)
+        o0, o1 = self._out_starts[i], self._out_ends[i]
+        if t <= o0:
+            return i
+        if t >= o1:
+            return i + 1
+        split_src = float(self._evaluate(i, t))
+        shape = self._shapes[i]
+        if shape is linear_shape or shape is hold_shape:
+            first, second = shape, shape
+        else:
+            # 变速段拆成两段，各自使用原曲线对应部分重新归一化的曲线
+            u = (t - o0) / (o1 - o0)
+            first, second = sub_shape(shape, 0.0, u), sub_shape(shape, u, 1.0)
+        self._out_starts.insert(i + 1, t)
+        self._out_ends.insert(i, t)
+        self._src_starts.insert(i + 1, split_src)
+        self._src_ends.insert(i, split_src)
+        self._shapes[i] = first
+        self._shapes.insert(i + 1, second)
+        return i + 1
+
+    def _replace(self, first, last, out_start, new_duration, src_start, src_end, shape):
+        """Replace segments [first, last) with one segment and shift later segments."""
+        old_duration = self._out_starts[last] - out_start if last < len(self._out_starts) else self.duration - out_start
+        shift = new_duration - old_duration
+        for name in ('_out_starts', '_out_ends', '_src_starts', '_src_ends', '_shapes'):
+            del getattr(self, name)[first:last]
+        self._out_starts.insert(first, out_start)
+        self._out_ends.insert(first, out_start + new_duration)
+        self._src_starts.insert(first, src_start)
+        self._src_ends.insert(first, src_end)
+        self._shapes.insert(first, shape)
+        for j in range(first + 1, len(self._out_starts)):
+            self._out_starts[j] += shift
+            self._out_ends[j] += shift
+
+    def retime(self, src_start, src_end, new_duration, shape=linear_shape):
+        """Play the source range [src_start, src_end] over new_duration seconds.
+
+        Args:
+            src_start (float): Start of the source range
+            src_end (float): End of the source range
+            new_duration (float): Output duration of the range
+            shape: Function u -> v on 0-1 describing the speed ramp
+        """
+        out_start, out_end = self.to_output(src_start), self.to_output(src_end)
+        first = self._split(out_start)
+        last = self._split(out_end)
+        holds = []
+        for i in range(first, last):
+            if self._shapes[i] is hold_shape:
+                holds.append((self._src_starts[i], self._out_ends[i] - self._out_starts[i]))
+            elif self._shapes[i] is not linear_shape:
+                raise ValueError(f"Time remap {src_start}-{src_end} overlaps an existing remap")
+        self._replace(first, last, out_start, new_duration, src_start, src_end, shape)
+        # 范围内的冻结帧保留在原来的源时间上
+        for src_t, duration in holds:
+            self.hold(src_t, duration)
+
+    def hold(self, src_t, duration):
+        """Freeze on source time src_t for duration seconds of output."""
+        out_t = self.to_output(src_t)
+        first = self._split(out_t)
+        self._replace(first, first, out_t, duration, src_t, src_t, hold_shape)
+
+    def apply(self, clip):
+        """Return clip (with its mask and audio) played through this warp."""
+        return clip.time_transform(self, apply_to=['mask', 'audio'], keep_duration=True).with_duration(self.duration)
@@ -0,0 +1,112 @@
+import asyncio
+import glob
+import os
+import tempfile
+import numpy as np
+import pytest
+from moviepy import VideoClip
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from reelrush.aio import process_video_effects_async, save_async
+from reelrush.editor import VideoEditor
+from reelrush.effects_processor import VideoProcessingParams, GlitchParams
+from reelrush.progress import RenderCancelled, RenderProgressLogger
+
+def _params():
+    """从原视频剪出 1 秒并叠加故障效果"""
+    return VideoProcessingParams(video_path="origin.mp4", source_ranges=[(2, 3)],
+                                 glitch_effects=[GlitchParams(0.2, 0.3)])
+
+def _temp_dirs():
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), 'reelrush_save_*')))
+
+def _count_writer_closes(monkeypatch):
+    """记录编码器被关闭的次数"""
+    closed = []
+    close = FFMPEG_VideoWriter.close
+    monkeypatch.setattr(FFMPEG_VideoWriter, 'close', lambda self: closed.append(1) or close(self))
+    return closed
+
+def test_progress_events(tmp_path):
+    """进度事件单调递增，最后一个是 100%，结果中记录完成的帧数"""
+    async def main():
+        job = process_video_effects_async(_params(), str(tmp_path / "out.mp4"), progress_interval=0)
+        events = [progress async for progress in job]
+        return events, await job
+
+    events, result = asyncio.run(main())
+    assert result.success and not result.cancelled and result.frames == 30
+    assert len(events) > 2
+    done = [event.frames_done for event in events]
+    assert done == sorted(done) and events[-1].fraction == 1.0 and events[-1].total_frames == 30
+    assert os.path.exists(tmp_path / "out.mp4")
+
+def test_cancel_midway_cleans_up(tmp_path, monkeypatch):
+    """渲染中途取消：编码器被关闭，未写完的输出和临时文件被删除"""
+    closed = _count_writer_closes(monkeypatch)
+    before = _temp_dirs()
+    output = tmp_path / "out.mp4"
+
+    async def main():
+        job = process_video_effects_async(_params(), str(output), progress_interval=0)
+        async for progress in job:
+            if progress.frames_done >= 5:
+                job.cancel()
+        return await job
+
+    result = asyncio.run(main())
+    assert result.cancelled and not result.success
+    assert 5 <= result.frames < 30
+    assert closed
+    assert not output.exists()
+    assert _temp_dirs() == before
+
+def test_cancelling_the_awaiting_task_stops_the_render(tmp_path):
+    """等待任务被取消时渲染也停止，取消在清理完成后才传给等待方"""
+    async def main():
+        job = process_video_effects_async(_params(), str(tmp_path / "out.mp4"), progress_interval=0)
+        task = asyncio.ensure_future(job.result())
+        async for progress in job:
+            if progress.frames_done >= 3:
+                task.cancel()
+                break
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return job
+
+    job = asyncio.run(main())
+    assert job.done() and job._future.result().cancelled
+    assert not (tmp_path / "out.mp4").exists()
+
+def test_render_error_reaches_awaiting_task(tmp_path, monkeypatch):
+    """渲染中抛出的异常作为失败的结果交给等待方，输出文件被删除"""
+    closed = _count_writer_closes(monkeypatch)
+
+    def make_frame(t):
+        if t > 0.5:
+            raise RuntimeError("decoder exploded")
+        return np.zeros((48, 64, 3), np.uint8)
+
+    editor = VideoEditor(None, vide_file_clip=VideoClip(make_frame, duration=1).with_fps(10))
+
+    async def main():
+        return await save_async(editor, str(tmp_path / "out.mp4"))
+
+    result = asyncio.run(main())
+    assert not result.success and not result.cancelled
+    assert "decoder exploded" in result.error
+    assert closed and not (tmp_path / "out.mp4").exists()
+
+    # 参数无效时同样得到失败的结果
+    async def invalid():
+        return await process_video_effects_async(VideoProcessingParams(), str(tmp_path / "bad.mp4"))
+
+    assert "Invalid" in asyncio.run(invalid()).error
+
+def test_logger_raises_once_cancelled():
+    """取消后进度回调抛出 RenderCancelled"""
+    logger = RenderProgressLogger(10, min_interval=0)
+    logger.bars_callback('frame_index', 'index', 4)
+    assert logger.frames_done == 4
+    logger.cancel_event.set()
+    with pytest.raises(RenderCancelled):
+        logger.bars_callback('frame_index', 'index', 5)
@@ -0,0 +1,66 @@
+import numpy as np
+from moviepy.audio.AudioClip import AudioArrayClip
+from reelrush.audio import AudioTrack, MusicBed, SAMPLE_RATE
+from reelrush.timewarp import TimeWarp
+from reelrush.effects.freeze import FreezeFrame
+from reelrush.effects.motion import SlowMotion
+
+def _samples(duration, frequency=440, amplitude=0.5):
+    t = np.arange(int(duration * SAMPLE_RATE)) / SAMPLE_RATE
+    wave = amplitude * np.sin(2 * np.pi * frequency * t)
+    return np.stack([wave, wave], 1)
+
+def _tone(duration, frequency=440, amplitude=0.5):
+    return AudioArrayClip(_samples(duration, frequency, amplitude), fps=SAMPLE_RATE)
+
+def _render(track):
+    return np.concatenate(list(track.blocks()))
+
+def _peak_frequency(samples):
+    spectrum = np.abs(np.fft.rfft(samples[:, 0] * np.hanning(len(samples))))
+    return np.argmax(spectrum) * SAMPLE_RATE / len(samples)
+
+def test_identity_warp_keeps_source():
+    """不变速时输出等于原声"""
+    expected = _samples(1.0)
+    out = _render(AudioTrack(AudioArrayClip(expected, fps=SAMPLE_RATE), TimeWarp(1.0)))
+    assert out.shape == expected.shape
+    assert np.abs(out - expected).max() < 1e-6
+
+def test_slow_motion_keeps_pitch():
+    """慢动作区间时长加倍，音高不变"""
+    warp = TimeWarp(2.0)
+    SlowMotion.warp(warp, 0.5, 1.5, 0.5, abruptness=1)
+    out = _render(AudioTrack(_tone(2.0), warp))
+    assert len(out) == int(3.0 * SAMPLE_RATE)
+    slowed = out[int(1.0 * SAMPLE_RATE):int(2.0 * SAMPLE_RATE)]
+    assert abs(_peak_frequency(slowed) - 440) < 5
+    # 拼接处没有明显的幅度塌陷
+    assert np.abs(slowed).max() > 0.45
+
+def test_freeze_fades_audio():
+    """冻结帧期间静音，前后淡出淡入"""
+    warp = TimeWarp(2.0)
+    FreezeFrame.warp(warp, 1.0, 0.5)
+    out = _render(AudioTrack(_tone(2.0), warp, freeze_fade=0.1))
+    rate = SAMPLE_RATE
+    assert np.abs(out[int(1.0 * rate):int(1.5 * rate)]).max() == 0
+    assert np.abs(out[int(0.5 * rate):int(0.85 * rate)]).max() > 0.45
+    assert np.abs(out[int(0.95 * rate):int(1.0 * rate)]).max() < 0.5 * 0.5 + 0.01
+
+def test_music_ducks_under_loud_audio(tmp_path):
+    """原声响亮时音乐降低 duck_db，安静后恢复"""
+    path = str(tmp_path / "music.wav")
+    _tone(4.0, frequency=220, amplitude=1.0).write_audiofile(path, fps=SAMPLE_RATE, logger=None)
+    # 原声前 2 秒为响亮的音调，后 2 秒静音
+    loud = _samples(2.0)
+    main = AudioArrayClip(np.concatenate([loud, np.zeros_like(loud)]), fps=SAMPLE_RATE)
+    track = AudioTrack(main, TimeWarp(4.0))
+    track.set_music(MusicBed(path, volume=0.5, fade=0, duck_db=-12.0, release=0.5))
+    music = _render(track) - np.concatenate([loud, np.zeros_like(loud)])
+
+    rate = SAMPLE_RATE
+    ducked = np.abs(music[int(1.0 * rate):int(1.5 * rate)]).max()
+    restored = np.abs(music[int(3.0 * rate):int(3.5 * rate)]).max()
+    assert abs(ducked - 0.5 * 10 ** (-12 / 20)) < 0.02
+    assert abs(restored - 0.5) < 0.02
@@ -0,0 +1,52 @@
+import numpy as np
+from moviepy import VideoFileClip
+from reelrush.batch import plan_source_ranges, process_video_effects_batch
+from reelrush.effects_processor import VideoProcessingParams, GlitchParams, FilterParams
+
+def _frames(path):
+    with VideoFileClip(path, audio=False) as clip:
+        return [frame.copy() for frame in clip.iter_frames()]
+
+def _jobs(tmp_path, ranges):
+    """每个任务剪取不同的源片段并叠加不同的特效"""
+    jobs = []
+    for i, (start, end) in enumerate(ranges):
+        params = VideoProcessingParams(
+            video_path="origin.mp4",
+            source_ranges=[(start, end)],
+            glitch_effects=[GlitchParams(0.2, 0.3)] if i % 2 == 0 else None,
+            filter_effects=[FilterParams(0.1, 0.5, 'sepia')] if i % 2 == 1 else None
+        )
+        jobs.append((params, str(tmp_path / f"job{i}.mp4")))
+    return jobs
+
+def _check_against_single_jobs(tmp_path, jobs):
+    """批量渲染的每个输出与单独渲染该任务的结果逐帧相同"""
+    for i, (params, output_path) in enumerate(jobs):
+        single = str(tmp_path / f"single{i}.mp4")
+        process_video_effects_batch([(params, single)])
+        batch_frames, single_frames = _frames(output_path), _frames(single)
+        assert len(batch_frames) == len(single_frames) > 0
+        assert all(np.array_equal(a, b) for a, b in zip(batch_frames, single_frames)), output_path
+
+def test_plan_source_ranges():
+    """各任务的源片段合并，没有指定时使用整个视频"""
+    jobs = [VideoProcessingParams(video_path="a", source_ranges=[(1, 3), (8, 9)]),
+            VideoProcessingParams(video_path="a", source_ranges=[(2, 4), (-1, 0.5)])]
+    assert plan_source_ranges(jobs, 10) == [(0, 0.5), (1, 4), (8, 9)]
+    assert plan_source_ranges(jobs + [VideoProcessingParams(video_path="a")], 10) == [(0, 10)]
+
+def test_shared_decode_matches_single_jobs(tmp_path):
+    """两个任务共享一次解码，重叠的源帧只解码一次，结果与单独渲染相同"""
+    jobs = _jobs(tmp_path, [(1, 2), (1.5, 2.5)])
+    stats = process_video_effects_batch(jobs)
+    assert abs(stats['unique_duration'] - 1.5) < 1e-9
+    # 两个任务共 60 帧，重叠的 0.5 秒只解码一次
+    assert stats['decoded_frames'] <= 47
+    _check_against_single_jobs(tmp_path, jobs)
+
+def test_more_jobs_than_decoders(tmp_path):
+    """任务数多于解码器数、源片段相距很远时，每个任务的输出仍然正确"""
+    jobs = _jobs(tmp_path, [(1, 1.5), (12, 12.5), (25, 25.5), (1.2, 1.7), (30, 30.5)])
+    process_video_effects_batch(jobs)
+    _check_against_single_jobs(tmp_path, jobs)
@@ -0,0 +1,37 @@
+import numpy as np
+from reelrush.effects.filter import FilterEffect
+
+def _full_frame_reference(frame, filter_name, box, feather):
+    """参考实现：对整帧做滤镜，再在框内按羽化权重与原图混合"""
+    h, w = frame.shape[:2]
+    x0, y0, x1, y1 = max(box[0], 0), max(box[1], 0), min(box[2], w), min(box[3], h)
+    filtered = FilterEffect.FILTERS[filter_name](frame)
+    weight = FilterEffect._feather_mask(y1 - y0, x1 - x0, feather) if feather > 0 else 1
+    expected = frame.copy()
+    original = frame[y0:y1, x0:x1].astype(np.float32)
+    expected[y0:y1, x0:x1] = original + (filtered[y0:y1, x0:x1] - original) * weight + 0.5
+    return expected
+
+def test_blur_box_matches_full_frame():
+    """带边距的模糊框（含羽化边缘）与整帧滤镜后混合的结果逐像素一致，框外不变"""
+    rng = np.random.default_rng(3)
+    frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+    for filter_name in ('gaussian_blur', 'box_blur', 'motion_blur'):
+        # 画面内部、越过左上角、越过右下角的框
+        for box in ((40, 30, 110, 90), (-10, -5, 50, 40), (120, 80, 200, 150)):
+            for feather in (0, 6, 100):
+                expected = _full_frame_reference(frame, filter_name, box, feather)
+                out = frame.copy()
+                FilterEffect.render_region(frame, filter_name, box, out, feather)
+                assert np.array_equal(out, expected), (filter_name, box, feather)
+                # 输出缓冲区就是输入帧
+                out = frame.copy()
+                FilterEffect.render_region(out, filter_name, box, out, feather)
+                assert np.array_equal(out, expected), (filter_name, box, feather)
+
+def test_blur_box_outside_frame():
+    """完全在画面外的框不改变画面"""
+    frame = np.random.default_rng(4).integers(0, 256, (40, 60, 3), dtype=np.uint8)
+    out = frame.copy()
+    FilterEffect.render_region(frame, 'gaussian_blur', (70, 10, 90, 30), out, 4)
+    assert np.array_equal(out, frame)
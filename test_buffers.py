@@ -0,0 +1,41 @@
+import numpy as np
+from reelrush.buffers import FramePool, FrameRing
+
+def test_pool_reuses_buffers():
+    """释放的缓冲区按形状和类型复用，空闲数量有上限"""
+    pool = FramePool(max_free=1)
+    a = pool.acquire((4, 4, 3))
+    assert pool.writable(a)
+    pool.release(a)
+    assert not pool.writable(a)
+    assert pool.acquire((4, 4, 3)) is a
+    assert pool.acquire((4, 4, 3), np.float32) is not a
+    assert (pool.allocations, pool.reuses) == (2, 1)
+
+    b, c = pool.acquire((2, 2)), pool.acquire((2, 2))
+    pool.release(b)
+    pool.release(c)
+    assert pool.acquire((2, 2)) is b
+    assert pool.acquire((2, 2)) is not c
+
+def test_ring_rotates_and_targets():
+    """相邻两帧写入不同的缓冲区；只有临时缓冲区可以原地修改"""
+    pool = FramePool()
+    ring = FrameRing(size=2, pool=pool)
+    first, second = ring.next((4, 4, 3)), ring.next((4, 4, 3))
+    assert first is not second and ring.next((4, 4, 3)) is first
+
+    other = FrameRing(size=2, pool=pool)
+    frame = np.zeros((4, 4, 3), np.uint8)
+    assert other.target(frame, inplace=True) is not frame
+    assert other.target(first, inplace=True) is first
+    assert other.target(first) is not first
+    other.close()
+
+    # 尺寸变化时归还旧缓冲区
+    small = ring.next((2, 2, 3))
+    assert not pool.writable(first) and not pool.writable(second)
+    reused = pool.acquire((4, 4, 3))
+    assert reused is first or reused is second
+    ring.close()
+    assert pool.acquire((2, 2, 3)) is small
@@ -0,0 +1,61 @@
+import numpy as np
+from moviepy.audio.AudioClip import AudioArrayClip
+from reelrush.audio import SAMPLE_RATE
+from reelrush.cost import CostModel, AdmissionController, DEFAULT_PROFILE
+from reelrush.effects_processor import (
+    VideoProcessingParams, GlitchParams, SlowMotionParams, ScoreboardParams, MusicParams
+)
+
+def test_estimate_counts_every_effect(tmp_path):
+    """比分牌、故障模式、慢动作音频伸缩和背景音乐都计入预计耗时"""
+    data = tmp_path / "pbp.csv"
+    data.write_text("time,home_score\n0,0\n")
+    # 与 calibrate() 一样生成一段音调作为背景音乐
+    music = str(tmp_path / "music.m4a")
+    tone = np.sin(2 * np.pi * 440 * np.arange(SAMPLE_RATE) / SAMPLE_RATE)
+    AudioArrayClip(np.stack([tone, tone], 1) * 0.3, fps=SAMPLE_RATE).write_audiofile(music, codec='aac', logger=None)
+    model = CostModel()
+    base = model.estimate(VideoProcessingParams(video_path="origin.mp4"))
+    assert set(base.breakdown) == {'decode', 'encode', 'audio:mix'}
+
+    params = VideoProcessingParams(
+        video_path="origin.mp4",
+        slow_motion_effects=[SlowMotionParams(start_time=1, duration=2, speed=0.5, abruptness=1)],
+        glitch_effects=[GlitchParams(start_time=5, duration=1, modes=['shift', 'rgb_split'], intensity=0.5)],
+        scoreboard=ScoreboardParams(data_path=str(data), start_time=4),
+        music=MusicParams(path=music)
+    )
+    estimate = model.estimate(params)
+    assert estimate.output_duration == base.output_duration + 2
+    megapixels = 320 * 240 / 1e6
+    # 慢动作输出 4 秒的音频需要时间伸缩
+    assert abs(estimate.breakdown['audio:stretch'] - 4 * DEFAULT_PROFILE['audio']['stretch']) < 1e-9
+    assert abs(estimate.breakdown['audio:music'] - estimate.output_duration * DEFAULT_PROFILE['audio']['music']) < 1e-9
+    # 强度 0.5 时 RGB 分离只出现一半的帧
+    expected = 0.5 * 30 * megapixels * DEFAULT_PROFILE['effects']['glitch:rgb_split']
+    assert abs(estimate.breakdown['glitch:rgb_split'] - expected) < 1e-9
+    # 比分牌从源视频 4 秒（输出 6 秒）显示到结束
+    expected = (estimate.output_duration - 6) * 30 * megapixels * DEFAULT_PROFILE['effects']['scoreboard']
+    assert abs(estimate.breakdown['scoreboard'] - expected) < 1e-9
+    assert estimate.seconds > base.seconds
+    assert estimate.peak_memory > base.peak_memory
+
+def test_old_profile_gets_default_audio_costs():
+    """旧版本保存的配置没有音频成本时使用默认值"""
+    profile = {key: value for key, value in DEFAULT_PROFILE.items() if key != 'audio'}
+    estimate = CostModel(profile).estimate(VideoProcessingParams(video_path="origin.mp4"))
+    assert estimate.breakdown['audio:mix'] > 0
+
+def test_admission():
+    """超出能力的任务转走，资源被占用时排队，释放后接受"""
+    model = CostModel()
+    params = VideoProcessingParams(video_path="origin.mp4")
+    memory = model.estimate(params).peak_memory
+    controller = AdmissionController(memory_limit=int(memory * 1.5), max_concurrent=2, model=model)
+    assert controller.admit('a', params)[0] == AdmissionController.ACCEPT
+    assert controller.admit('b', params)[0] == AdmissionController.QUEUE
+    controller.release('a')
+    assert controller.admit('b', params)[0] == AdmissionController.ACCEPT
+    assert AdmissionController(memory_limit=memory - 1, model=model).admit('c', params)[0] == AdmissionController.ROUTE
+    assert AdmissionController(memory_limit=memory * 2, max_seconds=1e-6, model=model).admit('d', params)[0] == \
+        AdmissionController.ROUTE
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from reelrush.curves import Curve, as_curve
+
+def test_curve_keyframes_and_easing():
+    """关键帧之间按各自的缓动插值，超出 0-1 的进度被截断"""
+    curve = Curve([(1, 0), (0, 0), (0.5, 1, 'ease_in')], easing='linear')
+    assert curve(0.25) == pytest.approx(0.5)
+    # 0.5 之后的区间使用 ease_in
+    assert curve(0.75) == pytest.approx(1 - 0.25)
+    assert curve(-1) == 0 and curve(2) == 0
+    assert np.allclose(curve(np.array([0, 0.5, 1])), [0, 1, 0])
+    assert curve.value_range() == (0, 1)
+
+def test_curve_helpers():
+    """常量曲线、线性渐变和数字包装"""
+    assert Curve.constant(3)(0.7) == 3
+    assert Curve.ramp(2, 4)(0.5) == pytest.approx(3)
+    assert as_curve(0.5)(0.2) == 0.5
+    curve = Curve.ramp(0, 1)
+    assert as_curve(curve) is curve
+    with pytest.raises(ValueError):
+        Curve([(0, 0), (1, 1, 'bounce')])
+    with pytest.raises(ValueError):
+        Curve([])
+
+def test_curve_table():
+    """编译成逐帧表后按输出时间查表，开始前和结束后保持端点值"""
+    table = Curve.ramp(0, 1).table(start_time=2, duration=1, fps=10)
+    assert len(table.values) == 11
+    assert table(2.5) == pytest.approx(0.5)
+    assert table(2.04) == 0 and table(2.06) == pytest.approx(0.1)
+    assert table(0) == 0 and table(10) == 1
+    # 覆盖开始时间（例如特效时间被时间映射移动）
+    assert table(5.5, start_time=5) == pytest.approx(0.5)
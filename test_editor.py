@@ -0,0 +1,24 @@
+from reelrush.editor import VideoEditor
+
+def test_describe_records_source_times():
+    """慢动作、冻结帧和滤镜按源视频时间记录，可以按描述重放"""
+    editor = VideoEditor("origin.mp4")
+    editor.add_slow_motion(2, 4, speed=0.5)
+    editor.add_freeze_frame(6, 1)
+    editor.add_filter('sepia', 5, 2)
+    effects = editor.describe()['effects']
+    assert [(e['type'], e['time'], e['duration']) for e in effects] == \
+        [('slow_motion', 2, 2), ('freeze', 6, 1), ('filter', 5, 2)]
+    assert effects[0]['params']['speed'] == 0.5
+    assert effects[2]['params'] == {'name': 'sepia', 'lut_path': None}
+
+    replay = VideoEditor("origin.mp4")
+    for e in effects:
+        if e['type'] == 'slow_motion':
+            replay.add_slow_motion(e['time'], e['time'] + e['duration'], **e['params'])
+        elif e['type'] == 'freeze':
+            replay.add_freeze_frame(e['time'], e['duration'])
+        else:
+            replay.add_filter(e['params']['name'], e['time'], e['duration'], e['params']['lut_path'])
+    assert replay.duration == editor.duration == editor.base_clip.duration + 2 + 1
+    assert replay.describe() == editor.describe()
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+from reelrush.effects import EFFECTS, Effect, EffectChain, FilterEffect, FlashEffect, create_effect, register_effect
+from reelrush.effects.glitch import GlitchEffect
+
+class Brighten(Effect):
+    """逐像素加亮一个矩形区域（测试用）"""
+    name = 'test_brighten'
+    POINTWISE = True
+    INPLACE = True
+
+    def region(self, width, height):
+        return (10, 5, 40, 30)
+
+    def render_frame(self, frame, t, out=None):
+        return np.add(frame, 40, out=out, casting='unsafe') if out is not None else frame + 40
+
+def test_register_effect():
+    """同名的另一个类不能注册，同一个类可以重复注册，没有名称的类不能注册"""
+    assert register_effect(FilterEffect) is FilterEffect
+
+    class Other(Effect):
+        name = 'filter'
+
+    with pytest.raises(ValueError):
+        register_effect(Other)
+    assert EFFECTS['filter'] is FilterEffect
+
+    class Nameless(Effect):
+        pass
+
+    with pytest.raises(ValueError):
+        register_effect(Nameless)
+
+def test_create_effect():
+    """按注册名创建特效，未知名称报错"""
+    effect = create_effect('filter', 'sepia', 1, 2)
+    assert isinstance(effect, FilterEffect) and (effect.start_time, effect.duration) == (1, 2)
+    with pytest.raises(ValueError, match='Unknown effect'):
+        create_effect('no_such_effect', 0, 1)
+
+def test_chain_matches_effects_one_at_a_time():
+    """链式渲染（原地、逐像素只处理区域）与依次单独渲染每个特效的结果相同，且不修改输入帧"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 200, (48, 64, 3), dtype=np.uint8)
+    original = frame.copy()
+    # 暖色和棕褐色的顺序会影响结果
+    effects = [FilterEffect('warm', 0, 1), FilterEffect('sepia', 0, 1), Brighten(0, 1),
+               FlashEffect(0, 1, intensity=0.5), GlitchEffect(0, 1, seed=3)]
+    chain = EffectChain(effects)
+    chain.fps = 30
+    for effect in effects:
+        effect.prepare(30)
+
+    t = 0.5
+    expected = frame.copy()
+    for effect in effects:
+        box = effect.region(64, 48)
+        if box is None:
+            expected = np.array(effect.render_frame(expected.copy(), t), copy=True)
+        else:
+            # 特效只改变自己的区域
+            x0, y0, x1, y1 = box
+            expected[y0:y1, x0:x1] = effect.render_frame(expected[y0:y1, x0:x1].copy(), t)
+    assert np.array_equal(chain.render(frame, t), expected)
+    assert np.array_equal(frame, original)
+
+    # 顺序反过来结果不同
+    swapped = EffectChain([FilterEffect('sepia', 0, 1), FilterEffect('warm', 0, 1)])
+    in_order = EffectChain(effects[:2])
+    assert not np.array_equal(swapped.render(frame, t), in_order.render(frame, t))
+
+def test_chain_reuses_buffer_for_inplace_effects():
+    """连续的原地特效在第一个特效的缓冲区中计算，不再分配新的帧"""
+    frame = np.full((16, 16, 3), 100, np.uint8)
+    chain = EffectChain([FlashEffect(0, 1), FlashEffect(0, 1), Brighten(0, 1)])
+    chain.fps = 30
+    for effect in chain.effects:
+        effect.prepare(30)
+    result = chain.render(frame, 0.5)
+    assert result is chain._rings[id(chain.effects[0])]._buffers[-1]
+    assert not chain._rings[id(chain.effects[1])]._buffers
+
+def test_chain_skips_inactive_effects():
+    """不在时间窗口内的特效不处理帧，直接返回输入"""
+    frame = np.full((8, 8, 3), 10, np.uint8)
+    chain = EffectChain([FilterEffect('warm', 1, 1), Brighten(2, 1)])
+    assert chain.render(frame, 0.5) is frame
+    # 区域完全在画面之外时同样直接返回输入
+    assert chain.render(frame, 2.5) is frame
@@ -0,0 +1,12 @@
+from reelrush.equivalence import format_report, run
+
+def test_effect_equivalence():
+    """对比优化后的特效与参考实现，画面偏移时失败"""
+    results = run(repeats=1)
+    print(format_report(results))
+    drifted = [r.name for r in results if not r.passed]
+    assert not drifted, f"Effects drifted from their reference: {drifted}"
+
+if __name__ == "__main__":
+    results = run()
+    print(format_report(results))
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from reelrush.effects.glitch import MODES, GlitchEffect, GlitchPlan
+
+def _frame(height=20, width=12):
+    """每个像素的值互不相同（按通道区分）的小画面"""
+    values = np.arange(height * width, dtype=np.uint8).reshape(height, width)
+    return np.stack([values, values // 2 + 100, 255 - values], -1)
+
+def test_enabling_modes_keeps_other_draws():
+    """启用其他模式不改变切片偏移和其余模式的随机值"""
+    shift_only = GlitchPlan(42, 0, 30, 30, ('shift',))
+    everything = GlitchPlan(42, 0, 30, 30, MODES)
+    split_only = GlitchPlan(42, 0, 30, 30, ('rgb_split',))
+    frame = _frame(40, 64)
+    for index in range(31):
+        assert np.array_equal(shift_only.frames[index]['shift'], everything.frames[index]['shift'])
+        if 'rgb_split' in split_only.frames[index]:
+            assert np.array_equal(split_only.frames[index]['rgb_split'], everything.frames[index]['rgb_split'])
+        else:
+            assert 'rgb_split' not in everything.frames[index]
+        # 只取平移操作时两个计划的输出相同
+        shift_ops = [op for op in everything.ops_at(index / 30, 40, 64) if op[0] == 'shift']
+        assert np.array_equal(GlitchEffect.render_plan(frame, shift_ops),
+                              GlitchEffect.render_plan(frame, shift_only.ops_at(index / 30, 40, 64)))
+    # 强度为 0 时只剩切片偏移
+    calm = GlitchPlan(42, 0, 30, 30, MODES, intensity=0)
+    assert all(list(frame_ops) == ['shift'] for frame_ops in calm.frames.values())
+
+def test_unknown_mode():
+    """未知的故障模式报错"""
+    with pytest.raises(ValueError, match='Unknown glitch modes'):
+        GlitchPlan(1, 0, 10, 30, ('shift', 'melt'))
+    with pytest.raises(ValueError):
+        GlitchEffect(0, 1, modes=('melt',))
+
+def test_render_shift():
+    """每个切片整体平移，空出的部分为黑色"""
+    frame = _frame()
+    shifts = np.zeros((10, 2), int)
+    shifts[0] = (3, 0)
+    shifts[1] = (0, 1)
+    out = GlitchEffect.render_plan(frame, [('shift', shifts)])
+    assert np.array_equal(out[0:2, 3:], frame[0:2, :-3]) and out[0:2, :3].max() == 0
+    assert np.array_equal(out[3, :], frame[2, :]) and out[2].max() == 0
+    assert np.array_equal(out[4:], frame[4:])
+
+def test_render_rgb_split():
+    """红、蓝通道反向错开，绿色通道不变"""
+    frame = _frame()
+    out = GlitchEffect.render_plan(frame, [('rgb_split', (2, 1))])
+    assert np.array_equal(out[1:, 2:, 0], frame[:-1, :-2, 0])
+    assert np.array_equal(out[:-1, :-2, 2], frame[1:, 2:, 2])
+    assert np.array_equal(out[:, :, 1], frame[:, :, 1])
+    assert out[0, :, 0].max() == 0 and out[-1, :, 2].max() == 0
+
+def test_render_blocks():
+    """方块从源位置复制到目标位置，其余像素不变"""
+    frame = _frame()
+    out = GlitchEffect.render_plan(frame, [('blocks', [(4, 3, 1, 2, 6, 10)])])
+    assert np.array_equal(out[10:13, 6:10], frame[2:5, 1:5])
+    out[10:13, 6:10] = frame[10:13, 6:10]
+    assert np.array_equal(out, frame)
+
+def test_render_scanlines():
+    """扫描线带内的每段水平环绕错开"""
+    frame = _frame()
+    out = GlitchEffect.render_plan(frame, [('scanlines', [(4, 7, 5), (7, 9, 0)])])
+    assert np.array_equal(out[4:7], np.roll(frame[4:7], 5, axis=1))
+    assert np.array_equal(out[:4], frame[:4]) and np.array_equal(out[7:], frame[7:])
+
+def test_render_quantize():
+    """量化带内丢弃低位，带外不变"""
+    frame = _frame()
+    out = GlitchEffect.render_plan(frame, [('quantize', (5, 9, np.uint8(0xF0)))])
+    assert np.array_equal(out[5:9], frame[5:9] & 0xF0)
+    assert np.array_equal(out[:5], frame[:5]) and np.array_equal(out[9:], frame[9:])
@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import numpy as np
+from moviepy import VideoFileClip
+from moviepy.config import FFMPEG_BINARY
+from reelrush.keyframes import KeyframeIndex, open_video
+
+def _make_video(path, gop=15):
+    """生成 3 秒、每 gop 帧一个关键帧的测试视频"""
+    subprocess.run([FFMPEG_BINARY, '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=size=160x120:rate=30',
+                    '-t', '3', '-c:v', 'libx264', '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+                    '-pix_fmt', 'yuv420p', str(path)], check=True)
+    return str(path)
+
+def test_build_and_sidecar(tmp_path):
+    """扫描数据包得到关键帧，索引写入旁边的文件，文件改变后重建"""
+    path = _make_video(tmp_path / "gop.mp4")
+    index = KeyframeIndex.build(path)
+    assert index.packets == 90
+    assert np.allclose(index.keyframes, np.arange(6) * 0.5)
+    assert index.keyframe_before(1.2) == 1.0
+    assert index.keyframe_before(1.0) == 1.0
+    assert index.keyframe_before(-1) == 0
+
+    loaded = KeyframeIndex.for_file(path)
+    with open(KeyframeIndex.sidecar_path(path)) as f:
+        assert json.load(f)['keyframes'] == loaded.keyframes
+
+    # 重新编码成不同的关键帧间隔后，过期的索引被重建
+    _make_video(tmp_path / "gop.mp4", gop=30)
+    assert np.allclose(KeyframeIndex.for_file(path).keyframes, [0, 1, 2])
+
+def test_indexed_reader_matches_plain_reader(tmp_path):
+    """按关键帧跳转读取的帧与 MoviePy 逐帧读取的结果相同"""
+    path = _make_video(tmp_path / "gop.mp4")
+    indexed = open_video(path, audio=False)
+    plain = VideoFileClip(path, audio=False)
+    reopens = []
+    for t in [2.5, 0.2, 1.0, 1.1, 2.9, 0.0]:
+        assert np.array_equal(indexed.get_frame(t), plain.get_frame(t)), t
+        reopens.append(indexed.reader.reopens)
+    # 向后跳转和远距离前跳从关键帧重新打开，短距离前跳（1.0 -> 1.1）顺序读取
+    assert reopens == [1, 2, 3, 3, 4, 5]
+    indexed.close()
+    plain.close()
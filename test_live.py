@@ -0,0 +1,91 @@
+import os
+import subprocess
+import threading
+import time
+from moviepy.config import FFMPEG_BINARY
+from reelrush.effects_processor import VideoProcessingParams, FilterParams
+from reelrush.live import GrowingFileFollower, LiveHighlighter
+
+def _recording(tmp_path, duration=4):
+    """生成一段可流式读取的 Matroska 录像（测试图案，30fps）"""
+    path = str(tmp_path / "source.mkv")
+    subprocess.run([FFMPEG_BINARY, '-v', 'error', '-f', 'lavfi', '-i', f'testsrc=size=160x120:rate=30:duration={duration}',
+                    '-c:v', 'libx264', '-g', '15', '-pix_fmt', 'yuv420p', path], check=True)
+    with open(path, 'rb') as f:
+        return f.read()
+
+def _grow(data, path, steps=8, pause=0.15):
+    """分几次把录像追加到 path，模拟仍在写入的文件"""
+    def write():
+        step = len(data) // steps + 1
+        with open(path, 'wb') as f:
+            for i in range(0, len(data), step):
+                f.write(data[i:i + step])
+                f.flush()
+                time.sleep(pause)
+
+    thread = threading.Thread(target=write, daemon=True)
+    thread.start()
+    return thread
+
+def test_follower_tracks_landed_source(tmp_path):
+    """已到达的时长随写入增长，落地时间可查，没有新数据一段时间后结束"""
+    data = _recording(tmp_path)
+    path = str(tmp_path / "live.mkv")
+    writer = _grow(data, path)
+    follower = GrowingFileFollower(path, poll_interval=0.05, idle_timeout=0.6).start()
+    try:
+        seen = []
+        while not follower.finished:
+            seen.append(follower.available)
+            follower.wait(0.05)
+        writer.join()
+        assert seen == sorted(seen)
+        assert 0 < min(value for value in seen if value > 0) < 3.5
+        assert abs(follower.available - (4 - 1 / 30)) < 0.1
+        # 早到达的源时间落地得更早，还没到达的时间返回 None
+        assert follower.landing_time(0.5) <= follower.landing_time(3.5)
+        assert follower.landing_time(10) is None
+    finally:
+        follower.stop()
+
+def test_highlighter_publishes_segments(tmp_path, monkeypatch):
+    """源片段到达后渲染高光，每个分片写好后立即重写播放列表，录像结束后写入 ENDLIST"""
+    data = _recording(tmp_path)
+    source = str(tmp_path / "live.mkv")
+    output_dir = str(tmp_path / "hls")
+    highlighter = LiveHighlighter(source, output_dir, segment_duration=1.0, poll_interval=0.05, idle_timeout=0.6,
+                                  safety_margin=0.2)
+    playlists = []
+    write_playlist = highlighter._write_playlist
+
+    def recording_write_playlist(final=False):
+        write_playlist(final)
+        with open(highlighter.playlist_path) as f:
+            playlists.append(f.read())
+
+    monkeypatch.setattr(highlighter, '_write_playlist', recording_write_playlist)
+    highlighter.add_highlight(VideoProcessingParams(video_path=None, source_ranges=[(1, 3)],
+                                                    filter_effects=[FilterParams(0, 1, 'sepia')]))
+    writer = _grow(data, source)
+    report = highlighter.run()
+    writer.join()
+
+    assert [segment['uri'] for segment in report['segments']] == ['segment_00000.ts', 'segment_00001.ts']
+    assert all(segment['duration'] == 1.0 and segment['latency'] >= 0 for segment in report['segments'])
+    for segment in report['segments']:
+        assert os.path.getsize(os.path.join(output_dir, segment['uri'])) > 0
+    # 第一个分片写好时播放列表就只有它，最终的播放列表才有 ENDLIST
+    assert playlists[0].count('#EXTINF') == 1 and '#EXT-X-ENDLIST' not in playlists[0]
+    assert playlists[-1].count('#EXTINF') == 2 and playlists[-1].rstrip().endswith('#EXT-X-ENDLIST')
+    assert not os.path.exists(highlighter.playlist_path + '.tmp')
+
+def test_highlighter_drops_highlights_past_the_end(tmp_path):
+    """录像结束时仍未到达的高光被丢弃，run() 正常返回"""
+    data = _recording(tmp_path, duration=2)
+    source = str(tmp_path / "live.mkv")
+    highlighter = LiveHighlighter(source, str(tmp_path / "hls"), poll_interval=0.05, idle_timeout=0.5)
+    highlighter.add_highlight(VideoProcessingParams(video_path=None, source_ranges=[(5, 6)]))
+    writer = _grow(data, source, steps=2, pause=0.05)
+    assert highlighter.run()['segments'] == []
+    writer.join()
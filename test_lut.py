@@ -0,0 +1,68 @@
+import os
+import numpy as np
+import pytest
+from reelrush.effects.lut import ColorLut, load_cube
+
+def _write_cube(path, size=2, extra=''):
+    """写入一个线性 LUT：(r, g, b) -> (1 - r, g / 2, b)，三线性插值对它是精确的"""
+    levels = np.linspace(0, 1, size)
+    with open(path, 'w') as f:
+        f.write(f'# test look\nTITLE "Invert red"\nLUT_3D_SIZE {size}\nLUT_3D_INPUT_RANGE 0 1\n{extra}')
+        for b in levels:
+            for g in levels:
+                for r in levels:
+                    f.write(f'{1 - r:.6f} {g / 2:.6f} {b:.6f}\n')
+    return str(path)
+
+def test_load_cube(tmp_path):
+    """解析标题、定义域和数据行，R 变化最快"""
+    table, domain_min, domain_max, title = load_cube(_write_cube(tmp_path / "a.cube", 3))
+    assert title == 'Invert red'
+    assert domain_min == (0, 0, 0) and domain_max == (1, 1, 1)
+    assert table.shape == (3, 3, 3, 3)
+    assert np.allclose(table[0, 0, 2], [0, 0, 0])   # r = 1
+    assert np.allclose(table[2, 1, 0], [1, 0.25, 1])  # b = 1, g = 0.5, r = 0
+
+def test_load_cube_errors(tmp_path):
+    """缺少尺寸、条目数不符和 1D LUT 都报错"""
+    path = tmp_path / "bad.cube"
+    path.write_text("0 0 0\n")
+    with pytest.raises(ValueError):
+        load_cube(str(path))
+    path.write_text("LUT_3D_SIZE 2\n0 0 0\n")
+    with pytest.raises(ValueError):
+        load_cube(str(path))
+    path.write_text("LUT_1D_SIZE 2\n0 0 0\n1 1 1\n")
+    with pytest.raises(ValueError):
+        load_cube(str(path))
+
+def test_lookup_and_render(tmp_path):
+    """三线性插值与稠密表的结果一致"""
+    lut = ColorLut(*load_cube(_write_cube(tmp_path / "a.cube", 5)))
+    assert np.allclose(lut.lookup([[0.2, 0.4, 0.6]]), [[0.8, 0.2, 0.6]], atol=1e-6)
+
+    frame = np.random.default_rng(0).integers(0, 256, (24, 32, 3), dtype=np.uint8)
+    expected = np.stack([255 - frame[..., 0].astype(int), frame[..., 1] / 2, frame[..., 2]], -1)
+    exact = lut.render(frame, dense=False)
+    assert np.abs(exact - expected).max() <= 1
+    assert np.array_equal(lut.render(frame), exact)
+    # 原地调色
+    graded = frame.copy()
+    lut.render(graded, out=graded)
+    assert np.array_equal(graded, exact)
+
+def test_domain(tmp_path):
+    """定义域之外的输入被截断到端点"""
+    lut = ColorLut(*load_cube(_write_cube(tmp_path / "a.cube", extra='DOMAIN_MIN 0 0 0\nDOMAIN_MAX 0.5 0.5 0.5\n')))
+    assert np.allclose(lut.lookup([0.25, 0.25, 0.25]), [0.5, 0.25, 0.5])
+    assert np.allclose(lut.lookup([1, 1, 1]), [0, 0.5, 1])
+
+def test_load_is_cached(tmp_path):
+    """同一文件只加载一次，文件改变后重新加载"""
+    path = _write_cube(tmp_path / "a.cube")
+    lut = ColorLut.load(path)
+    assert ColorLut.load(path) is lut
+    _write_cube(tmp_path / "a.cube", 3)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    reloaded = ColorLut.load(path)
+    assert reloaded is not lut and reloaded.size == 3
@@ -0,0 +1,26 @@
+import numpy as np
+from reelrush.buffers import frame_pool
+from reelrush.memo import FrameMemo
+
+def test_memo_reuses_result_for_same_input():
+    """输入帧是同一个数组且参数不变时直接复用上一结果"""
+    calls = []
+
+    def invert(frame, out):
+        calls.append(1)
+        np.subtract(255, frame, out=out)
+        return out
+
+    memo = FrameMemo()
+    frame = np.full((4, 4, 3), 10, np.uint8)
+    first = memo.render(invert, frame, key=0.5)
+    assert memo.render(invert, frame, key=0.5) is first
+    assert (memo.hits, memo.misses, len(calls)) == (1, 1, 1)
+    assert first[0, 0, 0] == 245
+
+    # 参数改变或输入换成内容相同的另一个数组都会重新计算
+    memo.render(invert, frame, key=0.6)
+    memo.render(invert, frame.copy(), key=0.6)
+    assert (memo.hits, memo.misses) == (1, 3)
+    # 记忆化的输出不是临时缓冲区，下游特效不能原地修改
+    assert not frame_pool.writable(first)
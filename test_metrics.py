@@ -0,0 +1,61 @@
+import pytest
+from reelrush import metrics
+from reelrush.effects_processor import VideoProcessingParams, build_editor
+from reelrush.live import LiveHighlighter
+from reelrush.progress import RenderProgressLogger
+
+def test_exposition_format():
+    """计数器带 _total 后缀，直方图输出累计分桶、总和与个数"""
+    registry = metrics.MetricsRegistry()
+    counter = registry.counter('demo_frames', 'Frames', ('kind',))
+    histogram = registry.histogram('demo_seconds', 'Seconds', buckets=(0.1, 1))
+    counter.labels(kind='a"b').inc(2)
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    text = registry.expose()
+    assert 'demo_frames_total{kind="a\\"b"} 2.0' in text
+    assert 'demo_seconds_bucket{le="0.1"} 1.0' in text
+    assert 'demo_seconds_bucket{le="+Inf"} 2.0' in text
+    assert 'demo_seconds_count 2.0' in text
+    # 同名指标只能以相同的类型和标签重复注册
+    assert registry.counter('demo_frames', 'Frames', ('kind',)) is counter
+    with pytest.raises(ValueError):
+        registry.gauge('demo_frames', 'Frames')
+    with pytest.raises(ValueError):
+        counter.inc()
+
+def test_render_updates_metrics(tmp_path):
+    """渲染期间活动任务数加一，结束后恢复；每帧记录帧数和各阶段耗时"""
+    active = metrics.active_jobs.labels()
+    frames_before = metrics.frames_rendered.labels().value
+    counts_before = {name: child.count for name, child in (('decode', metrics.decode_seconds),
+                                                          ('effects', metrics.effects_seconds),
+                                                          ('encode', metrics.encode_seconds))}
+    active_before = active.value
+    during = []
+    logger = RenderProgressLogger(30, lambda progress: during.append(active.value), min_interval=0)
+
+    editor = build_editor(VideoProcessingParams(video_path="origin.mp4", source_ranges=[(1, 2)]))
+    editor.save(str(tmp_path / "out.mp4"), fps=30, logger=logger)
+
+    assert during and set(during) == {active_before + 1}
+    assert active.value == active_before
+    assert metrics.frames_rendered.labels().value == frames_before + 30
+    assert metrics.decode_seconds.count == counts_before['decode'] + 30
+    assert metrics.effects_seconds.count == counts_before['effects'] + 30
+    # 编码耗时在两帧之间测量
+    assert metrics.encode_seconds.count == counts_before['encode'] + 29
+    assert metrics.decode_seconds.sum > 0
+    assert 'reelrush_frames_rendered_total' in metrics.registry.expose()
+
+def test_queue_depth_follows_live_queue(tmp_path, monkeypatch):
+    """实时高光的等待队列长度反映在 queue_depth 中"""
+    depth = metrics.queue_depth.labels(queue='live_highlights')
+    highlighter = LiveHighlighter(str(tmp_path / "live.mkv"), str(tmp_path / "hls"))
+    highlighter.add_highlight(VideoProcessingParams(video_path=None, source_ranges=[(1, 2)]))
+    highlighter.add_highlight(VideoProcessingParams(video_path=None, source_ranges=[(5, 6)]))
+    assert depth.value == 2
+    monkeypatch.setattr(type(highlighter.follower), 'available', property(lambda self: 3.0))
+    assert highlighter._next_ready().source_ranges == [(1, 2)]
+    assert depth.value == 1
+    assert highlighter._next_ready() is None
@@ -0,0 +1,16 @@
+import os
+import time
+import reelrush.parallel as parallel
+from reelrush.effects_processor import VideoProcessingParams, GlitchParams
+
+def _crashing_decoder(*args):
+    """解码进程还没送出任何帧就异常退出"""
+    os._exit(3)
+
+def test_decoder_crash_fails_render(monkeypatch, tmp_path):
+    """解码进程异常退出时渲染失败，而不是一直等待帧"""
+    monkeypatch.setattr(parallel, '_decode', _crashing_decoder)
+    params = VideoProcessingParams(video_path="origin.mp4", glitch_effects=[GlitchParams(0.5, 0.5)])
+    start = time.time()
+    assert not parallel.process_video_effects_parallel(params, str(tmp_path / "out.mp4"), workers=1)
+    assert time.time() - start < 30
@@ -0,0 +1,38 @@
+import numpy as np
+from moviepy import VideoFileClip
+from reelrush.effects_processor import VideoProcessingParams, TextEffectParams, build_editor
+from reelrush.effects.glitch import GlitchPlan
+from reelrush.quality import plan_resolution, render_with_deadline
+
+def test_plan_resolution():
+    """预计耗时远超期限时降低分辨率，尺寸保持偶数"""
+    assert plan_resolution(10, 20, (1280, 720)) == (1.0, (1280, 720))
+    assert plan_resolution(5000, 600, (1280, 720)) == (0.5, (640, 360))
+    assert plan_resolution(100, 30, (321, 241))[1] == (240, 180)
+
+def test_build_editor_downscales_before_effects():
+    """先缩小输入再叠加特效，像素单位的参数同比缩小"""
+    params = VideoProcessingParams(
+        video_path="origin.mp4",
+        text_effects=[TextEffectParams(start_time=0, duration=1, text="GOAL", fontsize=80, position=(100, 60))]
+    )
+    editor = build_editor(params, size=(160, 120))
+    assert tuple(editor.base_clip.size) == (160, 120)
+    assert editor.clip.get_frame(0.5).shape == (120, 160, 3)
+    text = editor.describe()['effects'][0]['params']
+    assert text['fontsize'] == 40 and text['position'] == [50, 30]
+
+def test_glitch_shift_scales_with_resolution():
+    """切片偏移以原分辨率像素为单位，随输出分辨率缩放"""
+    plan = GlitchPlan(1, 0, 0, 30)
+    full = dict(plan.ops_at(0, 240, 320))['shift']
+    half = dict(plan.ops_at(0, 120, 160, 0.5))['shift']
+    assert np.array_equal(half, np.round(full * 0.5))
+
+def test_render_with_deadline_lowers_resolution(tmp_path):
+    """分辨率在构建编辑之前确定，输出为缩小后的尺寸"""
+    params = VideoProcessingParams(video_path="origin.mp4", source_ranges=[(0, 1)])
+    output = str(tmp_path / "out.mp4")
+    report = render_with_deadline(params, output, deadline=60, estimate_seconds=1000)
+    assert report['resolution_scale'] == 0.5
+    assert tuple(VideoFileClip(output).size) == (160, 120)
@@ -0,0 +1,23 @@
+from reelrush.effects_processor import VideoProcessingParams, ScoreboardParams, SlowMotionParams, build_editor
+from reelrush.effects.scoreboard import Scoreboard
+
+def _scoreboard(editor):
+    return next(effect for chain in editor.chains for effect in chain.effects if isinstance(effect, Scoreboard))
+
+def test_data_times_follow_source_ranges(tmp_path):
+    """只使用部分时间段时，比分牌仍按原视频时间取数据"""
+    data = tmp_path / "pbp.csv"
+    data.write_text("time,home_score\n0,0\n3,2\n7,5\n")
+    params = VideoProcessingParams(
+        video_path="origin.mp4",
+        source_ranges=[(2, 4), (6, 8)],
+        slow_motion_effects=[SlowMotionParams(start_time=0, duration=1, speed=0.5, abruptness=1)],
+        scoreboard=ScoreboardParams(data_path=str(data))
+    )
+    scoreboard = _scoreboard(build_editor(params))
+    # 输出 0-2 秒是放慢的剪辑片段 0-1 秒，即原视频 2-3 秒
+    assert abs(scoreboard._data_time(1.0) - 2.5) < 1e-6
+    # 输出 4 秒 -> 片段 3 秒 -> 第二段原视频 7 秒
+    assert abs(scoreboard._data_time(4.0) - 7.0) < 1e-6
+    assert scoreboard.data.values_at(scoreboard._data_time(3.5))['home_score'] == 2
+    assert scoreboard.data.values_at(scoreboard._data_time(4.5))['home_score'] == 5
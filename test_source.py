@@ -0,0 +1,23 @@
+import numpy as np
+from reelrush.source import SharedSource, merge_ranges
+from reelrush.effects.transition import TransitionEffect
+
+def test_merge_ranges():
+    """重叠或相接的时间段合并成一段"""
+    assert merge_ranges([(5, 6), (0, 2), (1, 3), (3, 4)]) == [(0, 4), (5, 6)]
+
+def test_crossfade_does_not_seek():
+    """转场重叠区间内两段各用一个解码器顺序读取，不会来回跳转"""
+    source = SharedSource("origin.mp4")
+    pieces = [source.clip_for([(1, 4)]), source.clip_for([(6, 9)])]
+    clip = TransitionEffect.concatenate(pieces, 'crossfade', 0.5)
+    frames = [clip.get_frame(i / source.fps) for i in range(int(clip.duration * source.fps))]
+    assert len(source.readers) == 2
+    assert sum(reader.reopens for reader in source.readers) <= 2
+    assert source.decoded_frames <= len(frames) + int(0.5 * source.fps) + 2
+
+    # 与单独解码的结果一致
+    reference = SharedSource("origin.mp4", max_readers=1)
+    assert np.array_equal(frames[-1], reference.get_frame(9 - 1 / source.fps))
+    source.close()
+    reference.close()
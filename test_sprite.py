@@ -0,0 +1,70 @@
+import numpy as np
+from reelrush.effects.sprite import TextSprite, SpritePyramid
+
+def _white_sprite(width=200, height=80):
+    return TextSprite(np.full((height, width, 3), 255, np.uint8), np.ones((height, width)))
+
+def test_sprite_blend_roi():
+    """精灵只改变覆盖的区域，部分超出画面时被裁剪"""
+    frame = np.zeros((120, 160, 3), np.uint8)
+    out = _white_sprite(40, 20).blend(frame, 150, 110)
+    assert out[110:, 150:].min() == 255
+    assert out[:110].max() == 0 and out[:, :150].max() == 0
+
+def _full_frame_composite(frame, sprite, x, y, opacity):
+    """参考实现：把精灵铺到整帧大小的画布上，对整帧做浮点混合"""
+    h, w = frame.shape[:2]
+    pad = 64  # 画布四周留出的边，足够放下画面外的精灵
+    alpha = np.zeros((h + 2 * pad, w + 2 * pad, 1), np.float32)
+    color = np.zeros((h + 2 * pad, w + 2 * pad, 3), np.float32)
+    alpha[pad + y:pad + y + sprite.height, pad + x:pad + x + sprite.width] = sprite.alpha
+    color[pad + y:pad + y + sprite.height, pad + x:pad + x + sprite.width] = sprite.premultiplied
+    alpha, color = alpha[pad:pad + h, pad:pad + w], color[pad:pad + h, pad:pad + w]
+    return (frame * (1 - opacity * alpha) + opacity * color + 0.5).astype(np.uint8)
+
+def test_sprite_blend_matches_full_frame():
+    """只合成覆盖区域与整帧合成逐像素一致，包括在画面四边被裁剪的精灵"""
+    rng = np.random.default_rng(7)
+    frame = rng.integers(0, 256, (60, 80, 3), dtype=np.uint8)
+    sprite = TextSprite(rng.integers(0, 256, (20, 30, 3), dtype=np.uint8), rng.random((20, 30)))
+    for x, y in ((25, 20), (-12, 15), (65, 30), (30, -8), (20, 50), (-10, -10), (70, 52), (-40, 10), (80, 0)):
+        for opacity in (1.0, 0.4):
+            expected = _full_frame_composite(frame, sprite, x, y, opacity)
+            assert np.array_equal(sprite.blend(frame, x, y, opacity), expected), (x, y, opacity)
+            # 直接写回输入帧
+            out = frame.copy()
+            sprite.blend(out, x, y, opacity, out)
+            assert np.array_equal(out, expected), (x, y, opacity)
+
+def test_pyramid_keeps_opacity():
+    """缩放动画中不透明的精灵在任何比例下都保持不透明"""
+    pyramid = SpritePyramid(_white_sprite())
+    frame = np.zeros((240, 320, 3), np.uint8)
+    for scale in (1.0, 0.96, 0.917, 0.88, 0.5, 0.3):
+        out = pyramid.blend(frame, 160, 120, scale)
+        assert out[120, 160].min() == 255, scale
+        width = np.count_nonzero(out[120, :, 0])
+        assert abs(width - 200 * scale) <= 2, scale
+
+def test_pyramid_fades_below_smallest_level():
+    """比最小一级更小时按比例淡出"""
+    pyramid = SpritePyramid(_white_sprite(), min_scale=0.5)
+    out = pyramid.blend(np.zeros((240, 320, 3), np.uint8), 160, 120, pyramid.scales[-1] / 2)
+    assert 100 < out[120, 160, 0] < 155
+
+def test_pyramid_resamples_each_size_once(monkeypatch):
+    """同一像素尺寸只从最近的一级缩放一次，之后直接复用"""
+    pyramid = SpritePyramid(_white_sprite())
+    calls = []
+    resized = TextSprite.resized
+    monkeypatch.setattr(TextSprite, 'resized', lambda self, w, h: calls.append((self.width, w)) or resized(self, w, h))
+    frame = np.zeros((240, 320, 3), np.uint8)
+    first = pyramid.blend(frame, 160, 120, 0.7).copy()
+    # 0.7 在 2^-4/8 ≈ 0.707 和 2^-5/8 ≈ 0.648 之间，从 0.707 那一级缩小
+    assert calls == [(pyramid.levels[4].width, 140)]
+    assert np.array_equal(pyramid.blend(frame, 160, 120, 0.7), first)
+    pyramid.blend(frame, 160, 120, 0.701)
+    assert len(calls) == 1
+    # 正好落在某一级上时不需要缩放
+    assert pyramid.sprite_at(pyramid.scales[3]) is pyramid.levels[3]
+    assert len(calls) == 1
@@ -0,0 +1,59 @@
+import os
+import shutil
+import numpy as np
+from reelrush.effects.sprite import TextSprite
+from reelrush.effects.text import DynamicText
+from reelrush.effects.text_cache import FontIndex, SpriteCache
+
+def _render_counter():
+    """返回渲染函数和调用次数；alpha 带有 8 位以下的小数"""
+    calls = []
+
+    def render():
+        calls.append(1)
+        alpha = np.linspace(0, 1, 7 * 5).reshape(5, 7) ** 1.3
+        return TextSprite(np.full((5, 7, 3), 200, np.uint8), alpha)
+
+    return render, calls
+
+def test_memory_and_disk_hits(tmp_path):
+    """第二次从内存命中；新进程（新缓存对象）从磁盘命中，结果与内存中的完全相同"""
+    render, calls = _render_counter()
+    cache = SpriteCache(str(tmp_path))
+    key = SpriteCache.key('GOAL', 'font.ttf', 70, 'white', 'black', 2)
+    first = cache.get(key, render)
+    assert cache.get(key, render) is first
+    assert (cache.hits, cache.disk_hits, cache.misses, len(calls)) == (1, 0, 1, 1)
+
+    other = SpriteCache(str(tmp_path))
+    loaded = other.get(key, render)
+    assert (other.disk_hits, other.misses, len(calls)) == (1, 0, 1)
+    assert np.array_equal(loaded.alpha, first.alpha) and np.array_equal(loaded.rgb, first.rgb)
+    frame = np.full((20, 20, 3), 30, np.uint8)
+    assert np.array_equal(loaded.blend(frame, 3, 4, 0.8), first.blend(frame, 3, 4, 0.8))
+
+def test_key_changes_with_parameters_and_font(tmp_path):
+    """文字参数或字体文件改变时使用新的缓存项"""
+    key = SpriteCache.key('GOAL', 'font.ttf', 70, 'white', 'black', 2, (100, 1))
+    assert key == SpriteCache.key('GOAL', 'font.ttf', 70, 'white', 'black', 2, (100, 1))
+    assert key != SpriteCache.key('GOAL', 'font.ttf', 72, 'white', 'black', 2, (100, 1))
+    assert key != SpriteCache.key('GOAL', 'font.ttf', 70, 'red', 'black', 2, (100, 1))
+    assert key != SpriteCache.key('GOAL', 'font.ttf', 70, 'white', 'black', 2, (100, 2))
+
+    # 字体文件更新后，新的字体索引给出不同的签名
+    font = tmp_path / "font.ttf"
+    shutil.copy(DynamicText.get_font_path('default'), font)
+    presets = {'default': {'linux': str(font), 'darwin': str(font), 'windows': str(font)}}
+    before = FontIndex(presets).signature(str(font))
+    os.utime(font, (1, 1))
+    assert FontIndex(presets).signature(str(font)) != before
+
+def test_text_sprites_go_to_configured_cache(tmp_path, monkeypatch):
+    """文字精灵写入指定的缓存目录，重复的文字不再光栅化"""
+    cache = SpriteCache(str(tmp_path))
+    monkeypatch.setattr('reelrush.effects.text.sprite_cache', cache)
+    sprite = DynamicText.get_sprite('GOAL', fontsize=30)
+    assert DynamicText.get_sprite('GOAL', fontsize=30) is sprite
+    assert DynamicText.get_sprite('GOAL', fontsize=32) is not sprite
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(list(tmp_path.rglob('*.npz'))) == 2
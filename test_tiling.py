@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+from reelrush.effects.filter import FilterEffect
+from reelrush.effects.zoom import DynamicZoom
+from reelrush.quality import QualitySettings, quality
+from reelrush.tiling import TileExecutor
+
+def _frame():
+    """1080p 的随机纹理帧，足够大才会分块"""
+    return np.random.default_rng(0).integers(0, 256, (1080, 1920, 3), dtype=np.uint8)
+
+def test_tiled_filters_match_whole_frame():
+    """带状分块（带光晕）的模糊和毛玻璃与整帧计算结果相同"""
+    frame = _frame()
+    executor = TileExecutor(threads=4)
+    assert executor.should_tile(frame) and len(executor.bands(1080)) == 4
+    try:
+        for name in ('gaussian_blur', 'box_blur', 'motion_blur'):
+            whole = FilterEffect.FILTERS[name](frame)
+            tiled = executor.filter(FilterEffect.FILTERS[name], frame, FilterEffect.HALO[name])
+            assert np.array_equal(tiled, whole), name
+        for scale in (1.0, 0.5):
+            with quality(QualitySettings(glass_noise_scale=scale)):
+                whole = FilterEffect.FILTERS['glass'](frame, seed=7)
+                tiled = executor.filter(FilterEffect.FILTERS['glass'], frame, FilterEffect.HALO['glass'],
+                                        rows=True, seed=7)
+            assert np.array_equal(tiled, whole), scale
+    finally:
+        executor.close()
+
+def test_tiled_glass_is_deterministic(monkeypatch):
+    """毛玻璃的种子在分块前取一次，重设全局随机数后结果不变"""
+    frame = _frame()
+    executor = TileExecutor(threads=4)
+    monkeypatch.setattr('reelrush.effects.filter.tile_executor', executor)
+    try:
+        results = []
+        for _ in range(2):
+            np.random.seed(3)
+            results.append(FilterEffect.render(frame, 'glass'))
+        assert np.array_equal(*results)
+    finally:
+        executor.close()
+
+def test_tiled_zoom_matches_whole_frame(monkeypatch):
+    """缩放按横带直接计算输出，与整帧 warpAffine 一致"""
+    frame = _frame()
+    monkeypatch.setattr('reelrush.effects.zoom.tile_executor', TileExecutor(threads=1))
+    whole = DynamicZoom.render(frame, 1.37)
+    executor = TileExecutor(threads=3)
+    monkeypatch.setattr('reelrush.effects.zoom.tile_executor', executor)
+    try:
+        # 横带的平移量在 OpenCV 内部按定点数舍入，个别像素可能差 1
+        diff = np.abs(DynamicZoom.render(frame, 1.37).astype(int) - whole)
+        assert diff.max() <= 1 and (diff > 0).mean() < 0.005
+    finally:
+        executor.close()
+
+def test_bands_see_quality_settings(monkeypatch):
+    """分块线程中 current_quality() 与调用方一致，降低模糊分辨率在大帧上同样生效"""
+    frame = _frame()
+    executor = TileExecutor(threads=4)
+    monkeypatch.setattr('reelrush.effects.filter.tile_executor', executor)
+    try:
+        full = FilterEffect.render(frame, 'gaussian_blur')
+        with quality(QualitySettings(blur_scale=0.25)):
+            tiled = FilterEffect.render(frame, 'gaussian_blur')
+            monkeypatch.setattr(executor, 'threads', 1)
+            untiled = FilterEffect.render(frame, 'gaussian_blur')
+        assert not np.array_equal(tiled, full)
+        # 缩小计算只在光晕内有差别，分块结果接近整帧缩小计算的结果
+        assert np.abs(tiled.astype(int) - untiled).mean() < 1
+    finally:
+        executor.close()
+
+def test_close_restores_opencv_threads():
+    """线程池存在时降低 OpenCV 的线程数，关闭后恢复"""
+    before = cv2.getNumThreads()
+    executor = TileExecutor(threads=max(2, 2 * before))
+    executor.map_bands(lambda y0, y1: None, 1080)
+    assert cv2.getNumThreads() == 1
+    executor.close()
+    assert cv2.getNumThreads() == before
@@ -0,0 +1,66 @@
+import numpy as np
+from reelrush.timewarp import TimeWarp
+from reelrush.effects.freeze import FreezeFrame
+from reelrush.effects.motion import SlowMotion
+from reelrush.effects_processor import VideoProcessingParams, SlowMotionParams, FreezeFrameParams
+
+def _monotonic(warp):
+    t = np.linspace(0, warp.duration, 2001)
+    return np.all(np.diff(warp(t)) >= -1e-9)
+
+def test_identity():
+    """没有变速时输出时间等于源时间"""
+    warp = TimeWarp(10)
+    assert warp.is_identity()
+    assert warp(3.5) == 3.5
+    assert warp.to_output(3.5) == 3.5
+
+def test_slow_motion_and_freeze():
+    """慢动作拉长区间，冻结帧停在源时间上，之后的时间顺延"""
+    warp = TimeWarp(10)
+    SlowMotion.warp(warp, 2, 4, 0.5)
+    FreezeFrame.warp(warp, 8, 1)
+    assert warp.duration == 13
+    assert abs(warp(6) - 4) < 1e-9
+    assert abs(warp(10.5) - 8) < 1e-9
+    assert abs(warp(12) - 9) < 1e-9
+    assert abs(warp.to_output(9) - 12) < 1e-9
+    assert _monotonic(warp)
+
+def test_freeze_inside_slow_motion():
+    """冻结帧落在慢动作区间内时，两种添加顺序得到相同的时间映射"""
+    for freeze_at in (2, 3, 4):
+        slow_first, freeze_first = TimeWarp(10), TimeWarp(10)
+        SlowMotion.warp(slow_first, 2, 6, 0.5)
+        FreezeFrame.warp(slow_first, freeze_at, 1)
+        FreezeFrame.warp(freeze_first, freeze_at, 1)
+        SlowMotion.warp(freeze_first, 2, 6, 0.5)
+        assert slow_first.duration == freeze_first.duration == 15
+        t = np.linspace(0, 15, 301)
+        assert np.allclose(slow_first(t), freeze_first(t))
+        assert _monotonic(slow_first)
+        start = slow_first.to_output(freeze_at)
+        assert abs(slow_first(start + 0.5) - freeze_at) < 1e-9
+
+def test_split_keeps_ramp():
+    """在变速段中间拆分后，冻结帧之外的映射与原曲线一致"""
+    ramp, frozen = TimeWarp(10), TimeWarp(10)
+    SlowMotion.warp(ramp, 2, 6, 0.5, abruptness=1)
+    SlowMotion.warp(frozen, 2, 6, 0.5, abruptness=1)
+    FreezeFrame.warp(frozen, 4, 1)
+    split = frozen.to_output(4)
+    before = np.linspace(0, split, 50)
+    after = np.linspace(split, ramp.duration, 50)
+    assert np.allclose(frozen(before), ramp(before))
+    assert np.allclose(frozen(after + 1), ramp(after))
+
+def test_overlapping_slow_motion_rejected():
+    """重叠的慢动作在参数验证时被拒绝，而不是在渲染时出错"""
+    params = VideoProcessingParams(
+        video_path="origin.mp4",
+        slow_motion_effects=[SlowMotionParams(2, 4), SlowMotionParams(5, 2)],
+        freeze_frame_effects=[FreezeFrameParams(4, 1)]
+    )
+    assert not params.validate()
+    params.slow_motion_effects = [SlowMotionParams(2, 4)]
+    assert params.validate()
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+from moviepy import VideoClip
+from reelrush.effects.transition import TransitionEffect
+
+def solid(value, duration=2.0, size=(16, 8)):
+    """纯色片段"""
+    frame = np.full((size[1], size[0], 3), value, np.uint8)
+    clip = VideoClip(lambda t: frame, duration=duration)
+    clip.fps = 10
+    return clip
+
+def test_duration_and_pass_through():
+    """总时长为各段之和减去重叠，重叠区间外逐帧等于原片段"""
+    clips = [solid(0), solid(100), solid(200, 3.0)]
+    result = TransitionEffect.concatenate(clips, 'crossfade', 0.5)
+    assert result.duration == pytest.approx(2 + 2 + 3 - 2 * 0.5)
+    assert (result.get_frame(1.0) == 0).all()
+    assert (result.get_frame(2.5) == 100).all()
+    assert (result.get_frame(5.0) == 200).all()
+
+def test_crossfade_midpoint():
+    """交叉淡化在重叠区间中点是两帧的平均"""
+    result = TransitionEffect.concatenate([solid(0), solid(200)], 'crossfade', 1.0)
+    assert (result.get_frame(1.5) == 100).all()
+
+def test_slide_and_wipe():
+    """滑动把新画面推入，擦除让新画面从一侧露出"""
+    left = np.zeros((8, 16, 3), np.uint8)
+    left[:, :8] = 50
+    first = VideoClip(lambda t: left, duration=2.0)
+    first.fps = 10
+    second = solid(200)
+    slide = TransitionEffect.concatenate([first, second], 'slide', 1.0, 'left')
+    frame = slide.get_frame(1.5)
+    # 旧画面左移半个宽度，右半边是新画面的左半边
+    assert (frame[:, :8] == 0).all() and (frame[:, 8:] == 200).all()
+
+    wipe = TransitionEffect.concatenate([first, second], 'wipe', 1.0, 'up')
+    frame = wipe.get_frame(1.5)
+    # 旧画面不动，下半部分被新画面替换
+    assert (frame[:4, :8] == 50).all() and (frame[4:] == 200).all()
+
+def test_flash_peaks_white():
+    """闪白转场在中点全白，两端是原画面"""
+    result = TransitionEffect.concatenate([solid(0), solid(100)], 'flash', 1.0)
+    assert (result.get_frame(1.5) == 255).all()
+    assert (result.get_frame(1.0) == 0).all()
+    assert (result.get_frame(2.0) == 100).all()
+
+def test_invalid_arguments():
+    """未知转场、尺寸不一致或转场比片段长时报错"""
+    with pytest.raises(ValueError):
+        TransitionEffect.concatenate([solid(0), solid(1)], 'spin')
+    with pytest.raises(ValueError):
+        TransitionEffect.concatenate([solid(0), solid(1, size=(8, 8))])
+    with pytest.raises(ValueError):
+        TransitionEffect.concatenate([solid(0, 0.3), solid(1)], 'crossfade', 0.5)
+    with pytest.raises(ValueError):
+        TransitionEffect.concatenate([])